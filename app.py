@@ -1,28 +1,160 @@
+import async_runtime
+async_runtime.monkey_patch()  # must run before Flask/Socket.IO touch sockets and threads
+
 from flask import Flask, render_template, jsonify, Response, request, send_from_directory
 from flask_socketio import SocketIO, emit
-import cv2
 import json
 import os
 import time
 from datetime import datetime
 import sqlite3
 import threading
+import atexit
 import base64
+import logging
 from pathlib import Path
+from functools import wraps
+
+from config import Config, ConfigWatcher, ConfigError
+from detector import DetectorLoader
+from inference_scheduler import InferenceScheduler
+from detection_log import DetectionLog
+from metrics import registry as metrics_registry
+from profiler import profiler
+from logging_config import configure_logging, iter_log_lines
+from events import build_event_bus, system_alert
+from state_sync import StateStore
+from operating_modes import ViewerCount, ACTIVE
+from stream_quality import StreamClients, stream_room, ROOM_PREFIX
+from static_assets import AssetManifest, URL_PREFIX
+import exports
+
+logger = logging.getLogger('VaultSecurityWeb')
 
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'vault_security_key'
-socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True)
+app.config['SECRET_KEY'] = Config.SECRET_KEY
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    async_mode=async_runtime.ASYNC_MODE,
+    message_queue=Config.MESSAGE_QUEUE_URL,
+    channel=Config.SOCKETIO_CHANNEL,
+    logger=Config.SERVER.protocol_logging,
+    engineio_logger=Config.SERVER.protocol_logging
+)
 
 class VaultSecurityWeb:
     def __init__(self):
-        self.camera_processor = None
-        self.monitoring = False
+        # camera id -> CameraProcessor, one per enabled camera while monitoring
+        self.camera_processors = {}
+        # Where processors send frames while monitoring (None when stopped); see start_cameras()
+        self._camera_emitter = None
+        # Dashboards report per-camera metrics; only configured cameras are accepted
+        for camera in Config.CAMERAS:
+            metrics_registry.camera(camera.id)
+        # Dashboard state: one snapshot per client, then versioned deltas
+        self.state = StateStore(socketio)
+        # Connected dashboards; cameras skip JPEG encoding while nobody watches
+        self.viewers = ViewerCount()
+        if Config.NODE_ROLE != 'web':
+            self.viewers.set('local', 0)
+        # Each dashboard's rung on the stream quality ladder; cameras encode once per watched rung
+        self.streams = StreamClients(lambda: Config.STREAMING, on_change=self.move_stream_client)
+        self._monitoring = False
+        self.detector = DetectorLoader(**Config.DETECTOR.loader_kwargs())
+        # The detector cascade's large model (None when not configured)
+        escalation_kwargs = Config.DETECTOR.escalation_loader_kwargs()
+        self.escalation_detector = DetectorLoader(**escalation_kwargs) if escalation_kwargs else None
+        # Created by start_background_services() when DETECTOR.workers > 0
+        self.inference_pool = None
+        # Cameras take turns at the detector, weighted by priority and activity
+        self.scheduler = InferenceScheduler(Config.SCHEDULER.concurrency(Config.DETECTOR.workers),
+                                            Config.SCHEDULER.cpu_budget, Config.SCHEDULER.min_fps)
+        Config.on_reload(self.apply_scheduler_config)
+        Config.on_reload(self.apply_camera_config)
+        # Every processed frame's detections, for forensic search; started by start_background_services()
+        log_config = Config.DETECTION_LOG
+        self.detection_log = (DetectionLog(log_config.directory, log_config.flush_seconds, log_config.max_batch)
+                              if log_config.enabled else None)
+        # Edge agents' cameras (edge_aggregator.py); started by start_background_services()
+        self.edges = None
+        # Daily summaries and contact sheets (media_jobs.py); started by start_background_services()
+        self.jobs = None
+        # Alerts for dashboards, webhooks and the local alarm; started by start_background_services()
+        self.events = build_event_bus(socketio, Config.ALERT_WEBHOOK_URLS, Config.ALARM_COMMAND,
+                                      webhook_timeout=Config.ALERT_WEBHOOK_TIMEOUT)
         self.init_database()
+        self.load_state()
+    
+    def move_stream_client(self, sid, rung, reason):
+        """Put a dashboard in its rung's room and tell it which quality it now gets"""
+        for room in socketio.server.rooms(sid, namespace='/'):
+            if room.startswith(ROOM_PREFIX) and room != stream_room(rung):
+                socketio.server.leave_room(sid, room, namespace='/')
+        socketio.server.enter_room(sid, stream_room(rung), namespace='/')
+        controller = self.streams.get(sid)
+        socketio.emit('stream_profile', {
+            'rung': rung,
+            'ladder': Config.STREAMING.rungs(),
+            'pinned': controller.pinned if controller else None,
+            'adaptive': Config.STREAMING.adaptive,
+            'reason': reason
+        }, to=sid)
+        if reason not in ('subscribed', 'pinned', 'automatic'):
+            logger.info(f"📶 Dashboard {sid} moved to stream rung {rung}: {reason}")
+        forward_viewers()
+    
+    def apply_scheduler_config(self, changed):
+        if 'SCHEDULER' in changed:
+            self.scheduler.configure(Config.SCHEDULER.concurrency(Config.DETECTOR.workers),
+                                     Config.SCHEDULER.cpu_budget, Config.SCHEDULER.min_fps)
+    
+    def apply_camera_config(self, changed):
+        """Follow a reloaded camera list: new cameras get a status row, and while monitoring
+        cameras added or enabled are started and those removed or disabled stopped"""
+        if 'CAMERAS' not in changed:
+            return
+        known = self.state.snapshot()['state']['cameras']
+        conn = sqlite3.connect(Config.DATABASE.path)
+        cursor = conn.cursor()
+        for camera in Config.CAMERAS:
+            metrics_registry.camera(camera.id)
+            cursor.execute('''
+                INSERT OR IGNORE INTO camera_status (id, status, people_count, is_recording)
+                VALUES (?, 'Offline', 0, 0)
+            ''', (camera.id,))
+            fields = {'name': camera.name, 'required_people': camera.required_people}
+            if str(camera.id) not in known:
+                fields.update(people_count=0, status='Offline', is_recording=False)
+            self.state.update_camera(camera.id, **fields)
+        conn.commit()
+        conn.close()
         
+        # Running cameras pick up their own changed settings (CameraProcessor.apply_config)
+        emitter = self._camera_emitter
+        if emitter is None:
+            return
+        wanted = [camera.id for camera in Config.enabled_cameras()]
+        for camera_id in [cid for cid in self.camera_processors if cid not in wanted]:
+            self.camera_processors.pop(camera_id).stop()
+            logger.info(f"🛑 Camera {camera_id} removed or disabled in the config, stopping")
+        for camera_id in wanted:
+            if camera_id not in self.camera_processors:
+                logger.info(f"▶️ Camera {camera_id} added or enabled in the config, starting")
+                self.start_camera(camera_id, emitter)
+    
+    @property
+    def monitoring(self):
+        return self._monitoring
+    
+    @monitoring.setter
+    def monitoring(self, value):
+        self._monitoring = value
+        self.state.set_monitoring(value)
+    
     def init_database(self):
         """Initialize SQLite database"""
-        conn = sqlite3.connect('vault_security.db')
+        conn = sqlite3.connect(Config.DATABASE.path)
         cursor = conn.cursor()
         
         # Create tables
@@ -33,9 +165,14 @@ class VaultSecurityWeb:
                 person_count INTEGER,
                 clip_path TEXT,
                 duration REAL,
-                status TEXT
+                status TEXT,
+                camera_id INTEGER
             )
         ''')
+        # Databases created before violations recorded their camera
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(violations)')]
+        if 'camera_id' not in columns:
+            cursor.execute('ALTER TABLE violations ADD COLUMN camera_id INTEGER')
         
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS camera_status (
@@ -47,21 +184,68 @@ class VaultSecurityWeb:
             )
         ''')
         
-        # Initialize camera status
+        # Every status change, for audits (exported by /api/export/status)
         cursor.execute('''
-            INSERT OR REPLACE INTO camera_status (id, status, people_count, is_recording)
-            VALUES (1, 'Offline', 0, 0)
+            CREATE TABLE IF NOT EXISTS status_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                camera_id INTEGER,
+                status TEXT,
+                people_count INTEGER,
+                is_recording BOOLEAN
+            )
         ''')
         
+        # Initialize camera status
+        for camera in Config.CAMERAS:
+            cursor.execute('''
+                INSERT OR REPLACE INTO camera_status (id, status, people_count, is_recording)
+                VALUES (?, 'Offline', 0, 0)
+            ''', (camera.id,))
+        
         conn.commit()
         conn.close()
     
-    def update_camera_status(self, people_count, is_recording):
-        """Update camera status in database"""
-        conn = sqlite3.connect('vault_security.db')
+    def load_state(self):
+        """Seed the dashboard state from the database"""
+        conn = sqlite3.connect(Config.DATABASE.path)
         cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM violations')
+        violation_count = cursor.fetchone()[0]
+        conn.close()
         
-        status = "Access Granted" if people_count == 2 else "Access Denied"
+        cameras = {camera.id: {'name': camera.name, 'people_count': 0, 'status': 'Offline',
+                               'is_recording': False, 'required_people': camera.required_people}
+                   for camera in Config.CAMERAS}
+        self.state.load(cameras, self.get_violations(self.state.violations_limit), violation_count)
+    
+    def update_camera_status(self, people_count, is_recording, camera_id=1, mode=ACTIVE):
+        """Update camera status (called per frame; only changes reach dashboards and the database)"""
+        camera = Config.camera(camera_id)
+        if camera is None:
+            # Removed by a config reload; its processor is stopping
+            return
+        required = camera.required_people
+        status = "Access Granted" if people_count == required else "Access Denied"
+        
+        changed = self.state.update_camera(camera_id, people_count=people_count, status=status,
+                                           is_recording=bool(is_recording), required_people=required,
+                                           mode=mode)
+        if changed is None:
+            return
+        self.write_camera_status(camera_id, status, people_count, is_recording)
+    
+    def apply_remote_camera(self, camera_id, changes):
+        """Apply a camera's changed fields as reported by the edge agent running it"""
+        if self.state.update_camera(camera_id, **changes) is None:
+            return
+        camera = self.state.snapshot()['state']['cameras'].get(str(camera_id), {})
+        self.write_camera_status(camera_id, camera.get('status'), camera.get('people_count', 0),
+                                 camera.get('is_recording', False))
+    
+    def write_camera_status(self, camera_id, status, people_count, is_recording):
+        conn = sqlite3.connect(Config.DATABASE.path)
+        cursor = conn.cursor()
         
         cursor.execute('''
             UPDATE camera_status 
@@ -69,30 +253,68 @@ class VaultSecurityWeb:
                 status = ?, 
                 people_count = ?,
                 is_recording = ?
-            WHERE id = 1
-        ''', (status, people_count, is_recording))
+            WHERE id = ?
+        ''', (status, people_count, is_recording, camera_id))
+        cursor.execute('''
+            INSERT INTO status_history (camera_id, status, people_count, is_recording)
+            VALUES (?, ?, ?, ?)
+        ''', (camera_id, status, people_count, bool(is_recording)))
         
         conn.commit()
         conn.close()
     
-    def add_violation(self, person_count, clip_path, duration):
-        """Add violation to database"""
-        conn = sqlite3.connect('vault_security.db')
+    def camera_failed(self, camera_id):
+        """A camera could not start: show only it as failed; monitoring stops when no camera is left"""
+        if self.state.update_camera(camera_id, status='Failed', people_count=0, is_recording=False) is not None:
+            self.write_camera_status(camera_id, 'Failed', 0, False)
+        if not any(p.running for cid, p in self.camera_processors.items() if cid != camera_id):
+            self.monitoring = False
+    
+    def add_violation(self, person_count, clip_path, duration, camera_id=1, timestamp=None):
+        """Add violation to database (``timestamp`` keeps an edge's original time on replay)"""
+        conn = sqlite3.connect(Config.DATABASE.path)
         cursor = conn.cursor()
         
-        status = "Too Few People" if person_count < 2 else "Too Many People"
+        # A camera removed by a config reload may still finish the clip it was recording
+        camera = Config.camera(camera_id)
+        required = (camera.required_people if camera is not None else
+                    self.state.snapshot()['state']['cameras'].get(str(camera_id), {}).get('required_people', 0))
+        status = "Too Few People" if person_count < required else "Too Many People"
         
         cursor.execute('''
-            INSERT INTO violations (person_count, clip_path, duration, status)
-            VALUES (?, ?, ?, ?)
-        ''', (person_count, clip_path, duration, status))
+            INSERT INTO violations (timestamp, person_count, clip_path, duration, status, camera_id)
+            VALUES (COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?)
+        ''', (timestamp, person_count, clip_path, duration, status, camera_id))
+        cursor.execute('SELECT * FROM violations WHERE id = ?', (cursor.lastrowid,))
+        row = self.violation_row(cursor.fetchone())
         
         conn.commit()
         conn.close()
+        self.state.add_violation(row, camera_id)
+        if self.jobs is not None:
+            self.jobs.violation_recorded(row)
+    
+    @staticmethod
+    def violation_row(row):
+        return {
+            'id': row[0],
+            'timestamp': row[1],
+            'person_count': row[2],
+            'clip_path': row[3],
+            'duration': row[4],
+            'status': row[5],
+            'camera_id': row[6]
+        }
+    
+    def get_violation(self, violation_id):
+        conn = sqlite3.connect(Config.DATABASE.path)
+        row = conn.execute('SELECT * FROM violations WHERE id = ?', (violation_id,)).fetchone()
+        conn.close()
+        return self.violation_row(row) if row else None
     
     def get_violations(self, limit=10):
         """Get recent violations"""
-        conn = sqlite3.connect('vault_security.db')
+        conn = sqlite3.connect(Config.DATABASE.path)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -101,26 +323,17 @@ class VaultSecurityWeb:
             LIMIT ?
         ''', (limit,))
         
-        violations = []
-        for row in cursor.fetchall():
-            violations.append({
-                'id': row[0],
-                'timestamp': row[1],
-                'person_count': row[2],
-                'clip_path': row[3],
-                'duration': row[4],
-                'status': row[5]
-            })
+        violations = [self.violation_row(row) for row in cursor.fetchall()]
         
         conn.close()
         return violations
     
     def get_camera_status(self):
         """Get current camera status"""
-        conn = sqlite3.connect('vault_security.db')
+        conn = sqlite3.connect(Config.DATABASE.path)
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM camera_status WHERE id = 1')
+        cursor.execute('SELECT * FROM camera_status WHERE id = ?', (Config.CAMERA.id,))
         row = cursor.fetchone()
         
         conn.close()
@@ -131,13 +344,103 @@ class VaultSecurityWeb:
                 'status': row[2],
                 'people_count': row[3],
                 'is_recording': bool(row[4]),
-                'monitoring': self.monitoring
+                'monitoring': self.monitoring,
+                'detector': self.detector.status(),
+                'escalation_detector': self.escalation_detector.status() if self.escalation_detector else None,
+                'inference_pool': self.inference_pool.status() if self.inference_pool else None,
+                'scheduler': self.scheduler.status() if Config.SCHEDULER.enabled else None,
+                'detection_log': self.detection_log.status() if self.detection_log else None,
+                'edges': self.edges.status() if self.edges else None,
+                'jobs': self.jobs.status() if self.jobs else None,
+                'alerts': self.events.status(),
+                'state_sync': self.state.status(),
+                'stream_quality': self.streams.status(),
+                'streams': {cid: p.stream_status() for cid, p in self.camera_processors.items()}
             }
         return None
+    
+    def start_cameras(self, emitter):
+        """Start a processor thread for every enabled camera; returns how many"""
+        self._camera_emitter = emitter
+        # Every processor is counted as running before any thread starts, so
+        # one camera failing early doesn't look like the last one (see camera_failed)
+        processors = [self.start_camera(camera.id, emitter, run=False) for camera in Config.enabled_cameras()]
+        for processor in processors:
+            self.run_camera(processor)
+        return len(self.camera_processors)
+    
+    def start_camera(self, camera_id, emitter, run=True):
+        from camera_processor import CameraProcessor
+        processor = CameraProcessor(self, emitter, self.detector, self.inference_pool,
+                                    camera_id=camera_id, events=self.events,
+                                    escalation_detector=self.escalation_detector)
+        processor.running = True
+        self.camera_processors[camera_id] = processor
+        if run:
+            self.run_camera(processor)
+        return processor
+    
+    def run_camera(self, processor):
+        threading.Thread(target=processor.run, name=f'camera-processor-{processor.camera_id}', daemon=True).start()
+    
+    def stop_cameras(self):
+        self._camera_emitter = None
+        for processor in self.camera_processors.values():
+            processor.stop()
+        self.camera_processors = {}
+    
+    def sweep_retention(self):
+        """Delete clips, summaries, violation rows and detection log segments past the RETENTION limits"""
+        retention = Config.RETENTION
+        removed_clips = removed_rows = removed_segments = 0
+        if retention.clips_days:
+            cutoff = time.time() - retention.clips_days * 86400
+            for clips_dir in (Config.RECORDING.output_directory, Config.MEDIA_JOBS.output_directory):
+                for entry in os.scandir(clips_dir) if os.path.isdir(clips_dir) else []:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed_clips += 1
+        if retention.violations_days:
+            conn = sqlite3.connect(Config.DATABASE.path)
+            cursor = conn.execute("DELETE FROM violations WHERE timestamp < datetime('now', ?)",
+                                  (f'-{retention.violations_days} days',))
+            removed_rows = cursor.rowcount
+            conn.execute("DELETE FROM status_history WHERE timestamp < datetime('now', ?)",
+                         (f'-{retention.violations_days} days',))
+            conn.commit()
+            conn.close()
+        if retention.detections_days and self.detection_log is not None:
+            removed_segments = self.detection_log.prune(retention.detections_days)
+        if removed_clips or removed_rows or removed_segments:
+            logger.info(f"🧹 Retention: removed {removed_clips} clips, {removed_rows} violations "
+                        f"and {removed_segments} detection log segments")
+        return removed_clips, removed_rows
 
 # Initialize the security system
 security_system = VaultSecurityWeb()
 
+# Dashboard JS/CSS/images under content-hashed, immutable URLs
+assets = AssetManifest(os.path.join(app.root_path, Config.STATIC_DIR))
+
+@app.context_processor
+def inject_asset_url():
+    return {'asset_url': assets.url}
+
+@app.route(f'{URL_PREFIX}<path:name>')
+def fingerprinted_asset(name):
+    """A static file by its fingerprinted URL (see static_assets.py)"""
+    response = assets.response(URL_PREFIX + name, request)
+    if response is None:
+        return jsonify({'status': 'error', 'message': 'Asset not found'}), 404
+    return response
+
+def conditional_json(data):
+    """JSON with an ETag; a poll whose answer hasn't changed gets an empty 304"""
+    response = jsonify(data)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
 @app.route('/')
 def dashboard():
     """Main dashboard page"""
@@ -146,30 +449,175 @@ def dashboard():
 @app.route('/api/status')
 def get_status():
     """Get current system status"""
-    return jsonify(security_system.get_camera_status())
+    return conditional_json(security_system.get_camera_status())
 
 @app.route('/api/violations')
 def get_violations():
     """Get recent violations"""
     limit = request.args.get('limit', 10, type=int)
-    return jsonify(security_system.get_violations(limit))
+    return conditional_json(security_system.get_violations(limit))
+
+def parse_time_arg(name):
+    """A query-string time as epoch seconds: accepts epoch numbers and ISO 8601 (local time)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def detection_query():
+    """Common arguments of the /api/detections endpoints, or an error response"""
+    if security_system.detection_log is None:
+        return None, (jsonify({'status': 'error', 'message': 'Detection log is disabled'}), 404)
+    camera_id = request.args.get('camera_id', Config.CAMERA.id, type=int)
+    try:
+        start, end = parse_time_arg('start'), parse_time_arg('end')
+    except ValueError as e:
+        return None, (jsonify({'status': 'error', 'message': f"Bad time: {e}"}), 400)
+    return (camera_id, start, end), None
+
+@app.route('/api/detections/search')
+def search_detections():
+    """When were there ``min_people``+ people (in a zone) on a camera; answered from the detection log"""
+    query, error = detection_query()
+    if error:
+        return error
+    camera_id, start, end = query
+    zone = request.args.get('zone')
+    if zone:
+        camera = Config.camera(camera_id)
+        zones = (camera.zones if camera is not None else None) or {}
+        if zone in zones:
+            zone = zones[zone]
+        else:
+            try:
+                zone = json.loads(zone)
+            except ValueError:
+                return jsonify({'status': 'error', 'message': f"Unknown zone {zone!r}"}), 400
+    result = security_system.detection_log.search(
+        camera_id, start, end,
+        min_people=request.args.get('min_people', 1, type=int),
+        max_people=request.args.get('max_people', type=int),
+        zone=zone or None,
+        gap=request.args.get('gap', 2.0, type=float),
+        limit=request.args.get('limit', 500, type=int)
+    )
+    for match in result['matches']:
+        match['clips'] = [{'clip_path': clip, 'url': f'/clips/{clip}'} for clip in match['clips']]
+    return jsonify(dict(result, camera_id=camera_id))
+
+@app.route('/api/detections')
+def get_detections():
+    """Logged boxes and track IDs for every frame in ``[start, end]``"""
+    query, error = detection_query()
+    if error:
+        return error
+    camera_id, start, end = query
+    if start is None or end is None:
+        return jsonify({'status': 'error', 'message': 'start and end are required'}), 400
+    frames = security_system.detection_log.frames(camera_id, start, end,
+                                                  limit=request.args.get('limit', 1000, type=int))
+    return jsonify({'camera_id': camera_id, 'frames': frames})
+
+def media_jobs():
+    """The background job runner, or an error response when it is off"""
+    if security_system.jobs is None:
+        return None, (jsonify({'status': 'error', 'message': 'Background jobs are disabled'}), 404)
+    return security_system.jobs, None
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+def list_or_queue_jobs():
+    """List jobs (``state``/``kind`` filters), or queue one:
+    ``{"kind": "summary", "camera_id": 1, "date": "2024-05-01"}`` or
+    ``{"kind": "contact_sheet", "violation_id": 42}``"""
+    runner, error = media_jobs()
+    if error:
+        return error
+    if request.method == 'GET':
+        return jsonify({'jobs': runner.list(request.args.get('state'), request.args.get('kind')),
+                        **runner.status()})
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get('kind') == 'summary':
+            camera_id = int(data.get('camera_id', Config.CAMERA.id))
+            if camera_id not in [c.id for c in Config.CAMERAS]:
+                return jsonify({'status': 'error', 'message': f"Unknown camera {camera_id}"}), 404
+            day = datetime.fromisoformat(data['date']).date() if data.get('date') else datetime.now().date()
+            job = runner.summary(camera_id, day)
+        elif data.get('kind') == 'contact_sheet':
+            violation = security_system.get_violation(int(data.get('violation_id', 0)))
+            if violation is None:
+                return jsonify({'status': 'error', 'message': 'Violation not found'}), 404
+            error = fetch_edge_clip(violation['clip_path']) if violation['clip_path'] else None
+            if error:
+                return error
+            job = runner.contact_sheet(violation)
+        else:
+            return jsonify({'status': 'error', 'message': "kind must be 'summary' or 'contact_sheet'"}), 400
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', 'job': job.as_dict()}), 202
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET', 'DELETE'])
+def get_job(job_id):
+    """A job's state and progress; DELETE cancels it if it hasn't started"""
+    runner, error = media_jobs()
+    if error:
+        return error
+    if request.method == 'DELETE':
+        if not runner.cancel(job_id):
+            return jsonify({'status': 'error', 'message': 'Job is not queued'}), 409
+    found = runner.get(job_id)
+    if found is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify(found)
+
+@app.route('/api/jobs/<int:job_id>/result')
+def job_result(job_id):
+    """The summary video or contact sheet a finished job produced"""
+    runner, error = media_jobs()
+    if error:
+        return error
+    path = runner.result_path(job_id)
+    if path is None:
+        return jsonify({'status': 'error', 'message': 'Job has no result (yet)'}), 404
+    return send_from_directory(os.path.abspath(runner.output_directory), path)
+
+def publish_control(command, **fields):
+    """Send a command (start, stop, viewers) to camera nodes over the message queue"""
+    import redis
+    client = redis.Redis.from_url(Config.MESSAGE_QUEUE_URL)
+    try:
+        return client.publish(Config.CONTROL_CHANNEL,
+                              json.dumps(dict(fields, command=command, sent_at=time.time())))
+    finally:
+        client.close()
 
 @app.route('/api/start_monitoring', methods=['POST'])
 def start_monitoring():
     """Start camera monitoring"""
     try:
         if not security_system.monitoring:
+            if Config.NODE_ROLE == 'web':
+                # Cameras run on separate camera nodes; they report progress
+                # back through the shared Socket.IO message queue
+                nodes = publish_control('start')
+                if not nodes:
+                    return jsonify({'status': 'error', 'message': 'No camera nodes are listening'}), 503
+                security_system.monitoring = True
+                return jsonify({'status': 'success', 'message': f'Monitoring starting on {nodes} camera node(s)'})
             security_system.monitoring = True
-            # Start camera processor in a separate thread
-            from camera_processor import CameraProcessor
-            security_system.camera_processor = CameraProcessor(security_system, socketio)
-            thread = threading.Thread(target=security_system.camera_processor.run)
-            thread.daemon = True
-            thread.start()
-            return jsonify({'status': 'success', 'message': 'Monitoring started'})
+            # Model load and camera connection happen on the processor threads;
+            # progress is pushed to the dashboard as 'monitoring_progress' events
+            cameras = security_system.start_cameras(socketio)
+            edges = security_system.edges.command('start') if security_system.edges else 0
+            message = f'Monitoring starting on {cameras} camera(s)' + (f' and {edges} edge(s)' if edges else '')
+            return jsonify({'status': 'success', 'message': message})
         return jsonify({'status': 'error', 'message': 'Already monitoring'})
     except Exception as e:
-        print(f"Error starting monitoring: {e}")
+        logger.error(f"❌ Error starting monitoring: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/api/stop_monitoring', methods=['POST'])
@@ -178,45 +626,279 @@ def stop_monitoring():
     try:
         if security_system.monitoring:
             security_system.monitoring = False
-            if security_system.camera_processor:
-                security_system.camera_processor.stop()
+            if Config.NODE_ROLE == 'web':
+                publish_control('stop')
+            if security_system.edges:
+                security_system.edges.command('stop')
+            security_system.stop_cameras()
             return jsonify({'status': 'success', 'message': 'Monitoring stopped'})
         return jsonify({'status': 'error', 'message': 'Not currently monitoring'})
     except Exception as e:
-        print(f"Error stopping monitoring: {e}")
+        logger.error(f"❌ Error stopping monitoring: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def fetch_edge_clip(filename):
+    """Copy an ``edge/<edge>/<clip>`` clip from its edge on first use; returns an error response or None"""
+    parts = filename.split('/')
+    clips_dir = Config.RECORDING.output_directory
+    if len(parts) != 3 or parts[0] != 'edge' or os.path.exists(os.path.join(clips_dir, filename)):
+        return None
+    if security_system.edges is None:
+        return jsonify({'status': 'error', 'message': 'Edge aggregator is disabled'}), 404
+    try:
+        security_system.edges.fetch_clip(parts[1], parts[2], os.path.join(clips_dir, 'edge', parts[1]))
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+    except TimeoutError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 504
+    except RuntimeError as e:
+        return jsonify({'status': 'error', 'message': f"Edge {parts[1]}: {e}"}), 502
+    return None
+
 @app.route('/clips/<path:filename>')
 def serve_clip(filename):
-    """Serve violation clips"""
-    clips_dir = 'violation_clips'
+    """Serve violation clips (clips recorded on an edge are fetched from it on demand)"""
+    clips_dir = Config.RECORDING.output_directory
+    error = fetch_edge_clip(filename)
+    if error:
+        return error
     return send_from_directory(clips_dir, filename)
 
+@app.route('/api/edges')
+def get_edges():
+    """Connected edge agents and their link statistics"""
+    if security_system.edges is None:
+        return jsonify({'status': 'error', 'message': 'Edge aggregator is disabled'}), 404
+    return jsonify(security_system.edges.status())
+
+@app.route('/api/edges/<edge_id>/cameras/<int:camera_id>/thumbnail')
+def edge_thumbnail(edge_id, camera_id):
+    """The current picture of a camera running on an edge, as a JPEG"""
+    if security_system.edges is None:
+        return jsonify({'status': 'error', 'message': 'Edge aggregator is disabled'}), 404
+    try:
+        jpeg = security_system.edges.thumbnail(edge_id, camera_id)
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+    except TimeoutError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 504
+    except RuntimeError as e:
+        return jsonify({'status': 'error', 'message': f"Edge {edge_id}: {e}"}), 502
+    return Response(jpeg, mimetype='image/jpeg', headers={'Cache-Control': 'no-store'})
+
 # Add missing API endpoints
 @app.route('/api/test/alarm', methods=['POST'])
 def test_alarm():
-    """Test alarm system"""
-    return jsonify({'status': 'success', 'message': 'Alarm test completed'})
+    """Send a test alert through every sink (dashboard, webhooks, local alarm)"""
+    security_system.events.start()
+    security_system.events.publish(system_alert("Alarm test", 'high', test=True))
+    sinks = [sink.name for sink in security_system.events.sinks]
+    return jsonify({'status': 'success', 'message': f"Alarm test sent to {', '.join(sinks)}", 'sinks': sinks})
 
 @app.route('/api/system/health')
 def system_health():
-    """Check system health"""
-    return jsonify({'status': 'healthy', 'message': 'All systems operational'})
+    """Check system health from live pipeline metrics"""
+    issues = []
+    unhealthy = False
+    
+    if Config.NODE_ROLE != 'web':
+        pool = security_system.inference_pool
+        if pool is not None:
+            if pool.failed:
+                issues.append("No inference worker could load a detector model")
+                unhealthy = True
+        elif security_system.detector.status()['state'] == 'failed':
+            issues.append(f"Detector failed to load: {security_system.detector.error}")
+            unhealthy = True
+        # Without the cascade's large model cameras still detect with the small one: degraded, not down
+        escalation = security_system.escalation_detector
+        if pool is not None:
+            if pool.escalation_kwargs and pool.is_ready() and not pool.escalation:
+                issues.append("No inference worker could load the escalation model")
+        elif escalation is not None and escalation.status()['state'] == 'failed':
+            issues.append(f"Escalation model failed to load: {escalation.error}")
+    
+    cameras = {}
+    for camera in Config.enabled_cameras():
+        camera_id = camera.id
+        cam = metrics_registry.camera(camera_id)
+        snapshot = cam.snapshot()
+        cameras[camera_id] = snapshot
+        if not security_system.monitoring:
+            continue
+        # Web nodes only relay frames: connection and frame age are the processing nodes' to report
+        if Config.NODE_ROLE != 'web':
+            if not cam.connected:
+                issues.append(f"Camera {camera_id} is disconnected")
+                unhealthy = True
+                continue
+            age = snapshot['frame_age_s']
+            if age is None or age > Config.HEALTH_MAX_FRAME_AGE:
+                issues.append(f"Camera {camera_id} has no fresh frames (age {age}s)")
+                unhealthy = True
+        e2e = snapshot['glass_to_dashboard']['p95_ms']
+        if e2e is not None and e2e > Config.HEALTH_MAX_DASHBOARD_LATENCY * 1000:
+            issues.append(f"Camera {camera_id} dashboard latency p95 {e2e:.0f}ms")
+    
+    status = 'unhealthy' if unhealthy else ('degraded' if issues else 'healthy')
+    return jsonify({
+        'status': status,
+        'message': 'All systems operational' if not issues else '; '.join(issues),
+        'issues': issues,
+        'monitoring': security_system.monitoring,
+        'cameras': cameras,
+        'dashboards': metrics_registry.clients()
+    }), 503 if unhealthy else 200
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics_registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+def admin_only(view):
+    """Restrict a route to loopback clients unless ADMIN_API_LOCAL_ONLY is off"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if Config.ADMIN_API_LOCAL_ONLY and request.remote_addr not in ('127.0.0.1', '::1'):
+            return jsonify({'status': 'error', 'message': 'Admin API is only available locally'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/api/admin/profile', methods=['POST'])
+@admin_only
+def start_profile():
+    """Start sampling thread stacks for N seconds"""
+    data = request.get_json(silent=True) or {}
+    threads = data.get('threads')
+    if isinstance(threads, str):
+        threads = [threads]
+    try:
+        profiler.start(seconds=data.get('seconds', 10),
+                       interval=data.get('interval_ms', 5) / 1000,
+                       threads=threads)
+    except RuntimeError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Invalid seconds/interval_ms'}), 400
+    return jsonify({'status': 'success', 'profile': profiler.status()}), 202
+
+@app.route('/api/admin/profile')
+@admin_only
+def get_profile():
+    """Profile status and results: JSON top-N, or ?format=collapsed for flamegraphs"""
+    if request.args.get('format') == 'collapsed':
+        return Response(profiler.collapsed(), mimetype='text/plain')
+    return jsonify({
+        'profile': profiler.status(),
+        'top': profiler.top(request.args.get('top', 20, type=int), request.args.get('sort', 'self'))
+    })
+
+@app.route('/api/admin/profile', methods=['DELETE'])
+@admin_only
+def stop_profile():
+    """Cancel a running capture (results so far are kept)"""
+    profiler.stop()
+    return jsonify({'status': 'success', 'profile': profiler.status()})
+
+@app.route('/api/admin/config')
+@admin_only
+def get_config():
+    """Effective settings (defaults <- config file <- environment)"""
+    return jsonify({'config_file': Config.CONFIG_FILE, 'hot_reloadable': Config.HOT_RELOADABLE,
+                    'config': Config.as_dict()})
+
+@app.route('/api/admin/config/reload', methods=['POST'])
+@admin_only
+def reload_config():
+    """Re-read the config file now instead of waiting for the file watcher"""
+    try:
+        changed = Config.reload()
+    except ConfigError as e:
+        return jsonify({'status': 'error', 'message': 'Invalid configuration', 'problems': e.problems}), 400
+    return jsonify({
+        'status': 'success',
+        'applied': [name for name in changed if name in Config.HOT_RELOADABLE],
+        'restart_required': [name for name in changed if name not in Config.HOT_RELOADABLE]
+    })
 
-@app.route('/api/export/logs', methods=['POST'])
+@app.route('/api/export/logs', methods=['GET', 'POST'])
+@admin_only
 def export_logs():
-    """Export system logs"""
-    return jsonify({'status': 'success', 'message': 'Logs exported'})
+    """Stream the JSON log files as one NDJSON download (?level=&since=&logger= filters)"""
+    try:
+        lines = iter_log_lines(level=request.args.get('level'),
+                               since=request.args.get('since'),
+                               logger=request.args.get('logger'))
+        first = next(lines, None)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'since must be an ISO timestamp'}), 400
+
+    def generate():
+        if first is not None:
+            yield first
+            yield from lines
+
+    filename = f"vault-logs-{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/api/export/<dataset>')
+def export_dataset(dataset):
+    """Stream ``violations``, ``status`` (history) or ``detections`` as NDJSON, CSV or Parquet.
+
+    Filters: ``start``/``end`` (epoch or ISO), ``status``, ``camera_id``,
+    ``min_people``/``max_people``. ``clips=1`` on violations wraps the export
+    and the clips it references in a streamed ZIP.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in exports.FORMATS:
+        return jsonify({'status': 'error', 'message': f"format must be one of {', '.join(exports.FORMATS)}"}), 400
+    if fmt == 'parquet' and not exports.parquet_available():
+        return jsonify({'status': 'error', 'message': 'Parquet export needs pyarrow (pip install pyarrow)'}), 400
+    try:
+        start, end = parse_time_arg('start'), parse_time_arg('end')
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f"Bad time: {e}"}), 400
+    camera_id = request.args.get('camera_id', type=int)
+    min_people = request.args.get('min_people', type=int)
+    if dataset == 'violations':
+        columns = exports.VIOLATION_COLUMNS
+        filters = dict(start=start, end=end, camera_id=camera_id, status=request.args.get('status'),
+                       min_people=min_people,
+                       max_people=request.args.get('max_people', type=int))
+        rows = exports.violation_rows(Config.DATABASE.path, **filters)
+    elif dataset == 'status':
+        columns = exports.STATUS_COLUMNS
+        rows = exports.status_rows(Config.DATABASE.path, start, end, camera_id, request.args.get('status'))
+    elif dataset == 'detections':
+        if security_system.detection_log is None:
+            return jsonify({'status': 'error', 'message': 'Detection log is disabled'}), 404
+        columns = exports.DETECTION_COLUMNS
+        camera_ids = [camera_id] if camera_id is not None else [c.id for c in Config.CAMERAS]
+        rows = exports.detection_rows(security_system.detection_log, camera_ids, start, end, min_people)
+    else:
+        return jsonify({'status': 'error', 'message': f"Unknown export {dataset!r}"}), 404
+    
+    mimetype, extension = exports.FORMATS[fmt]
+    filename = f"vault-{dataset}-{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"
+    body = exports.encode(fmt, columns, rows)
+    if dataset == 'violations' and request.args.get('clips', type=int):
+        # Second pass over the same filters for the clip names, so nothing is held in memory
+        clips = (row[3] for row in exports.violation_rows(Config.DATABASE.path, **filters))
+        body = exports.zip_with_clips(filename, body, clips, Config.RECORDING.output_directory)
+        mimetype, filename = 'application/zip', filename.rsplit('.', 1)[0] + '.zip'
+    return Response(body, mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @app.route('/api/violations/clear', methods=['DELETE'])
 def clear_violations():
     """Clear violation history"""
     try:
-        conn = sqlite3.connect('vault_security.db')
+        conn = sqlite3.connect(Config.DATABASE.path)
         cursor = conn.cursor()
         cursor.execute('DELETE FROM violations')
         conn.commit()
         conn.close()
+        security_system.state.clear_violations()
         return jsonify({'status': 'success', 'message': 'Violations cleared'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -257,7 +939,7 @@ def export_violation(violation_id):
     """Export specific violation"""
     try:
         # Get violation from database
-        conn = sqlite3.connect('vault_security.db')
+        conn = sqlite3.connect(Config.DATABASE.path)
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM violations WHERE id = ?', (violation_id,))
         violation = cursor.fetchone()
@@ -265,10 +947,13 @@ def export_violation(violation_id):
         
         if violation:
             clip_path = violation[3]  # clip_path column
-            full_path = os.path.join('violation_clips', clip_path)
+            error = fetch_edge_clip(clip_path) if clip_path else None
+            if error:
+                return error
+            full_path = os.path.join(Config.RECORDING.output_directory, clip_path)
             
             if os.path.exists(full_path):
-                return send_from_directory('violation_clips', clip_path, as_attachment=True)
+                return send_from_directory(Config.RECORDING.output_directory, clip_path, as_attachment=True)
             else:
                 return jsonify({'status': 'error', 'message': 'Violation clip not found'}), 404
         else:
@@ -277,24 +962,168 @@ def export_violation(violation_id):
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @socketio.on('connect')
-def handle_connect():
-    print(f'Client connected: {request.sid}')
+def handle_connect(auth=None):
+    logger.debug(f'Client connected: {request.sid}')
     emit('connected', {'data': 'Connected to server'})
+    count_viewer(1)
+    # A reconnecting dashboard sends the last state version it applied
+    auth = auth if isinstance(auth, dict) else {}
+    emit(*security_system.state.sync_message(auth.get('epoch'), auth.get('seq')))
+
+@socketio.on('state_resync')
+def handle_state_resync(data):
+    """Client saw a gap in state_delta sequence numbers"""
+    data = data if isinstance(data, dict) else {}
+    emit(*security_system.state.sync_message(data.get('epoch'), data.get('seq')))
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    print(f'Client disconnected: {request.sid}')
+    logger.debug(f'Client disconnected: {request.sid}')
+    metrics_registry.forget_client(request.sid)
+    security_system.streams.unsubscribe(request.sid)
+    count_viewer(-1)
+
+# Identifies this web worker's viewer count to camera nodes
+WORKER_ID = f"{os.uname().nodename}:{os.getpid()}" if hasattr(os, 'uname') else str(os.getpid())
+
+def count_viewer(delta):
+    """Track connected dashboards; web workers forward their count to camera nodes"""
+    if Config.NODE_ROLE != 'web':
+        security_system.viewers.add(delta)
+        return
+    security_system.viewers.add(delta, WORKER_ID)
+    forward_viewers()
+
+def forward_viewers():
+    """Web workers tell camera nodes how many dashboards they have, per stream rung"""
+    if Config.NODE_ROLE != 'web' or not Config.MESSAGE_QUEUE_URL:
+        return
+    try:
+        publish_control('viewers', source=WORKER_ID, count=security_system.viewers.add(0, WORKER_ID),
+                        rungs=security_system.streams.counts())
+    except Exception as e:
+        logger.warning(f"⚠️ Could not forward viewer count: {e}")
+
+@socketio.on('stream_subscribe')
+def handle_stream_subscribe(data=None):
+    """Dashboard wants live video; a reconnecting one asks for the rung it had"""
+    data = data if isinstance(data, dict) else {}
+    try:
+        rung = int(data.get('rung') or 0)
+        pinned = int(data['pinned']) if data.get('pinned') is not None else None
+    except (TypeError, ValueError):
+        rung, pinned = 0, None
+    if pinned is not None:
+        rung = pinned
+    elif not Config.STREAMING.adaptive:
+        rung = 0
+    controller = security_system.streams.subscribe(request.sid, len(Config.STREAMING.rungs()), rung, pinned)
+    security_system.move_stream_client(request.sid, controller.rung, 'subscribed')
+
+@socketio.on('stream_pin')
+def handle_stream_pin(data=None):
+    """Dashboard picked a fixed stream quality (``rung`` null = automatic)"""
+    rung = data.get('rung') if isinstance(data, dict) else None
+    try:
+        security_system.streams.pin(request.sid, int(rung) if rung is not None else None)
+    except (TypeError, ValueError):
+        pass
 
 @socketio.on('request_frame')
 def handle_frame_request():
     """Handle frame request from client"""
     pass
 
+@socketio.on('frame_ack')
+def handle_frame_ack(data):
+    """Client confirms a frame was shown; gives glass-to-dashboard latency"""
+    try:
+        metrics_registry.observe_client_ack(int(data.get('camera_id', 1)), float(data['captured_at']) / 1000)
+        if data.get('sent_at'):
+            security_system.streams.observe_ack(request.sid, float(data['sent_at']) / 1000)
+    except (KeyError, TypeError, ValueError):
+        pass
+
+@socketio.on('client_metrics')
+def handle_client_metrics(data):
+    """Periodic rendering report from a dashboard (FPS, decode time, drops)"""
+    try:
+        metrics_registry.observe_client_report(request.sid, data)
+        security_system.streams.observe_report(request.sid, data)
+    except (AttributeError, TypeError, ValueError):
+        pass
+
 @socketio.on('ping')
 def handle_ping(data):
     """Handle ping from client"""
     emit('pong', data)
 
+def start_background_services():
+    """Start work that should be done before the first Start Monitoring click"""
+    security_system.events.start()
+    if security_system.detection_log is not None:
+        security_system.detection_log.start()
+        atexit.register(security_system.detection_log.close)
+    # Thresholds, ROIs and FPS budgets in the config file apply to running cameras
+    ConfigWatcher().start()
+    threading.Thread(target=retention_loop, name='retention-sweeper', daemon=True).start()
+    # Steps down dashboards that stopped acknowledging frames
+    security_system.streams.start()
+    if Config.MEDIA_JOBS.workers > 0:
+        # Only one node (the one running cameras) queues the nightly summaries
+        from media_jobs import MediaJobs
+        security_system.jobs = MediaJobs(Config.MEDIA_JOBS, security_system.detection_log,
+                                         Config.RECORDING.output_directory, [c.id for c in Config.CAMERAS],
+                                         Config.RECORDING.fps).start(schedule=Config.NODE_ROLE != 'web')
+        atexit.register(security_system.jobs.close)
+    if Config.NODE_ROLE == 'web':
+        # Detection runs on camera nodes; keep web workers light. Their state
+        # deltas reach dashboards through the message queue, and a local
+        # mirror answers snapshot requests
+        if Config.MESSAGE_QUEUE_URL:
+            security_system.state.follow(Config.MESSAGE_QUEUE_URL, Config.STATE_CHANNEL, Config.CONTROL_CHANNEL)
+        return
+    
+    # Load and warm the detector now so starting monitoring doesn't block on it
+    if Config.DETECTOR.workers > 0:
+        # Built here rather than at import time: spawned workers re-import the
+        # main module and must not allocate their own shared memory
+        from inference_workers import InferencePool
+        security_system.inference_pool = InferencePool(
+            num_workers=Config.DETECTOR.workers,
+            max_frame_size=Config.DETECTOR.max_frame_size,
+            loader_kwargs=Config.DETECTOR.loader_kwargs(),
+            escalation_kwargs=Config.DETECTOR.escalation_loader_kwargs()
+        ).start()
+        atexit.register(security_system.inference_pool.close)
+        metrics_registry.register_gauge(
+            'vault_inference_queue_depth', 'Frames waiting on or running in inference workers',
+            lambda: security_system.inference_pool.status()['in_flight']
+        )
+    else:
+        security_system.detector.start()
+        if security_system.escalation_detector is not None:
+            security_system.escalation_detector.start()
+    if Config.EDGE.listen_port:
+        # Edge agents (edge_agent.py) report their cameras here
+        from edge_aggregator import EdgeAggregator
+        security_system.edges = EdgeAggregator(security_system, socketio, Config.EDGE.listen_host,
+                                               Config.EDGE.listen_port, Config.EDGE.token).start()
+        atexit.register(security_system.edges.close)
+        metrics_registry.register_gauge('vault_edges_connected', 'Edge agents connected to this server',
+                                        lambda: len(security_system.edges.edges))
+    # Pre-import the processor module (cv2) off the request path as well
+    threading.Thread(target=__import__, args=('camera_processor',), daemon=True).start()
+
+def retention_loop():
+    """Apply the retention limits at start-up and then every sweep interval"""
+    while True:
+        try:
+            security_system.sweep_retention()
+        except Exception as e:
+            logger.error(f"❌ Retention sweep failed: {e}")
+        time.sleep(Config.RETENTION.sweep_interval_hours * 3600)
+
 def create_placeholder_files():
     """Create placeholder files to prevent 404 errors"""
     # Create simple placeholder image
@@ -312,21 +1141,31 @@ def create_placeholder_files():
         </text>
     </svg>'''
     
-    with open(os.path.join(placeholder_dir, 'no-signal.svg'), 'w') as f:
+    # Rewriting an unchanged file on every boot would give it a new mtime,
+    # and browsers would download it again for the changed Last-Modified/ETag
+    path = os.path.join(placeholder_dir, 'no-signal.svg')
+    try:
+        with open(path) as f:
+            if f.read() == placeholder_content:
+                return
+    except OSError:
+        pass
+    with open(path, 'w') as f:
         f.write(placeholder_content)
 
 if __name__ == '__main__':
     # Ensure required directories exist
-    os.makedirs('violation_clips', exist_ok=True)
+    os.makedirs(Config.RECORDING.output_directory, exist_ok=True)
     os.makedirs('static/images', exist_ok=True)
     os.makedirs('static/sounds', exist_ok=True)
     os.makedirs('templates', exist_ok=True)
     
-    print("Starting Vault Security Web System...")
-    print("Dashboard will be available at: http://localhost:5000")
+    configure_logging()
+    logger.info("Starting Vault Security Web System...")
+    logger.info(f"Dashboard will be available at: http://localhost:{Config.SERVER.port}")
     
     # Create a simple no-signal placeholder
     create_placeholder_files()
+    start_background_services()
     
-    socketio.run(app, debug=False, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
-    #socketio.run(app, debug=True, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    socketio.run(app, **async_runtime.server_options())
\ No newline at end of file
@@ -0,0 +1,89 @@
+# async_runtime.py - Async Server Runtime Selection
+
+from config import Config
+
+ASYNC_MODE = Config.SERVER.async_mode
+
+_patched = False
+
+
+def monkey_patch():
+    """Patch the standard library for the configured async runtime.
+
+    Must run before Flask, Socket.IO or anything that touches sockets or
+    threading is imported; ``app.py`` calls it on its first line.
+    """
+    global _patched
+    if _patched:
+        return
+    if ASYNC_MODE == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif ASYNC_MODE == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    _patched = True
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Run CPU-bound or blocking C code without stalling the event loop.
+
+    Under eventlet/gevent the camera pipeline runs in green threads, so calls
+    that block inside C (OpenCV reads and encodes, YOLO inference, SQLite)
+    are handed to a native thread pool. In threading mode this is a plain call.
+    """
+    if ASYNC_MODE == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(fn, *args, **kwargs)
+    if ASYNC_MODE == 'gevent':
+        from gevent import get_hub
+        return get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
+
+
+def start_native_thread(fn, *args, name=None):
+    """Start ``fn`` on a real OS thread, even when threading is monkey-patched.
+
+    Used for work that must keep running while green threads are busy
+    (e.g. the sampling profiler); such code must sleep with ``native_sleep``.
+    """
+    if ASYNC_MODE == 'eventlet':
+        from eventlet import patcher
+        thread_class = patcher.original('threading').Thread
+    elif ASYNC_MODE == 'gevent':
+        from gevent import monkey
+        thread_class = monkey.get_original('threading', 'Thread')
+    else:
+        import threading
+        thread_class = threading.Thread
+    thread = thread_class(target=fn, args=args, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def native_sleep(seconds):
+    """``time.sleep`` that blocks the OS thread instead of yielding to the hub"""
+    if ASYNC_MODE == 'eventlet':
+        from eventlet import patcher
+        return patcher.original('time').sleep(seconds)
+    if ASYNC_MODE == 'gevent':
+        from gevent import monkey
+        return monkey.get_original('time', 'sleep')(seconds)
+    import time
+    return time.sleep(seconds)
+
+
+def server_options():
+    """Keyword arguments for ``socketio.run`` in the configured mode"""
+    options = {
+        'host': Config.SERVER.host,
+        'port': Config.SERVER.port,
+        'debug': False,
+        'log_output': Config.SERVER.access_log
+    }
+    if ASYNC_MODE == 'threading':
+        options['allow_unsafe_werkzeug'] = True
+    elif ASYNC_MODE == 'eventlet':
+        # Upper bound on concurrent green threads serving connections
+        options['max_size'] = Config.SERVER.max_connections
+    return options
@@ -0,0 +1,271 @@
+# benchmark.py - Replay Benchmark Suite
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import resource
+import subprocess
+from datetime import datetime
+
+from config import Config
+from metrics import registry as metrics_registry
+from replay import replay_file
+
+RESULTS_DIRECTORY = os.path.join('benchmarks', 'results')
+
+# Metrics compared by --compare: (path in results, True when higher is better)
+REGRESSION_CHECKS = [
+    (('throughput_fps',), True),
+    (('frame_latency', 'p95_ms'), False),
+    (('stages', 'detect', 'p95_ms'), False),
+    (('stages', 'encode', 'p95_ms'), False),
+    (('cpu_seconds_per_frame',), False),
+    (('accuracy', 'exact_match_rate'), True),
+    (('accuracy', 'decision_accuracy'), True),
+]
+
+
+def load_labels(path):
+    """Read ground truth: ``{clip name: {"frame" | "first-last": people count}}``.
+
+    Frame numbers are 0-based and ranges inclusive, e.g.
+    ``{"door.mp4": {"0-149": 1, "150-420": 2}}``.
+    """
+    with open(path) as f:
+        raw = json.load(f)
+    labels = {}
+    for clip, frames in raw.items():
+        expanded = {}
+        for key, count in frames.items():
+            first, _, last = str(key).partition('-')
+            for i in range(int(first), int(last or first) + 1):
+                expanded[i] = int(count)
+        labels[os.path.basename(clip)] = expanded
+    return labels
+
+
+def score_counts(predicted, expected, required_people):
+    """Compare per-frame people counts with labels on the frames that have one"""
+    frames = [i for i in expected if i < len(predicted)]
+    if not frames:
+        return None
+    exact = sum(1 for i in frames if predicted[i] == expected[i])
+    abs_error = sum(abs(predicted[i] - expected[i]) for i in frames)
+    decisions = sum(1 for i in frames
+                    if (predicted[i] == required_people) == (expected[i] == required_people))
+    return {
+        'labeled_frames': len(frames),
+        'exact_match_rate': round(exact / len(frames), 4),
+        'mean_abs_error': round(abs_error / len(frames), 4),
+        'decision_accuracy': round(decisions / len(frames), 4)
+    }
+
+
+def current_rss_mb():
+    """Resident set size right now (Linux), falling back to the peak"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_clip(path, camera_id, detector, inference_pool, realtime, labels, escalation_detector=None):
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    processor = replay_file(path, detector, inference_pool, realtime=realtime, camera_id=camera_id,
+                            escalation_detector=escalation_detector)
+    elapsed = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    counts = processor.security_system.people_counts
+    camera = metrics_registry.camera(camera_id)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    result = {
+        'clip': os.path.basename(path),
+        'frames': len(counts),
+        'frames_dropped': camera.frames_dropped,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_fps': round(len(counts) / elapsed, 2) if elapsed else None,
+        'cpu_seconds': round(cpu, 3),
+        'cpu_seconds_per_frame': round(cpu / len(counts), 5) if counts else None,
+        'cpu_utilization': round(cpu / elapsed, 3) if elapsed else None,
+        'rss_mb': current_rss_mb(),
+        'frame_latency': camera.frame_latency.summary(cumulative=True),
+        'stages': {stage: hist.summary(cumulative=True) for stage, hist in camera.stages.items()},
+        'violations': len(processor.security_system.violations),
+        'cascade': camera.cascade_summary() if processor.cascade_enabled() else None
+    }
+    expected = labels.get(result['clip'])
+    if expected:
+        result['accuracy'] = score_counts(counts, expected, processor.settings.required_people)
+    return result
+
+
+def aggregate(clips):
+    """Suite-level figures: frame-weighted means of the per-clip results"""
+    frames = sum(c['frames'] for c in clips)
+    elapsed = sum(c['elapsed_s'] for c in clips)
+    cpu = sum(c['cpu_seconds'] for c in clips)
+
+    def weighted(*path):
+        total, weight = 0.0, 0
+        for clip in clips:
+            value = clip
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is not None:
+                total += value * clip['frames']
+                weight += clip['frames']
+        return round(total / weight, 4) if weight else None
+
+    summary = {
+        'frames': frames,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_fps': round(frames / elapsed, 2) if elapsed else None,
+        'cpu_seconds_per_frame': round(cpu / frames, 5) if frames else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'frame_latency': {'p95_ms': weighted('frame_latency', 'p95_ms')},
+        'stages': {stage: {'p95_ms': weighted('stages', stage, 'p95_ms')}
+                   for stage in clips[0]['stages']} if clips else {}
+    }
+    if any('accuracy' in c for c in clips):
+        summary['accuracy'] = {key: weighted('accuracy', key)
+                               for key in ('exact_match_rate', 'mean_abs_error', 'decision_accuracy')}
+    return summary
+
+
+def compare(current, baseline, tolerance):
+    """Return human-readable regressions of ``current`` against ``baseline``"""
+    regressions = []
+    for path, higher_is_better in REGRESSION_CHECKS:
+        old, new = baseline.get('summary', {}), current['summary']
+        for key in path:
+            old = old.get(key) if isinstance(old, dict) else None
+            new = new.get(key) if isinstance(new, dict) else None
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        if worse:
+            regressions.append(f"{'.'.join(path)}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded footage through the camera pipeline')
+    parser.add_argument('clips', nargs='+', help='Video files to replay')
+    parser.add_argument('--labels', help='Ground-truth people counts (JSON, see load_labels)')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Pace frames at the source frame rate instead of max speed')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Run detection in this many inference worker processes')
+    parser.add_argument('--no-cascade', action='store_true',
+                        help='Run the small model alone even when detector.escalation_model_path is set')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<time>_<rev>.json)')
+    parser.add_argument('--compare', help='Baseline result file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed relative change before a metric counts as a regression')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    labels = load_labels(args.labels) if args.labels else {}
+
+    loader_kwargs = Config.DETECTOR.loader_kwargs()
+    escalation_kwargs = None if args.no_cascade else Config.DETECTOR.escalation_loader_kwargs()
+    detector = inference_pool = escalation_detector = None
+    if args.workers > 0:
+        from inference_workers import InferencePool
+        inference_pool = InferencePool(args.workers, max_frame_size=Config.DETECTOR.max_frame_size,
+                                       loader_kwargs=loader_kwargs, escalation_kwargs=escalation_kwargs).start()
+    else:
+        from detector import DetectorLoader
+        detector = DetectorLoader(**loader_kwargs).start()
+        if escalation_kwargs:
+            escalation_detector = DetectorLoader(**escalation_kwargs).start()
+
+    print(f"🔄 Loading model and replaying {len(args.clips)} clip(s) "
+          f"({'real-time' if args.realtime else 'max speed'})")
+    try:
+        # Keep model loading out of the timed runs
+        if not (inference_pool.wait_ready() if inference_pool else detector.wait() is not None):
+            print("❌ Could not load the detection model")
+            return 2
+        clips = []
+        for camera_id, path in enumerate(args.clips, start=1):
+            result = run_clip(path, camera_id, detector, inference_pool, args.realtime, labels,
+                              escalation_detector)
+            clips.append(result)
+            accuracy = result.get('accuracy') or {}
+            cascade = result.get('cascade') or {}
+            print(f"📊 {result['clip']}: {result['frames']} frames, {result['throughput_fps']} FPS, "
+                  f"detect p95 {result['stages']['detect']['p95_ms']} ms"
+                  + (f", exact {accuracy['exact_match_rate']:.1%}" if accuracy else '')
+                  + (f", escalated {cascade['rate']:.1%}" if cascade.get('rate') is not None else ''))
+    finally:
+        if inference_pool is not None:
+            inference_pool.close()
+
+    revision = git_revision()
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': revision,
+        'mode': 'realtime' if args.realtime else 'max_speed',
+        'inference_workers': args.workers,
+        'model': (detector.status() if detector else inference_pool.status()),
+        'escalation_model': escalation_detector.status() if escalation_detector else None,
+        'platform': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'system': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'summary': aggregate(clips),
+        'clips': clips
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIRECTORY, f"{stamp}_{revision or 'unknown'}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ Regressions against {args.compare} (revision {baseline.get('git_revision')}):")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✅ No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# camera_connection.py - Background Camera Connection with Backoff
+
+import random
+import threading
+import time
+import logging
+from collections import deque
+
+import cv2
+
+from async_runtime import run_blocking
+
+
+def open_rtsp_capture(url):
+    """Open an RTSP stream with low-latency settings; returns a capture or None"""
+    cap = cv2.VideoCapture(url)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimal buffer
+    return cap
+
+
+class CameraConnection:
+    """Owns one camera stream on its own thread.
+
+    Connection handling is a small state machine (``connecting`` ->
+    ``connected`` -> ``backoff`` -> ``connecting`` ...) with exponential backoff
+    and jitter between attempts, so a flapping camera never blocks the
+    processing loop, the web server, or any other camera. The reader thread
+    keeps only the newest frame; ``read()`` hands it out and never waits on
+    the network for longer than its timeout.
+    """
+
+    CONNECTING = 'connecting'
+    CONNECTED = 'connected'
+    BACKOFF = 'backoff'
+    STOPPED = 'stopped'
+
+    def __init__(self, camera_id, url, opener=open_rtsp_capture, on_state_change=None, metrics=None,
+                 base_delay=2.0, max_delay=60.0, failed_reads_before_reconnect=5, lossless=False, history=0):
+        self.camera_id = camera_id
+        self.url = url
+        self.opener = opener
+        self.on_state_change = on_state_change
+        self.metrics = metrics
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failed_reads_before_reconnect = failed_reads_before_reconnect
+        # When set, the reader waits for each frame to be consumed instead of
+        # replacing it (offline replay must score every frame)
+        self.lossless = lossless
+        # Low-power reading: when > 0 the reader keeps draining the stream but
+        # only retrieves (colour-converts and hands out) one frame per interval
+        self.retrieve_interval = 0
+        # The last ``history`` (capture time, frame) pairs, for aligning this
+        # stream with another camera stream (see dual_stream.MainStream)
+        self._history = deque(maxlen=history) if history else None
+
+        self.state = self.STOPPED
+        self.attempt = 0
+        self.reconnects = 0
+        self.last_error = None
+        self.frame_shape = None
+        self._ever_connected = False
+
+        self._cap = None
+        self._frame = None
+        self._frame_time = None
+        self.read_frame_time = None
+        self._frame_seq = 0
+        self._read_seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.logger = logging.getLogger(f'CameraConnection[{camera_id}]')
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f'camera-{self.camera_id}', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._release()
+        self._set_state(self.STOPPED)
+
+    def is_connected(self):
+        return self.state == self.CONNECTED
+
+    def read(self, timeout=1.0):
+        """Return ``(True, frame)`` for the newest unseen frame, or ``(False, None)`` on timeout"""
+        with self._cond:
+            if self._frame_seq == self._read_seq:
+                self._cond.wait(timeout)
+            if self._frame_seq == self._read_seq or self._frame is None:
+                return False, None
+            self._read_seq = self._frame_seq
+            self.read_frame_time = self._frame_time
+            if self.lossless:
+                self._cond.notify_all()
+            return True, self._frame
+
+    def frame_near(self, captured_at, tolerance=0.5):
+        """The kept frame captured closest to ``captured_at`` (None if none within ``tolerance``)"""
+        if self._history is None or captured_at is None:
+            return None
+        with self._cond:
+            candidates = list(self._history)
+        if not candidates:
+            return None
+        frame_time, frame = min(candidates, key=lambda item: abs(item[0] - captured_at))
+        return frame if abs(frame_time - captured_at) <= tolerance else None
+
+    @property
+    def frame_time(self):
+        """Wall-clock time the newest frame was captured"""
+        return self._frame_time
+
+    def next_delay(self):
+        """Exponential backoff with jitter: half fixed, half random"""
+        delay = min(self.max_delay, self.base_delay * (2 ** max(self.attempt - 1, 0)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _set_state(self, state, **info):
+        if state == self.state:
+            return
+        previous, self.state = self.state, state
+        if self.on_state_change:
+            try:
+                self.on_state_change(self, previous, state, info)
+            except Exception as e:
+                self.logger.error(f"❌ Error in state change callback: {e}")
+
+    def _release(self):
+        if self._cap is not None:
+            try:
+                self._cap.release()
+            except Exception:
+                pass
+            self._cap = None
+
+    def _connect(self):
+        self.attempt += 1
+        self._set_state(self.CONNECTING, attempt=self.attempt)
+        self.logger.info(f"🔄 Connection attempt {self.attempt}")
+        try:
+            cap = run_blocking(self.opener, self.url)
+            if cap is not None:
+                ret, frame = run_blocking(cap.read)
+                if ret and frame is not None:
+                    self._cap = cap
+                    self.frame_shape = frame.shape
+                    self._publish(frame)
+                    return True
+                cap.release()
+            self.last_error = "stream opened but no frames" if cap is not None else "could not open stream"
+        except Exception as e:
+            self.last_error = str(e)
+        return False
+
+    def _publish(self, frame):
+        with self._cond:
+            if self.lossless:
+                while self._frame_seq != self._read_seq and not self._stop.is_set():
+                    self._cond.wait(0.5)
+            if self.metrics is not None and self._frame_seq != self._read_seq and self._frame is not None:
+                # The previous frame is being replaced before anyone read it
+                self.metrics.frames_dropped += 1
+            self._frame = frame
+            self._frame_time = time.time()
+            self._frame_seq += 1
+            if self._history is not None:
+                self._history.append((self._frame_time, frame))
+            self._cond.notify_all()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._connect():
+                delay = self.next_delay()
+                self.logger.warning(f"⚠️ Connection failed ({self.last_error}), retrying in {delay:.1f}s")
+                self._set_state(self.BACKOFF, reason=self.last_error, retry_in=round(delay, 1))
+                self._stop.wait(delay)
+                continue
+
+            self.logger.info(f"✅ Connected, frame size {self.frame_shape}")
+            if self._ever_connected:
+                self.reconnects += 1
+            self._ever_connected = True
+            self.attempt = 0
+            self._set_state(self.CONNECTED, frame_shape=self.frame_shape)
+
+            failures = 0
+            last_retrieve = 0.0
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                interval = self.retrieve_interval
+                if interval and hasattr(self._cap, 'grab'):
+                    if not run_blocking(self._cap.grab):
+                        ret, frame = False, None
+                    elif started - last_retrieve < interval:
+                        failures = 0
+                        continue
+                    else:
+                        ret, frame = run_blocking(self._cap.retrieve)
+                else:
+                    ret, frame = run_blocking(self._cap.read)
+                if ret and frame is not None:
+                    failures = 0
+                    last_retrieve = started
+                    if self.metrics is not None:
+                        self.metrics.stages['read'].observe(time.perf_counter() - started)
+                    self._publish(frame)
+                    continue
+                failures += 1
+                if failures >= self.failed_reads_before_reconnect:
+                    self.last_error = f"{failures} consecutive failed reads"
+                    break
+                time.sleep(0.05)
+
+            self._release()
+            if not self._stop.is_set():
+                self.logger.warning(f"⚠️ Stream lost ({self.last_error}), reconnecting")
+                self._set_state(self.BACKOFF, reason=self.last_error, retry_in=0)
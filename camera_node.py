@@ -0,0 +1,82 @@
+# camera_node.py - Camera Pipeline Node for Scale-out Deployments
+
+import json
+import logging
+
+import redis
+from flask_socketio import SocketIO
+
+from config import Config
+from logging_config import configure_logging
+from app import security_system, start_background_services
+from state_sync import redis_publisher
+from operating_modes import ViewerCount
+
+
+class CameraNode:
+    """Runs camera pipelines without a web server.
+
+    Frames and events are published to the shared message queue through a
+    write-only Socket.IO emitter, so any number of stateless web workers
+    (``NODE_ROLE=web``) can fan them out to dashboards. Start/stop commands
+    arrive on ``Config.CONTROL_CHANNEL``, along with each web worker's count
+    of connected dashboards and the stream quality rungs they are on.
+    """
+
+    def __init__(self, message_queue_url):
+        self.message_queue_url = message_queue_url
+        self.emitter = SocketIO(message_queue=message_queue_url, channel=Config.SOCKETIO_CHANNEL)
+        # State deltas go to dashboards through the queue and to web-worker mirrors
+        security_system.state.socketio = self.emitter
+        security_system.state.publisher = redis_publisher(message_queue_url, Config.STATE_CHANNEL)
+        # Viewer counts arrive from web workers; until one reports, keep encoding
+        security_system.viewers = ViewerCount()
+        self.logger = logging.getLogger('CameraNode')
+
+    def start_monitoring(self):
+        if security_system.camera_processors:
+            return
+        security_system.monitoring = True
+        cameras = security_system.start_cameras(self.emitter)
+        self.logger.info(f"🚀 Monitoring started on {cameras} camera(s)")
+
+    def stop_monitoring(self):
+        security_system.monitoring = False
+        security_system.stop_cameras()
+        self.logger.info("🛑 Monitoring stopped")
+
+    def serve_forever(self):
+        client = redis.Redis.from_url(self.message_queue_url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(Config.CONTROL_CHANNEL)
+        self.logger.info(f"📡 Waiting for commands on '{Config.CONTROL_CHANNEL}'")
+
+        for message in pubsub.listen():
+            try:
+                payload = json.loads(message['data'])
+                command = payload.get('command')
+            except (ValueError, TypeError, AttributeError):
+                continue
+            if command == 'start':
+                self.start_monitoring()
+            elif command == 'stop':
+                self.stop_monitoring()
+            elif command == 'sync_state':
+                # A web worker's mirror fell behind (or just started)
+                security_system.state.publisher({'kind': 'snapshot', 'snapshot': security_system.state.snapshot()})
+            elif command == 'viewers':
+                # Dashboards connected to one web worker; encoding stops when all report 0
+                try:
+                    security_system.viewers.set(payload['source'], payload['count'])
+                    security_system.streams.set_remote(payload['source'], payload.get('rungs'))
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+
+if __name__ == '__main__':
+    if not Config.MESSAGE_QUEUE_URL:
+        raise SystemExit("MESSAGE_QUEUE_URL must be set to run a camera node")
+
+    configure_logging()
+    start_background_services()
+    CameraNode(Config.MESSAGE_QUEUE_URL).serve_forever()
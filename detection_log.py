@@ -0,0 +1,418 @@
+# detection_log.py - Per-frame Detection Log with Time-indexed Search
+
+import os
+import json
+import time
+import queue
+import struct
+import logging
+import itertools
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# Each flush appends one block to the hour's segment file:
+#   header | frames (time, box count) | boxes (track, x1, y1, x2, y2, conf)
+# and one entry (first, last, peak count, offset) to its .idx file, so a
+# search reads the small index and only the blocks that can match
+BLOCK_MAGIC = b'VDL1'
+_BLOCK_HEADER = struct.Struct('<4sIIddH')
+_INDEX_ENTRY = struct.Struct('<ddHQ')
+FRAME_DTYPE = np.dtype([('t', '<f8'), ('count', '<u2')])
+# Coordinates are fractions of the frame scaled to 0-65535 (resolution
+# independent, like ROIs and zones); confidence is scaled to 0-255
+BOX_DTYPE = np.dtype([('track', '<u4'), ('x1', '<u2'), ('y1', '<u2'), ('x2', '<u2'), ('y2', '<u2'),
+                      ('conf', 'u1')])
+SEGMENT_TIME_FORMAT = '%Y%m%d-%H'
+_SCALE = 65535
+
+
+def points_in_polygon(xs, ys, polygon):
+    """Vectorised even-odd test of points against a polygon of ``[x, y]`` pairs"""
+    inside = np.zeros(len(xs), dtype=bool)
+    count = len(polygon)
+    for i in range(count):
+        x1, y1 = polygon[i]
+        x2, y2 = polygon[i - 1]
+        crosses = (y1 > ys) != (y2 > ys)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            at_x = (x2 - x1) * (ys - y1) / (y2 - y1) + x1
+        inside ^= crosses & (xs < at_x)
+    return inside
+
+
+class BoxTracker:
+    """Gives people stable IDs from frame to frame by greedy IoU matching.
+
+    Good enough to tell "the same two people for a minute" from "people
+    coming and going" in the detection log; it is not a re-identification
+    tracker. A track is dropped after ``max_missed`` frames without a match.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self._tracks = {}   # id -> (box, missed)
+        self._next_id = 1
+
+    @staticmethod
+    def iou(a, b):
+        ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+        iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+        inter = ix * iy
+        union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+        return inter / union if union > 0 else 0.0
+
+    def update(self, boxes):
+        """Track IDs for ``boxes``, in order"""
+        pairs = sorted(((self.iou(box, tracked), i, track_id)
+                        for i, box in enumerate(boxes)
+                        for track_id, (tracked, _) in self._tracks.items()), reverse=True)
+        ids = [None] * len(boxes)
+        matched = set()
+        for overlap, i, track_id in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if ids[i] is None and track_id not in matched:
+                ids[i] = track_id
+                matched.add(track_id)
+        for track_id, (tracked, missed) in list(self._tracks.items()):
+            if track_id not in matched:
+                if missed + 1 > self.max_missed:
+                    del self._tracks[track_id]
+                else:
+                    self._tracks[track_id] = (tracked, missed + 1)
+        for i, box in enumerate(boxes):
+            if ids[i] is None:
+                ids[i] = self._next_id
+                self._next_id += 1
+            self._tracks[ids[i]] = (box, 0)
+        return ids
+
+
+class DetectionLog:
+    """Append-only per-camera log of every frame's detections.
+
+    Cameras hand over ``(time, boxes, track ids)`` per processed frame;
+    a writer thread batches them and appends one columnar block per camera
+    every ``flush_seconds`` (or ``max_batch`` frames), so the processing
+    loop never touches the disk. Segments are hourly files under
+    ``directory/camera_<id>/``. ``search`` answers questions like "when were
+    there 3+ people in this zone" from the time index and block peaks,
+    without decoding any video, and links each match to the violation clips
+    recorded over it.
+    """
+
+    def __init__(self, directory='detection_log', flush_seconds=2.0, max_batch=256):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.max_batch = max_batch
+        self.frames_logged = 0
+        self.blocks_written = 0
+        self.frames_dropped = 0
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('DetectionLog')
+
+    # ---- writing ----
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name='detection-log', daemon=True)
+            self._thread.start()
+        return self
+
+    def append(self, camera_id, timestamp, boxes, track_ids, shape):
+        """Queue one frame's detections (pixel boxes on a frame of ``shape``); never blocks"""
+        try:
+            self._queue.put_nowait((camera_id, timestamp, boxes, track_ids, shape[:2]))
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def mark_clip(self, camera_id, clip_path, start, end):
+        """Remember that ``clip_path`` covers ``[start, end]`` so searches can link to it"""
+        try:
+            self._queue.put((camera_id, None, clip_path, start, end), timeout=1.0)
+        except queue.Full:
+            self.logger.warning(f"⚠️ Detection log queue full, clip {clip_path} not linked")
+
+    def close(self):
+        """Flush everything queued and stop the writer"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _camera_dir(self, camera_id):
+        return os.path.join(self.directory, f'camera_{camera_id}')
+
+    def _run(self):
+        batches = {}
+        oldest = None
+        while True:
+            timeout = None if oldest is None else max(oldest + self.flush_seconds - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                self._flush(batches)
+                return
+            if item:
+                camera_id = item[0]
+                if item[1] is None:
+                    self._write_clip(*item)
+                else:
+                    batch = batches.setdefault(camera_id, [])
+                    batch.append(item[1:])
+                    if oldest is None:
+                        oldest = time.monotonic()
+                    if len(batch) >= self.max_batch:
+                        self._flush({camera_id: batches.pop(camera_id)})
+            if oldest is not None and time.monotonic() - oldest >= self.flush_seconds:
+                self._flush(batches)
+                batches = {}
+                oldest = None
+
+    def _flush(self, batches):
+        for camera_id, frames in batches.items():
+            if frames:
+                try:
+                    self._write_block(camera_id, frames)
+                except Exception as e:
+                    self.logger.error(f"❌ Could not write detections for camera {camera_id}: {e}")
+
+    def _write_block(self, camera_id, frames):
+        frame_rows = np.zeros(len(frames), dtype=FRAME_DTYPE)
+        box_rows = np.zeros(sum(len(boxes) for _, boxes, _, _ in frames), dtype=BOX_DTYPE)
+        b = 0
+        for i, (timestamp, boxes, track_ids, (height, width)) in enumerate(frames):
+            frame_rows[i] = (timestamp, len(boxes))
+            for box, track_id in zip(boxes, track_ids):
+                box_rows[b] = (track_id,
+                               min(max(box[0] / width, 0), 1) * _SCALE, min(max(box[1] / height, 0), 1) * _SCALE,
+                               min(max(box[2] / width, 0), 1) * _SCALE, min(max(box[3] / height, 0), 1) * _SCALE,
+                               min(max(box[4], 0), 1) * 255)
+                b += 1
+
+        first, last = float(frame_rows['t'][0]), float(frame_rows['t'][-1])
+        peak = int(frame_rows['count'].max())
+        directory = self._camera_dir(camera_id)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, datetime.fromtimestamp(first).strftime(SEGMENT_TIME_FORMAT))
+        with self._lock:
+            with open(base + '.vdl', 'ab') as f:
+                offset = f.tell()
+                f.write(_BLOCK_HEADER.pack(BLOCK_MAGIC, len(frame_rows), len(box_rows), first, last, peak))
+                f.write(frame_rows.tobytes())
+                f.write(box_rows.tobytes())
+            # The index entry goes last: a block is searchable only once complete
+            with open(base + '.idx', 'ab') as f:
+                f.write(_INDEX_ENTRY.pack(first, last, peak, offset))
+        self.frames_logged += len(frame_rows)
+        self.blocks_written += 1
+
+    def _write_clip(self, camera_id, _, clip_path, start, end):
+        directory = self._camera_dir(camera_id)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'clips.jsonl'), 'a') as f:
+            f.write(json.dumps({'clip_path': clip_path, 'start': start, 'end': end}) + '\n')
+
+    # ---- reading ----
+
+    def _segments(self, camera_id, start, end):
+        """``[(hour_start, base_path), ...]`` whose hour can hold frames in ``[start, end]``"""
+        directory = self._camera_dir(camera_id)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return []
+        found = []
+        for name in names:
+            if not name.endswith('.idx'):
+                continue
+            try:
+                hour = datetime.strptime(name[:-4], SEGMENT_TIME_FORMAT).timestamp()
+            except ValueError:
+                continue
+            # A block is filed under the hour of its first frame; allow for
+            # one that started just before the hour ended
+            if (end is None or hour <= end) and (start is None or hour + 3600 + 60 * self.flush_seconds >= start):
+                found.append((hour, os.path.join(directory, name[:-4])))
+        return sorted(found)
+
+    def _blocks(self, camera_id, start, end, min_peak=0, stats=None):
+        """Decoded ``(frames, boxes)`` blocks overlapping ``[start, end]`` with a peak of at least ``min_peak``"""
+        for _, base in self._segments(camera_id, start, end):
+            try:
+                with open(base + '.idx', 'rb') as f:
+                    index = f.read()
+            except OSError:
+                continue
+            entries = [_INDEX_ENTRY.unpack_from(index, pos)
+                       for pos in range(0, len(index) - _INDEX_ENTRY.size + 1, _INDEX_ENTRY.size)]
+            wanted = [offset for first, last, peak, offset in entries
+                      if (end is None or first <= end) and (start is None or last >= start) and peak >= min_peak]
+            if stats is not None:
+                stats['blocks_skipped'] += len(entries) - len(wanted)
+            if not wanted:
+                continue
+            with open(base + '.vdl', 'rb') as f:
+                for offset in wanted:
+                    f.seek(offset)
+                    magic, n_frames, n_boxes, _, _, _ = _BLOCK_HEADER.unpack(f.read(_BLOCK_HEADER.size))
+                    if magic != BLOCK_MAGIC:
+                        self.logger.warning(f"⚠️ Corrupt block at {base}.vdl:{offset}")
+                        continue
+                    frames = np.frombuffer(f.read(n_frames * FRAME_DTYPE.itemsize), dtype=FRAME_DTYPE)
+                    boxes = np.frombuffer(f.read(n_boxes * BOX_DTYPE.itemsize), dtype=BOX_DTYPE)
+                    if stats is not None:
+                        stats['blocks_read'] += 1
+                        stats['frames_scanned'] += n_frames
+                    yield frames, boxes
+
+    @staticmethod
+    def _inside(boxes, zone):
+        """Which boxes have their feet (bottom centre) inside ``zone``; None when there is no zone"""
+        if zone is None:
+            return None
+        feet_x = (boxes['x1'].astype(np.float64) + boxes['x2']) / (2 * _SCALE)
+        feet_y = boxes['y2'] / float(_SCALE)
+        return points_in_polygon(feet_x, feet_y, zone)
+
+    @staticmethod
+    def _counts(frames, inside):
+        """People per frame, only counting boxes flagged ``inside`` when given"""
+        if inside is None:
+            return frames['count'].astype(np.int64)
+        owner = np.repeat(np.arange(len(frames)), frames['count'])
+        return np.bincount(owner, weights=inside, minlength=len(frames)).astype(np.int64)
+
+    def clips(self, camera_id, start=None, end=None):
+        """Violation clips recorded on this camera overlapping ``[start, end]``"""
+        found = []
+        try:
+            with open(os.path.join(self._camera_dir(camera_id), 'clips.jsonl')) as f:
+                for line in f:
+                    try:
+                        clip = json.loads(line)
+                    except ValueError:
+                        continue
+                    if (end is None or clip['start'] <= end) and (start is None or clip['end'] >= start):
+                        found.append(clip)
+        except OSError:
+            pass
+        return found
+
+    def search(self, camera_id, start=None, end=None, min_people=1, max_people=None, zone=None, gap=2.0,
+               limit=500):
+        """Time ranges where the (zone) people count was within ``[min_people, max_people]``.
+
+        Matching frames less than ``gap`` seconds apart are merged into one
+        range. Each range carries its peak count, the track IDs seen and
+        the clips recorded over it.
+        """
+        started = time.perf_counter()
+        stats = {'blocks_read': 0, 'blocks_skipped': 0, 'frames_scanned': 0}
+        matches = []
+        current = None
+        for frames, boxes in self._blocks(camera_id, start, end, min_peak=min_people, stats=stats):
+            inside = self._inside(boxes, zone)
+            counts = self._counts(frames, inside)
+            keep = counts >= min_people
+            if max_people is not None:
+                keep &= counts <= max_people
+            if start is not None:
+                keep &= frames['t'] >= start
+            if end is not None:
+                keep &= frames['t'] <= end
+            if not keep.any():
+                continue
+            # Split the matching frames into runs at gaps, all in numpy
+            kept = np.flatnonzero(keep)
+            times = frames['t'][kept]
+            breaks = np.flatnonzero(np.diff(times) > gap) + 1
+            run_starts = np.concatenate(([0], breaks))
+            run_of_frame = np.full(len(frames), -1)
+            run_of_frame[kept] = np.repeat(np.arange(len(run_starts)), np.diff(np.append(run_starts, len(kept))))
+            run_of_box = np.repeat(run_of_frame, frames['count'])
+            if inside is not None:
+                # Only people in the zone belong to a zone match
+                run_of_box[~inside] = -1
+            peaks = np.maximum.reduceat(counts[kept], run_starts)
+            lengths = np.diff(np.append(run_starts, len(kept)))
+            for run, first in enumerate(run_starts):
+                last = first + lengths[run] - 1
+                tracks = set(np.unique(boxes['track'][run_of_box == run]).tolist())
+                if current is not None and times[first] - current['end'] <= gap:
+                    current['end'] = float(times[last])
+                    current['frames'] += int(lengths[run])
+                    current['peak'] = max(current['peak'], int(peaks[run]))
+                    current['tracks'].update(tracks)
+                    continue
+                if current is not None:
+                    matches.append(current)
+                    if len(matches) >= limit:
+                        break
+                current = {'start': float(times[first]), 'end': float(times[last]), 'frames': int(lengths[run]),
+                           'peak': int(peaks[run]), 'tracks': tracks}
+            if len(matches) >= limit:
+                current = None
+                break
+        if current is not None:
+            matches.append(current)
+
+        clips = self.clips(camera_id, start, end) if matches else []
+        for match in matches:
+            match['tracks'] = sorted(match['tracks'])
+            match['clips'] = [c['clip_path'] for c in clips
+                              if c['start'] <= match['end'] and c['end'] >= match['start']]
+        return dict(stats, matches=matches, elapsed_ms=round((time.perf_counter() - started) * 1000, 2))
+
+    def frames(self, camera_id, start, end, limit=1000):
+        """Raw logged detections in ``[start, end]``: ``[{time, people: [{track, box, conf}]}]``"""
+        return list(itertools.islice(self.iter_frames(camera_id, start, end), limit))
+
+    def iter_frames(self, camera_id, start=None, end=None):
+        """``frames()`` as a generator, one block in memory at a time (for bulk export)"""
+        for frames, boxes in self._blocks(camera_id, start, end):
+            box_ends = np.cumsum(frames['count'])
+            keep = np.ones(len(frames), dtype=bool)
+            if start is not None:
+                keep &= frames['t'] >= start
+            if end is not None:
+                keep &= frames['t'] <= end
+            for i in np.flatnonzero(keep):
+                people = boxes[box_ends[i] - frames['count'][i]:box_ends[i]]
+                yield {
+                    'time': float(frames['t'][i]),
+                    'people': [{'track': int(p['track']),
+                                'box': [round(int(p[k]) / _SCALE, 4) for k in ('x1', 'y1', 'x2', 'y2')],
+                                'conf': round(int(p['conf']) / 255, 3)} for p in people]
+                }
+
+    def prune(self, days):
+        """Delete segments whose hour ended more than ``days`` ago; returns how many"""
+        cutoff = time.time() - days * 86400
+        removed = 0
+        for camera in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+            for hour, base in self._segments(camera.split('_', 1)[-1], None, cutoff - 3600):
+                with self._lock:
+                    for path in (base + '.idx', base + '.vdl'):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                removed += 1
+        return removed
+
+    def status(self):
+        return {
+            'frames_logged': self.frames_logged,
+            'blocks_written': self.blocks_written,
+            'frames_dropped': self.frames_dropped,
+            'queued': self._queue.qsize()
+        }
@@ -0,0 +1,197 @@
+# detector.py - Background YOLO Loading & Warm-up
+
+import os
+import re
+import shutil
+import threading
+import time
+import logging
+
+from async_runtime import run_blocking
+
+
+class DetectorLoader:
+    """Load the YOLO person detector off the request path and keep it warm.
+
+    The heavy ``ultralytics``/``torch`` imports happen inside the loader
+    thread, so importing this module (or ``app``) stays cheap. When a
+    TorchScript export of the model exists in ``cache_dir`` it is loaded
+    instead of the ``.pt`` checkpoint: it is already fused and skips the
+    layer-fusion pass, which is most of YOLO's construction time.
+    """
+
+    def __init__(self, model_path='yolov8n.pt', fallback_path='yolov8s.pt',
+                 cache_dir='model_cache', warmup_runs=2, warmup_size=(640, 640),
+                 export_cache=True):
+        self.model_path = model_path
+        self.fallback_path = fallback_path
+        self.cache_dir = cache_dir
+        self.warmup_runs = warmup_runs
+        self.warmup_size = warmup_size
+        self.export_cache = export_cache
+
+        self.model = None
+        self.error = None
+        self.source = None
+        self.load_seconds = None
+        self._ready = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('DetectorLoader')
+
+    def start(self):
+        """Start loading in a daemon thread (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=run_blocking, args=(self._load,),
+                                                name='detector-loader', daemon=True)
+                self._thread.start()
+        return self
+
+    def is_ready(self):
+        return self._ready.is_set() and self.model is not None
+
+    def wait(self, timeout=None):
+        """Block until loading finished; returns the model or None on failure"""
+        self.start()
+        self._ready.wait(timeout)
+        return self.model
+
+    def status(self):
+        """Loader state for the status/health endpoints"""
+        if not self._ready.is_set():
+            state = 'loading' if self._thread else 'idle'
+        else:
+            state = 'ready' if self.model is not None else 'failed'
+        return {
+            'state': state,
+            'source': self.source,
+            'load_seconds': self.load_seconds,
+            'error': self.error
+        }
+
+    def _cache_path(self, model_path):
+        """Where the export of ``model_path`` lives, or None if the checkpoint isn't on disk.
+
+        The name carries the checkpoint's size and mtime and the export
+        image size, so a replaced model or a new ``warmup_size`` misses the
+        old export and is re-exported instead of silently reusing it.
+        """
+        try:
+            info = os.stat(model_path)
+        except OSError:
+            return None
+        stem = os.path.splitext(os.path.basename(model_path))[0]
+        key = f"{info.st_size}-{int(info.st_mtime)}-{max(self.warmup_size)}"
+        return os.path.join(self.cache_dir, f"{stem}-{key}.torchscript")
+
+    def _load(self):
+        started = time.time()
+        try:
+            from ultralytics import YOLO
+
+            for path in (self.model_path, self.fallback_path):
+                if not path:
+                    continue
+                cached = self._cache_path(path)
+                try:
+                    if cached and os.path.exists(cached):
+                        self.logger.info(f"🔄 Loading cached detector {cached}...")
+                        self.model = YOLO(cached, task='detect')
+                        self.source = cached
+                    else:
+                        self.logger.info(f"🔄 Loading YOLO model {path}...")
+                        self.model = YOLO(path)
+                        self.source = path
+                    break
+                except Exception as e:
+                    self.logger.error(f"❌ Error loading YOLO model {path}: {e}")
+                    self.model = None
+
+            if self.model is None:
+                raise RuntimeError("Could not load any YOLO model")
+
+            self._warm_up()
+            self.load_seconds = round(time.time() - started, 3)
+            self.logger.info(f"✅ Detector ready in {self.load_seconds}s ({self.source})")
+        except Exception as e:
+            self.error = str(e)
+            self.model = None
+            self.logger.error(f"❌ Detector failed to load: {e}")
+        finally:
+            self._ready.set()
+
+        # Export after signalling readiness so the next boot can skip fusing
+        if (self.export_cache and self.model is not None and self.source
+                and not self.source.endswith('.torchscript')):
+            self._export_cache(self.source)
+
+    def _warm_up(self):
+        """Run dummy inference so the first real frame doesn't pay for lazy init"""
+        import numpy as np
+
+        dummy = np.zeros((self.warmup_size[1], self.warmup_size[0], 3), dtype=np.uint8)
+        for _ in range(max(self.warmup_runs, 0)):
+            self.model(dummy, classes=[0], verbose=False)
+
+    def _export_cache(self, model_path):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            from ultralytics import YOLO
+
+            cached = self._cache_path(model_path)
+            if cached is None:
+                return
+            exported = YOLO(model_path).export(format='torchscript', imgsz=max(self.warmup_size))
+            if exported and os.path.exists(exported):
+                shutil.move(exported, cached)
+                self.logger.info(f"💾 Cached fused detector at {cached}")
+                self._remove_stale_exports(model_path, cached)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Could not cache fused detector: {e}")
+
+    def _remove_stale_exports(self, model_path, current):
+        """Drop exports of earlier versions of ``model_path`` (other size/mtime/imgsz)"""
+        stem = os.path.splitext(os.path.basename(model_path))[0]
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if path != current and re.fullmatch(rf"{re.escape(stem)}(-\d+-\d+-\d+)?\.torchscript", name):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def extract_person_boxes(results):
+    """Flatten YOLO results into plain ``(x1, y1, x2, y2, conf)`` tuples.
+
+    Plain tuples are cheap to send between processes and keep the rest of
+    the pipeline independent of ultralytics/torch types.
+    """
+    people_boxes = []
+    if results and len(results) > 0:
+        boxes = results[0].boxes
+        if boxes is not None and len(boxes) > 0:
+            xyxy = boxes.xyxy.cpu().numpy()
+            conf = boxes.conf.cpu().numpy()
+            cls = boxes.cls.cpu().numpy()
+            for (x1, y1, x2, y2), c, k in zip(xyxy, conf, cls):
+                if int(k) == 0:  # Person class
+                    people_boxes.append((float(x1), float(y1), float(x2), float(y2), float(c)))
+    return people_boxes
+
+
+def escalation_reason(boxes, threshold, margin, required_people, access_granted, triggers):
+    """Why the cascade's large model should re-check this frame (None = small model is trusted).
+
+    ``boxes`` are the small model's detections down to ``threshold - margin``;
+    ``access_granted`` is the camera's current decision (None before the first).
+    """
+    if 'confidence' in triggers and any(abs(box[4] - threshold) <= margin for box in boxes):
+        return 'confidence'
+    count = sum(1 for box in boxes if box[4] >= threshold)
+    if 'decision_change' in triggers and (count == required_people) != access_granted:
+        return 'decision_change'
+    if 'boundary' in triggers and abs(count - required_people) <= 1:
+        return 'boundary'
+    return None
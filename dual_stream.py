@@ -0,0 +1,249 @@
+# dual_stream.py - Substream Detection with On-Demand Main Stream and Remuxed Recording
+
+import os
+import time
+import random
+import logging
+import threading
+import subprocess
+from datetime import datetime
+
+from camera_connection import CameraConnection, open_rtsp_capture
+
+SEGMENT_TIME_FORMAT = '%Y%m%d-%H%M%S'
+
+
+def scale_boxes(boxes, from_shape, to_shape):
+    """Map ``[x1, y1, x2, y2, conf]`` boxes from one frame size to another"""
+    sy = to_shape[0] / from_shape[0]
+    sx = to_shape[1] / from_shape[1]
+    if sx == 1 and sy == 1:
+        return boxes
+    return [[x1 * sx, y1 * sy, x2 * sx, y2 * sy, conf] for x1, y1, x2, y2, conf in boxes]
+
+
+class MainStream:
+    """A camera's full-resolution stream, decoded only while something needs it.
+
+    Detection runs on the low-resolution substream. Recording and full-view
+    streaming ask for the main-stream frame that arrived closest to each
+    detection frame. The connection opens on the first request and closes
+    again after ``linger`` seconds without one, so an unused main stream
+    costs nothing to decode.
+    """
+
+    def __init__(self, camera_id, url, opener=open_rtsp_capture, linger=10.0, tolerance=0.5, history=8):
+        self.camera_id = camera_id
+        self.url = url
+        self.opener = opener
+        self.linger = linger
+        self.tolerance = tolerance
+        self.history = history
+        self.connection = None
+        self.last_wanted = None
+        self.frames_served = 0
+        self.frames_missed = 0
+        self.logger = logging.getLogger(f'MainStream[{camera_id}]')
+
+    def frame_at(self, captured_at):
+        """Main-stream frame aligned with a substream frame, or None while (re)connecting"""
+        self.last_wanted = time.time()
+        if self.connection is None:
+            self.logger.info("📡 Opening main stream")
+            self.connection = CameraConnection(f'{self.camera_id}-main', self.url, opener=self.opener,
+                                               history=self.history).start()
+            return None
+        if self.connection.url != self.url:
+            self.connection.url = self.url
+        frame = self.connection.frame_near(captured_at, self.tolerance)
+        if frame is None:
+            self.frames_missed += 1
+        else:
+            self.frames_served += 1
+        return frame
+
+    def tick(self, now=None):
+        """Close the main stream once nothing has asked for it for ``linger`` seconds"""
+        now = now or time.time()
+        if self.connection is not None and now - self.last_wanted > self.linger:
+            self.logger.info("💤 Main stream unused, closing")
+            self.close()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.stop()
+            self.connection = None
+
+    def status(self):
+        return {
+            'open': self.connection is not None,
+            'state': self.connection.state if self.connection else None,
+            'frames_served': self.frames_served,
+            'frames_missed': self.frames_missed
+        }
+
+
+class SegmentRecorder:
+    """Remuxes the main stream into short MPEG-TS segments with ``ffmpeg -c copy``.
+
+    Nothing is decoded, so recording costs almost no CPU at any resolution.
+    Each segment's file name is its wall-clock start time. That is how a
+    violation (timed on the detection stream) is matched to the footage: its
+    clip is cut from the segments that overlap it, plus ``preroll`` seconds,
+    once those segments are closed. Segments older than ``keep_minutes`` are
+    deleted.
+    """
+
+    def __init__(self, camera_id, url, directory, segment_seconds=10, keep_minutes=15, preroll=3.0,
+                 ffmpeg='ffmpeg'):
+        self.camera_id = camera_id
+        self.url = url
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.keep_minutes = keep_minutes
+        self.preroll = preroll
+        self.ffmpeg = ffmpeg
+        self.restarts = 0
+        self.last_error = None
+        self._process = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.logger = logging.getLogger(f'SegmentRecorder[{camera_id}]')
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name=f'segments-{self.camera_id}', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def command(self):
+        cmd = [self.ffmpeg, '-nostdin', '-loglevel', 'error']
+        if self.url.startswith('rtsp://'):
+            cmd += ['-rtsp_transport', 'tcp']
+        return cmd + [
+            '-i', self.url,
+            '-map', '0:v', '-c', 'copy',
+            '-f', 'segment', '-segment_time', str(self.segment_seconds), '-segment_format', 'mpegts',
+            '-reset_timestamps', '1', '-strftime', '1',
+            os.path.join(self.directory, f'{SEGMENT_TIME_FORMAT}.ts')
+        ]
+
+    def _run(self):
+        delay = 2.0
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self._process = subprocess.Popen(self.command(), stdin=subprocess.DEVNULL,
+                                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            except OSError as e:
+                self.last_error = str(e)
+                self.logger.error(f"❌ Could not start ffmpeg: {e}")
+            else:
+                self.logger.info(f"📼 Remuxing main stream into {self.directory}")
+                while not self._stop.wait(self.segment_seconds):
+                    self.prune()
+                    if self._process.poll() is not None:
+                        break
+                if self._stop.is_set():
+                    return
+                self.last_error = (self._process.stderr.read() or b'').decode(errors='replace').strip()[-300:]
+                self.logger.warning(f"⚠️ ffmpeg exited ({self.last_error or self._process.returncode})")
+            self.restarts += 1
+            # Back off while the stream keeps failing, reset after a good run
+            delay = 2.0 if time.time() - started > 60 else min(delay * 2, 60.0)
+            self._stop.wait(delay / 2 + random.uniform(0, delay / 2))
+
+    def segments(self):
+        """``[(start_time, path), ...]`` oldest first"""
+        found = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return found
+        for name in names:
+            if not name.endswith('.ts'):
+                continue
+            try:
+                start = datetime.strptime(name[:-3], SEGMENT_TIME_FORMAT).timestamp()
+            except ValueError:
+                continue
+            found.append((start, os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def prune(self):
+        cutoff = time.time() - self.keep_minutes * 60
+        for start, path in self.segments()[:-1]:
+            if start < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def export(self, start, end, output_path, on_done=None):
+        """Cut ``[start - preroll, end]`` into ``output_path`` once those segments are closed.
+
+        Runs on its own thread; ``on_done(ok)`` is called when the clip is written.
+        """
+        def run():
+            # The segment holding `end` is finalised when the next one opens
+            self._stop.wait(max(end + self.segment_seconds + 1 - time.time(), 0))
+            ok = self._cut(start - self.preroll, end, output_path)
+            if on_done is not None:
+                on_done(ok)
+
+        threading.Thread(target=run, name=f'clip-export-{self.camera_id}', daemon=True).start()
+
+    def _cut(self, start, end, output_path):
+        segments = self.segments()
+        chosen = []
+        for i, (seg_start, path) in enumerate(segments):
+            seg_end = segments[i + 1][0] if i + 1 < len(segments) else time.time()
+            if seg_start < end and seg_end > start:
+                chosen.append((seg_start, path))
+        if not chosen:
+            self.logger.error(f"❌ No main-stream segments cover {output_path}")
+            return False
+
+        list_path = output_path + '.segments.txt'
+        with open(list_path, 'w') as f:
+            for _, path in chosen:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        offset = max(start - chosen[0][0], 0)
+        cmd = [self.ffmpeg, '-nostdin', '-loglevel', 'error', '-y', '-f', 'concat', '-safe', '0',
+               '-i', list_path, '-ss', f'{offset:.2f}', '-t', f'{end - start:.2f}',
+               '-c', 'copy', '-movflags', '+faststart', output_path]
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=120)
+            if result.returncode != 0:
+                self.logger.error(f"❌ Clip export failed: {result.stderr.decode(errors='replace')[-300:]}")
+                return False
+            return True
+        except (OSError, subprocess.TimeoutExpired) as e:
+            self.logger.error(f"❌ Clip export failed: {e}")
+            return False
+        finally:
+            try:
+                os.remove(list_path)
+            except OSError:
+                pass
+
+    def status(self):
+        segments = self.segments()
+        return {
+            'running': self._process is not None and self._process.poll() is None,
+            'segments': len(segments),
+            'oldest': segments[0][0] if segments else None,
+            'restarts': self.restarts,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,354 @@
+# edge_agent.py - Capture and Detection Next to the Camera
+
+import os
+import time
+import logging
+import threading
+
+from config import Config
+from logging_config import configure_logging
+from app import security_system, start_background_services
+from edge_protocol import Connection, Spool, encode, encode_record, PROTOCOL_VERSION
+from events import Sink
+
+# Clips travel to the central server in pieces of this size
+CLIP_CHUNK = 256 * 1024
+# Detections are batched into one message per camera this often (seconds)
+DETECTION_BATCH_SECONDS = 1.0
+
+
+def _scaled(value, size):
+    return int(min(max(value / size, 0.0), 1.0) * 65535)
+
+
+class EdgeEmitter:
+    """Stands in for Socket.IO on an edge: no video leaves unless a thumbnail is asked for"""
+
+    # Forwarded as they happen; dropped while the link is down
+    LIVE_EVENTS = ('monitoring_progress', 'camera_connected', 'camera_disconnected')
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def emit(self, event, data=None, **kwargs):
+        if event == 'video_frame':
+            self.agent.frame_ready(data)
+        elif event in self.LIVE_EVENTS:
+            self.agent.send_live(event, data)
+
+
+class EdgeSink(Sink):
+    """Forwards the edge's alerts to the central event bus"""
+
+    name = 'edge'
+
+    def __init__(self, agent, **kwargs):
+        super().__init__(**kwargs)
+        self.agent = agent
+
+    def deliver(self, event):
+        self.agent.send_reliable({
+            't': 'event', 'type': event.type, 'data': event.data, 'camera_id': event.camera_id,
+            'priority': event.priority, 'key': event.key, 'cooldown': event.cooldown,
+            'created_at': event.created_at, 'occurrences': event.occurrences
+        })
+
+
+class DetectionForwarder:
+    """Takes the detection log's place: keeps the local log (if enabled) and
+    batches every frame's boxes, scaled to 0-65535, for the central one"""
+
+    def __init__(self, agent, local=None):
+        self.agent = agent
+        self.local = local
+        self.frames_forwarded = 0
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.local is not None:
+            self.local.start()
+        return self
+
+    def append(self, camera_id, timestamp, boxes, track_ids, shape):
+        if self.local is not None:
+            self.local.append(camera_id, timestamp, boxes, track_ids, shape)
+        height, width = shape[:2]
+        flat = []
+        for box, track_id in zip(boxes, track_ids):
+            flat += [_scaled(box[0], width), _scaled(box[1], height), _scaled(box[2], width),
+                     _scaled(box[3], height), int(min(max(box[4], 0.0), 1.0) * 255), int(track_id)]
+        with self._lock:
+            self._frames.setdefault(camera_id, []).append([round(timestamp, 3), flat])
+
+    def mark_clip(self, camera_id, clip_path, start, end):
+        if self.local is not None:
+            self.local.mark_clip(camera_id, clip_path, start, end)
+        self.agent.send_reliable({'t': 'clip', 'camera_id': camera_id, 'clip_path': clip_path,
+                                  'start': start, 'end': end})
+
+    def flush(self):
+        with self._lock:
+            frames, self._frames = self._frames, {}
+        for camera_id, batch in frames.items():
+            self.agent.send_reliable({'t': 'detections', 'camera_id': camera_id, 'frames': batch})
+            self.frames_forwarded += len(batch)
+
+    def close(self):
+        self.flush()
+        if self.local is not None:
+            self.local.close()
+
+    def prune(self, days):
+        return self.local.prune(days) if self.local is not None else 0
+
+    def status(self):
+        return dict(self.local.status() if self.local is not None else {},
+                    frames_forwarded=self.frames_forwarded)
+
+
+class EdgeAgent:
+    """Runs this site's cameras and reports to a central aggregator.
+
+    Capture, detection, recording and the local alarm all happen here, as
+    in a single-process install. What crosses the WAN is small: camera
+    state changes, violations, alerts and per-frame boxes, each appended to
+    a disk spool with a sequence number before it is sent. The central
+    server acknowledges what it has applied; after an outage (or a restart
+    of either side) everything unacknowledged is sent again, in order.
+    Live video is not streamed: the central server asks for a thumbnail or
+    a violation clip when somebody wants to see one.
+    """
+
+    def __init__(self, edge_id, central, token='', spool_directory='edge_spool', spool_max_mb=512,
+                 forward_detections=True):
+        self.edge_id = edge_id
+        self.central = central
+        self.token = token
+        self.spool = Spool(os.path.join(spool_directory, edge_id), spool_max_mb * 1024 * 1024)
+        self.connection = None
+        self.acked = 0
+        self.connects = 0
+        self.last_heard = 0.0
+        self._wake = threading.Event()
+        self._thumbnails = {}   # camera id -> [threading.Event, jpeg bytes]
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('EdgeAgent')
+
+        self.emitter = EdgeEmitter(self)
+        security_system.state.socketio = self.emitter
+        security_system.state.publisher = self.publish_state
+        # Frames are only encoded while a thumbnail request is waiting
+        security_system.viewers.set('edge', 0)
+        security_system.events.add_sink(EdgeSink(self))
+        self.detections = None
+        if forward_detections:
+            self.detections = DetectionForwarder(self, security_system.detection_log)
+            security_system.detection_log = self.detections
+
+    # ---- outgoing ----
+
+    def publish_state(self, message):
+        """``StateStore.publisher``: camera changes and violations go to the central server"""
+        delta = message.get('delta') or {}
+        if delta.get('type') == 'camera':
+            self.send_reliable({'t': 'camera', 'camera_id': int(delta['camera_id']), 'changes': delta['changes']})
+        elif delta.get('type') == 'violation':
+            self.send_reliable({'t': 'violation', 'camera_id': int(delta.get('camera_id', Config.CAMERA.id)),
+                                'row': delta['row']})
+
+    def send_reliable(self, message):
+        """Spool a message; it is sent (again, if need be) until the central server acknowledges it"""
+        self.spool.append(encode(message))
+        self._wake.set()
+
+    def send_live(self, event, data):
+        connection = self.connection
+        if connection is not None:
+            try:
+                connection.send({'t': 'live', 'event': event, 'data': data})
+            except OSError:
+                pass
+
+    def _flush_detections(self):
+        while True:
+            time.sleep(DETECTION_BATCH_SECONDS)
+            try:
+                self.detections.flush()
+            except Exception as e:
+                self.logger.error(f"❌ Could not spool detections: {e}")
+
+    # ---- link ----
+
+    def run_link(self):
+        """Connect to the central server, replay the spool, stream; reconnect with backoff"""
+        delay = 1.0
+        while True:
+            try:
+                connection = Connection.connect(self.central)
+            except OSError as e:
+                self.logger.warning(f"⚠️ Central server {self.central} unreachable ({e}), retrying in {delay:.0f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            try:
+                connection.send({'t': 'hello', 'edge': self.edge_id, 'token': self.token,
+                                 'version': PROTOCOL_VERSION, 'epoch': self.spool.epoch,
+                                 'cameras': [camera.id for camera in Config.enabled_cameras()]})
+                welcome = connection.recv()
+                if not welcome or welcome.get('t') != 'welcome':
+                    raise ConnectionError((welcome or {}).get('error', 'connection closed during handshake'))
+                delay = 1.0
+                self.connects += 1
+                self.acked = welcome['acked']
+                self.spool.trim(self.acked)
+                self.logger.info(f"✅ Connected to central server {self.central}; "
+                                 f"{self.spool.seq - self.acked} message(s) to catch up")
+                self.connection = connection
+                self._stream(connection, self.acked)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"⚠️ Link to central server lost: {e}")
+            finally:
+                self.connection = None
+                connection.close()
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def _stream(self, connection, sent, ping_interval=10.0, silence_timeout=35.0):
+        alive = threading.Event()
+        alive.set()
+        self.last_heard = time.time()
+        threading.Thread(target=self._receive, args=(connection, alive), name='edge-receiver', daemon=True).start()
+        last_ping = time.monotonic()
+        while alive.is_set():
+            for seq, payload in self.spool.after(sent, limit=500):
+                connection.send_raw(encode_record(seq, payload))
+                sent = seq
+            if time.monotonic() - last_ping >= ping_interval:
+                connection.send({'t': 'ping'})
+                last_ping = time.monotonic()
+            if time.time() - self.last_heard > silence_timeout:
+                raise ConnectionError("central server stopped answering")
+            if sent >= self.spool.seq:
+                self._wake.wait(1.0)
+                self._wake.clear()
+
+    def _receive(self, connection, alive):
+        try:
+            while True:
+                message = connection.recv()
+                if message is None:
+                    break
+                self.last_heard = time.time()
+                kind = message.get('t')
+                if kind == 'ack':
+                    self.acked = message['seq']
+                    self.spool.trim(self.acked)
+                elif kind == 'command':
+                    self.handle_command(message.get('command'))
+                elif kind == 'request':
+                    threading.Thread(target=self.answer, args=(connection, message), daemon=True).start()
+        except (OSError, ValueError) as e:
+            self.logger.debug(f"Receiver stopped: {e}")
+        finally:
+            alive.clear()
+            self._wake.set()
+
+    # ---- commands and on-demand media ----
+
+    def handle_command(self, command):
+        if command == 'start':
+            self.start_monitoring()
+        elif command == 'stop':
+            self.stop_monitoring()
+
+    def start_monitoring(self):
+        if security_system.camera_processors:
+            return
+        security_system.monitoring = True
+        cameras = security_system.start_cameras(self.emitter)
+        self.logger.info(f"🚀 Monitoring started on {cameras} camera(s)")
+
+    def stop_monitoring(self):
+        security_system.monitoring = False
+        security_system.stop_cameras()
+        self.logger.info("🛑 Monitoring stopped")
+
+    def answer(self, connection, message):
+        request = message.get('request')
+        try:
+            if message.get('kind') == 'thumbnail':
+                chunks = [self.thumbnail(int(message['camera_id']))]
+            elif message.get('kind') == 'clip':
+                chunks = self.read_clip(message['name'])
+            else:
+                raise ValueError(f"unknown request {message.get('kind')!r}")
+            for i, chunk in enumerate(chunks):
+                connection.send({'t': 'reply', 'request': request, 'data': chunk, 'eof': i == len(chunks) - 1})
+        except (LookupError, OSError, ValueError) as e:
+            try:
+                connection.send({'t': 'reply', 'request': request, 'error': str(e) or type(e).__name__})
+            except OSError:
+                pass
+
+    def thumbnail(self, camera_id, timeout=5.0):
+        """The camera's next frame as a JPEG (encoding is switched on just for it)"""
+        if camera_id not in security_system.camera_processors:
+            raise LookupError(f"Camera {camera_id} is not running on edge {self.edge_id}")
+        with self._lock:
+            waiter = self._thumbnails.setdefault(camera_id, [threading.Event(), None])
+            security_system.viewers.set('edge', len(self._thumbnails))
+        try:
+            if not waiter[0].wait(timeout):
+                raise TimeoutError(f"Camera {camera_id} produced no frame in {timeout:.0f}s")
+            return waiter[1]
+        finally:
+            with self._lock:
+                if self._thumbnails.get(camera_id) is waiter:
+                    del self._thumbnails[camera_id]
+                security_system.viewers.set('edge', len(self._thumbnails))
+
+    def frame_ready(self, data):
+        with self._lock:
+            waiter = self._thumbnails.pop(data.get('camera_id'), None)
+            security_system.viewers.set('edge', len(self._thumbnails))
+        if waiter is not None:
+            waiter[1] = data['frame']
+            waiter[0].set()
+
+    @staticmethod
+    def read_clip(name):
+        path = os.path.join(Config.RECORDING.output_directory, os.path.basename(name))
+        with open(path, 'rb') as f:
+            data = f.read()
+        return [data[i:i + CLIP_CHUNK] for i in range(0, len(data), CLIP_CHUNK)] or [b'']
+
+    def status(self):
+        return {
+            'edge': self.edge_id,
+            'central': self.central,
+            'connected': self.connection is not None,
+            'connects': self.connects,
+            'acked': self.acked,
+            'spool': self.spool.status()
+        }
+
+    def serve_forever(self):
+        if self.detections is not None:
+            threading.Thread(target=self._flush_detections, name='edge-detections', daemon=True).start()
+        if Config.EDGE.autostart:
+            self.start_monitoring()
+        self.run_link()
+
+
+if __name__ == '__main__':
+    edge = Config.EDGE
+    if not edge.id:
+        raise SystemExit("EDGE_ID (edge.id) must be set to run an edge agent")
+
+    os.makedirs(Config.RECORDING.output_directory, exist_ok=True)
+    configure_logging()
+    agent = EdgeAgent(edge.id, edge.central, edge.token, edge.spool_directory, edge.spool_max_mb,
+                      edge.forward_detections)
+    start_background_services()
+    agent.serve_forever()
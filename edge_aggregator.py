@@ -0,0 +1,365 @@
+# edge_aggregator.py - Central Endpoint for Edge Agents
+
+import os
+import hmac
+import time
+import socket
+import sqlite3
+import logging
+import threading
+import itertools
+
+from config import Config
+from edge_protocol import Connection, PROTOCOL_VERSION
+from events import Event, system_alert
+
+# Detections arrive with boxes scaled to 0-65535 (see edge_agent.DetectionForwarder)
+_BOX_SCALE = 65535
+
+
+class _Edge:
+    """One connected edge agent"""
+
+    def __init__(self, edge_id, connection, address, cameras, epoch):
+        self.id = edge_id
+        self.connection = connection
+        self.address = address
+        self.cameras = cameras
+        self.epoch = epoch
+        self.connected_at = time.time()
+        self.last_message = time.time()
+        self.last_seq = 0
+        self.acked = 0
+        self.messages = 0
+        self.duplicates = 0
+        self.gaps = 0
+        self.kbps = 0.0
+        self._rate_bytes = 0
+        self._rate_since = time.monotonic()
+
+
+class _Request:
+    """A thumbnail or clip asked of an edge, filled in by its replies"""
+
+    def __init__(self):
+        self.chunks = []
+        self.error = None
+        self.done = threading.Event()
+
+
+class EdgeAggregator:
+    """Receives detection and state messages from edge agents over TCP.
+
+    Edges run capture and detection next to their cameras and send only
+    compact messages: camera state changes, violations, alerts and each
+    frame's boxes. Every one carries the edge's sequence number; the
+    aggregator applies it to the central database, dashboard state, event
+    bus and detection log, skips numbers it has already applied (replays
+    after an outage overlap) and acknowledges the highest one so the edge
+    can trim its spool. The acknowledged number is kept in the database so
+    a restart of the central server doesn't re-apply anything.
+
+    Live video stays on the edge; thumbnails and violation clips are
+    fetched on demand. One thread per connected edge keeps this simple up
+    to hundreds of doors.
+    """
+
+    def __init__(self, security_system, socketio, host='0.0.0.0', port=0, token=''):
+        self.security_system = security_system
+        self.socketio = socketio
+        self.host = host
+        self.port = port
+        self.token = token
+        self.edges = {}
+        self.rejected = 0
+        self._requests = {}
+        self._request_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+        self.logger = logging.getLogger('EdgeAggregator')
+        self._init_database()
+
+    def _init_database(self):
+        conn = sqlite3.connect(Config.DATABASE.path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS edge_sequences (
+                edge TEXT PRIMARY KEY,
+                epoch TEXT,
+                last_seq INTEGER
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _stored_seq(self, edge_id, epoch):
+        conn = sqlite3.connect(Config.DATABASE.path)
+        row = conn.execute('SELECT epoch, last_seq FROM edge_sequences WHERE edge = ?', (edge_id,)).fetchone()
+        conn.close()
+        # A new epoch means the edge lost its spool and counts from 1 again
+        return row[1] if row and row[0] == epoch else 0
+
+    def _store_seq(self, edge):
+        conn = sqlite3.connect(Config.DATABASE.path)
+        conn.execute('INSERT OR REPLACE INTO edge_sequences (edge, epoch, last_seq) VALUES (?, ?, ?)',
+                      (edge.id, edge.epoch, edge.last_seq))
+        conn.commit()
+        conn.close()
+
+    # ---- server ----
+
+    def start(self):
+        if self._server is None:
+            self._server = socket.create_server((self.host, self.port))
+            self.port = self._server.getsockname()[1]
+            if not self.token:
+                self.logger.warning("⚠️ Edge aggregator accepts edges without a token (set edge.token)")
+            threading.Thread(target=self._accept, name='edge-aggregator', daemon=True).start()
+            threading.Thread(target=self._ack_loop, name='edge-acks', daemon=True).start()
+            self.logger.info(f"📡 Edge aggregator listening on {self.host}:{self.port}")
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for edge in list(self.edges.values()):
+            edge.connection.close()
+
+    def _accept(self):
+        while self._server is not None:
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            threading.Thread(target=self._serve, args=(Connection(sock), address),
+                             name=f'edge-{address[0]}:{address[1]}', daemon=True).start()
+
+    def _serve(self, connection, address):
+        edge = None
+        try:
+            edge = self._handshake(connection, address)
+            if edge is None:
+                return
+            while True:
+                message = connection.recv()
+                if message is None:
+                    break
+                edge.last_message = time.time()
+                self._handle(edge, message)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ Edge {edge.id if edge else address[0]} link error: {e}")
+        finally:
+            connection.close()
+            if edge is not None:
+                self._disconnected(edge)
+
+    def _handshake(self, connection, address):
+        hello = connection.recv()
+        if not isinstance(hello, dict) or hello.get('t') != 'hello' or not hello.get('edge'):
+            return None
+        if self.token and not hmac.compare_digest(str(hello.get('token', '')), self.token):
+            self.rejected += 1
+            self.logger.warning(f"⚠️ Rejected edge {hello['edge']!r} from {address[0]}: bad token")
+            connection.send({'t': 'error', 'error': 'bad token'})
+            return None
+        if hello.get('version') != PROTOCOL_VERSION:
+            connection.send({'t': 'error', 'error': f"protocol version {PROTOCOL_VERSION} required"})
+            return None
+
+        edge = _Edge(str(hello['edge']), connection, address[0], list(hello.get('cameras') or []),
+                     str(hello.get('epoch')))
+        edge.last_seq = edge.acked = self._stored_seq(edge.id, edge.epoch)
+        with self._lock:
+            previous = self.edges.get(edge.id)
+            self.edges[edge.id] = edge
+        if previous is not None:
+            # The edge reconnected before we noticed the old link was dead
+            previous.connection.close()
+            if previous.epoch == edge.epoch:
+                edge.last_seq = max(edge.last_seq, previous.last_seq)
+        connection.send({'t': 'welcome', 'acked': edge.last_seq})
+        self.logger.info(f"✅ Edge {edge.id} connected from {edge.address} "
+                         f"({len(edge.cameras)} camera(s), resuming after #{edge.last_seq})")
+        return edge
+
+    def _disconnected(self, edge):
+        with self._lock:
+            if self.edges.get(edge.id) is not edge:
+                return
+            del self.edges[edge.id]
+        self._ack(edge)
+        for camera_id in edge.cameras:
+            self.security_system.apply_remote_camera(camera_id, {'status': 'Offline'})
+        self.security_system.events.publish(system_alert(
+            f"Edge {edge.id} disconnected", 'warning', edge.cameras[0] if edge.cameras else 1,
+            key=f"edge:{edge.id}:connection"
+        ))
+        self.logger.warning(f"⚠️ Edge {edge.id} disconnected")
+        # Anything still waiting on this edge won't be answered
+        with self._lock:
+            waiting = [request for (edge_id, _), request in self._requests.items() if edge_id == edge.id]
+        for request in waiting:
+            request.error = 'edge disconnected'
+            request.done.set()
+
+    # ---- messages ----
+
+    def _handle(self, edge, message):
+        kind = message.get('t')
+        seq = message.get('seq')
+        if seq is not None:
+            if seq <= edge.last_seq:
+                edge.duplicates += 1
+                return
+            if seq > edge.last_seq + 1:
+                # The edge's spool overflowed during a long outage
+                edge.gaps += 1
+                self.logger.warning(f"⚠️ Edge {edge.id} skipped #{edge.last_seq + 1}-#{seq - 1}")
+            try:
+                self._apply(edge, kind, message)
+            except Exception as e:
+                self.logger.error(f"❌ Could not apply {kind} #{seq} from edge {edge.id}: {e}")
+            edge.last_seq = seq
+            edge.messages += 1
+        elif kind == 'live':
+            self.socketio.emit(message['event'], message['data'])
+        elif kind == 'reply':
+            self._reply(edge, message)
+        elif kind == 'ping':
+            self._ack(edge, force=True)
+
+    def _apply(self, edge, kind, message):
+        system = self.security_system
+        camera_id = message.get('camera_id')
+        if kind == 'camera':
+            system.apply_remote_camera(camera_id, message['changes'])
+        elif kind == 'violation':
+            row = message['row']
+            clip_path = f"edge/{edge.id}/{row['clip_path']}" if row.get('clip_path') else None
+            system.add_violation(row['person_count'], clip_path, row['duration'], camera_id, row.get('timestamp'))
+        elif kind == 'event':
+            system.events.publish(Event(message['type'], message['data'], camera_id=camera_id,
+                                        priority=message['priority'], key=f"edge:{edge.id}:{message['key']}",
+                                        cooldown=message.get('cooldown', 0.0),
+                                        created_at=message['created_at'],
+                                        occurrences=message.get('occurrences', 1)))
+        elif kind == 'detections' and system.detection_log is not None:
+            shape = (_BOX_SCALE, _BOX_SCALE)
+            for timestamp, flat in message['frames']:
+                boxes = [(flat[i], flat[i + 1], flat[i + 2], flat[i + 3], flat[i + 4] / 255)
+                         for i in range(0, len(flat), 6)]
+                system.detection_log.append(camera_id, timestamp, boxes, flat[5::6], shape)
+        elif kind == 'clip' and system.detection_log is not None:
+            system.detection_log.mark_clip(camera_id, f"edge/{edge.id}/{message['clip_path']}",
+                                           message['start'], message['end'])
+
+    def _ack(self, edge, force=False):
+        if edge.last_seq > edge.acked or force:
+            self._store_seq(edge)
+            edge.acked = edge.last_seq
+            try:
+                edge.connection.send({'t': 'ack', 'seq': edge.acked})
+            except OSError:
+                pass
+
+    def _ack_loop(self, interval=1.0, idle_timeout=45.0):
+        """Acknowledge applied messages, measure link rates and drop silent edges"""
+        while self._server is not None:
+            time.sleep(interval)
+            now = time.time()
+            for edge in list(self.edges.values()):
+                self._ack(edge)
+                received = edge.connection.bytes_received
+                elapsed = time.monotonic() - edge._rate_since
+                if elapsed >= 10:
+                    edge.kbps = (received - edge._rate_bytes) * 8 / 1000 / elapsed
+                    edge._rate_bytes, edge._rate_since = received, time.monotonic()
+                if now - edge.last_message > idle_timeout:
+                    self.logger.warning(f"⚠️ Edge {edge.id} silent for {idle_timeout:.0f}s, dropping link")
+                    edge.connection.close()
+
+    # ---- commands and on-demand media ----
+
+    def command(self, name):
+        """Send ``start``/``stop`` to every connected edge; returns how many got it"""
+        sent = 0
+        for edge in list(self.edges.values()):
+            try:
+                edge.connection.send({'t': 'command', 'command': name})
+                sent += 1
+            except OSError:
+                pass
+        return sent
+
+    def request(self, edge_id, kind, timeout=15.0, **fields):
+        """Ask an edge for a thumbnail or clip; returns the bytes.
+
+        Raises LookupError when the edge isn't connected, TimeoutError when
+        it doesn't answer in time and RuntimeError with the edge's error.
+        """
+        edge = self.edges.get(edge_id)
+        if edge is None:
+            raise LookupError(f"Edge {edge_id} is not connected")
+        key = (edge_id, next(self._request_ids))
+        request = _Request()
+        with self._lock:
+            self._requests[key] = request
+        try:
+            edge.connection.send(dict(fields, t='request', kind=kind, request=key[1]))
+            if not request.done.wait(timeout):
+                raise TimeoutError(f"Edge {edge_id} did not answer in {timeout:.0f}s")
+            if request.error:
+                raise RuntimeError(request.error)
+            return b''.join(request.chunks)
+        finally:
+            with self._lock:
+                self._requests.pop(key, None)
+
+    def _reply(self, edge, message):
+        request = self._requests.get((edge.id, message.get('request')))
+        if request is None:
+            return
+        if message.get('error'):
+            request.error = message['error']
+            request.done.set()
+            return
+        request.chunks.append(message.get('data') or b'')
+        if message.get('eof', True):
+            request.done.set()
+
+    def thumbnail(self, edge_id, camera_id):
+        """The camera's next frame as JPEG bytes"""
+        return self.request(edge_id, 'thumbnail', timeout=10.0, camera_id=camera_id)
+
+    def fetch_clip(self, edge_id, name, directory):
+        """Copy a violation clip from its edge into ``directory``; returns the local path"""
+        data = self.request(edge_id, 'clip', timeout=120.0, name=name)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, os.path.basename(name))
+        with open(path + '.part', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.part', path)
+        return path
+
+    def status(self):
+        return {
+            'listening': f"{self.host}:{self.port}" if self._server is not None else None,
+            'rejected': self.rejected,
+            'edges': {
+                edge.id: {
+                    'address': edge.address,
+                    'cameras': edge.cameras,
+                    'connected_for_s': round(time.time() - edge.connected_at, 1),
+                    'last_message_age_s': round(time.time() - edge.last_message, 1),
+                    'last_seq': edge.last_seq,
+                    'acked': edge.acked,
+                    'messages': edge.messages,
+                    'duplicates': edge.duplicates,
+                    'gaps': edge.gaps,
+                    'bytes_received': edge.connection.bytes_received,
+                    'kbps': round(edge.kbps, 2)
+                } for edge in list(self.edges.values())
+            }
+        }
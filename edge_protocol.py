@@ -0,0 +1,240 @@
+# edge_protocol.py - Compact Edge/Central Wire Format and Disk Spool
+
+import os
+import json
+import uuid
+import base64
+import struct
+import socket
+import threading
+from collections import deque
+
+try:
+    import msgpack
+except ImportError:  # Optional: JSON works, msgpack is smaller and faster
+    msgpack = None
+
+PROTOCOL_VERSION = 1
+_LENGTH = struct.Struct('>I')
+_RECORD = struct.Struct('>QI')
+_SEQ = struct.Struct('>Q')
+MAX_MESSAGE = 16 * 1024 * 1024
+
+
+def _bytes_to_json(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'__b': base64.b64encode(value).decode()}
+    raise TypeError(f"{type(value).__name__} is not serialisable")
+
+
+def _json_to_bytes(obj):
+    return base64.b64decode(obj['__b']) if len(obj) == 1 and '__b' in obj else obj
+
+
+def encode(message):
+    """One message as bytes: a format byte (``M`` msgpack, ``J`` JSON) then the body"""
+    if msgpack is not None:
+        return b'M' + msgpack.packb(message, use_bin_type=True)
+    return b'J' + json.dumps(message, separators=(',', ':'), default=_bytes_to_json).encode()
+
+
+def encode_record(seq, payload):
+    """A spooled message on the wire: ``S``, its sequence number, then the stored encoding"""
+    return b'S' + _SEQ.pack(seq) + payload
+
+
+def decode(data):
+    """The message in ``data``; spooled records come back with their ``seq`` set"""
+    if data[:1] == b'S':
+        message = decode(data[1 + _SEQ.size:])
+        message['seq'] = _SEQ.unpack_from(data, 1)[0]
+        return message
+    if data[:1] == b'M':
+        if msgpack is None:
+            raise ValueError("peer sent msgpack but msgpack is not installed")
+        return msgpack.unpackb(data[1:], raw=False, strict_map_key=False)
+    if data[:1] == b'J':
+        return json.loads(data[1:], object_hook=_json_to_bytes)
+    raise ValueError("unknown message format")
+
+
+class Connection:
+    """Length-prefixed messages over a TCP socket; ``send`` is safe from any thread"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._send_lock = threading.Lock()
+
+    @classmethod
+    def connect(cls, address, timeout=10.0):
+        host, port = address.rsplit(':', 1)
+        sock = socket.create_connection((host, int(port)), timeout=timeout)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return cls(sock)
+
+    def send(self, message):
+        self.send_raw(encode(message))
+
+    def send_raw(self, payload):
+        with self._send_lock:
+            self.sock.sendall(_LENGTH.pack(len(payload)) + payload)
+            self.bytes_sent += _LENGTH.size + len(payload)
+
+    def recv(self):
+        """The next message, or None once the peer closed the connection"""
+        header = self._read(_LENGTH.size)
+        if header is None:
+            return None
+        (length,) = _LENGTH.unpack(header)
+        if length > MAX_MESSAGE:
+            raise ValueError(f"message of {length} bytes is too large")
+        payload = self._read(length)
+        if payload is None:
+            return None
+        self.bytes_received += _LENGTH.size + length
+        return decode(payload)
+
+    def _read(self, size):
+        chunks = []
+        while size:
+            chunk = self.sock.recv(min(size, 65536))
+            if not chunk:
+                return None
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class Spool:
+    """Numbered messages kept on disk until the central server acknowledges them.
+
+    Every reliable message is appended (``seq``, encoded bytes) to segment
+    files named after their first sequence number, so a link outage or a
+    restart of either side loses nothing: after reconnecting, everything
+    after the central server's last acknowledged ``seq`` is sent again.
+    Fully acknowledged segments are deleted; past ``max_bytes`` the oldest
+    segments are dropped. Recent messages are also kept in memory so
+    normal sending never reads the disk. ``epoch`` identifies this spool
+    so the central server notices when an edge starts over from ``seq`` 1.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, segment_bytes=4 * 1024 * 1024, memory=4096):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.dropped = 0
+        self._recent = deque(maxlen=memory)
+        self._lock = threading.Lock()
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+        self.epoch = self._epoch()
+        self.seq = self._recover()
+
+    def _epoch(self):
+        path = os.path.join(self.directory, 'epoch')
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            epoch = uuid.uuid4().hex[:12]
+            with open(path, 'w') as f:
+                f.write(epoch)
+            return epoch
+
+    def _segments(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith('.spool'))
+        return [(int(name[:-6]), os.path.join(self.directory, name)) for name in names]
+
+    def _recover(self):
+        """The last sequence number written before a restart"""
+        last = 0
+        segments = self._segments()
+        if segments:
+            for seq, _ in self._read_file(segments[-1][1]):
+                last = seq
+            last = max(last, segments[-1][0] - 1)
+        return last
+
+    @staticmethod
+    def _read_file(path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return
+        pos = 0
+        while pos + _RECORD.size <= len(data):
+            seq, length = _RECORD.unpack_from(data, pos)
+            pos += _RECORD.size
+            if pos + length > len(data):
+                break  # torn write at a crash
+            yield seq, data[pos:pos + length]
+            pos += length
+
+    def append(self, payload):
+        """Store an encoded message; returns its sequence number"""
+        with self._lock:
+            self.seq += 1
+            if self._file is None or self._file.tell() >= self.segment_bytes:
+                self._roll()
+            self._file.write(_RECORD.pack(self.seq, len(payload)) + payload)
+            self._file.flush()
+            self._recent.append((self.seq, payload))
+            return self.seq
+
+    def _roll(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(os.path.join(self.directory, f'{self.seq:016d}.spool'), 'ab')
+        segments = self._segments()
+        total = sum(os.path.getsize(path) for _, path in segments)
+        while total > self.max_bytes and len(segments) > 1:
+            _, path = segments.pop(0)
+            total -= os.path.getsize(path)
+            os.remove(path)
+            self.dropped += 1
+
+    def after(self, seq, limit=None):
+        """``(seq, payload)`` for up to ``limit`` stored messages after ``seq``, oldest first"""
+        with self._lock:
+            recent = list(self._recent)
+            last = self.seq
+        if seq >= last:
+            return []
+        if recent and recent[0][0] <= seq + 1:
+            return [item for item in recent if item[0] > seq][:limit]
+        found = []
+        segments = self._segments()
+        for (_, path), (next_first, _) in zip(segments, segments[1:] + [(last + 1, None)]):
+            if next_first > seq + 1:
+                found.extend(item for item in self._read_file(path) if seq < item[0] <= last)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found[:limit]
+
+    def trim(self, acked):
+        """Delete segments holding only messages up to ``acked``"""
+        with self._lock:
+            segments = self._segments()
+            for (_, path), (next_first, _) in zip(segments, segments[1:]):
+                if next_first - 1 <= acked:
+                    os.remove(path)
+
+    def status(self):
+        return {
+            'epoch': self.epoch,
+            'seq': self.seq,
+            'bytes': sum(os.path.getsize(path) for _, path in self._segments()),
+            'dropped_segments': self.dropped
+        }
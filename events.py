@@ -0,0 +1,302 @@
+# events.py - Event Bus and Debounced Alert Dispatch
+
+import json
+import time
+import heapq
+import shlex
+import queue
+import logging
+import threading
+import subprocess
+import urllib.request
+from dataclasses import dataclass, field
+
+# Event types (also the Socket.IO event names the dashboard listens for)
+VIOLATION_DETECTED = 'violation_detected'
+RECORDING_STARTED = 'recording_started'
+RECORDING_STOPPED = 'recording_stopped'
+SYSTEM_ALERT = 'system_alert'
+
+# Lower number = dispatched first
+PRIORITY_CRITICAL = 0
+PRIORITY_HIGH = 1
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3
+
+
+@dataclass
+class Event:
+    type: str
+    data: dict
+    camera_id: int = 1
+    priority: int = PRIORITY_NORMAL
+    # Events with the same key inside `cooldown` seconds are coalesced into one
+    key: str = None
+    cooldown: float = 0.0
+    created_at: float = field(default_factory=time.time)
+    occurrences: int = 1
+
+    def __post_init__(self):
+        if self.key is None:
+            self.key = f"{self.type}:{self.camera_id}"
+
+    def payload(self):
+        payload = dict(self.data)
+        payload.setdefault('camera_id', self.camera_id)
+        payload.setdefault('timestamp', self.created_at)
+        payload['occurrences'] = self.occurrences
+        return payload
+
+
+def system_alert(message, severity='warning', camera_id=1, key=None, cooldown=0.0, **data):
+    """Build a ``system_alert`` event; severity is ``info``, ``warning`` or ``high``"""
+    priority = {'high': PRIORITY_CRITICAL, 'warning': PRIORITY_HIGH}.get(severity, PRIORITY_NORMAL)
+    return Event(SYSTEM_ALERT, dict(data, message=message, severity=severity), camera_id=camera_id,
+                 priority=priority, key=key or f"{SYSTEM_ALERT}:{camera_id}:{message}", cooldown=cooldown)
+
+
+class Sink:
+    """An alert destination with its own bounded queue and delivery thread.
+
+    A slow or failing sink (an unreachable webhook) only delays itself; when
+    its queue is full the lowest-priority waiting event is dropped.
+    """
+
+    name = 'sink'
+
+    def __init__(self, max_queue=256, min_priority=PRIORITY_LOW, event_types=None):
+        self.max_queue = max_queue
+        self.min_priority = min_priority
+        self.event_types = set(event_types) if event_types else None
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_latency = 0.0
+        self._queue = queue.PriorityQueue()
+        self._seq = 0
+        self._thread = None
+        self.logger = logging.getLogger(f'AlertSink[{self.name}]')
+
+    def accepts(self, event):
+        return event.priority <= self.min_priority and (self.event_types is None or event.type in self.event_types)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f'alert-{self.name}', daemon=True)
+        self._thread.start()
+        return self
+
+    def put(self, event):
+        if self._queue.qsize() >= self.max_queue:
+            self._drop_lowest()
+        self._seq += 1
+        self._queue.put((event.priority, self._seq, event))
+
+    def _drop_lowest(self):
+        with self._queue.mutex:
+            if self._queue.queue:
+                self._queue.queue.remove(max(self._queue.queue))
+                heapq.heapify(self._queue.queue)
+                self.dropped += 1
+
+    def _run(self):
+        while True:
+            _, _, event = self._queue.get()
+            if event is None:
+                break
+            try:
+                self.deliver(event)
+                self.delivered += 1
+                self.max_latency = max(self.max_latency, time.time() - event.created_at)
+            except Exception as e:
+                self.failed += 1
+                self.logger.warning(f"⚠️ Could not deliver {event.type}: {e}")
+
+    def deliver(self, event):
+        raise NotImplementedError
+
+    def close(self):
+        self._queue.put((PRIORITY_LOW + 1, float('inf'), None))
+
+    def status(self):
+        return {
+            'queued': self._queue.qsize(),
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'max_latency_ms': round(self.max_latency * 1000, 1)
+        }
+
+
+class SocketIOSink(Sink):
+    """Emits each event to dashboards under its own type name"""
+
+    name = 'socketio'
+
+    def __init__(self, socketio, **kwargs):
+        super().__init__(**kwargs)
+        self.socketio = socketio
+
+    def deliver(self, event):
+        self.socketio.emit(event.type, event.payload())
+
+
+class WebhookSink(Sink):
+    """POSTs events as JSON to an HTTP endpoint (one retry, bounded timeout)"""
+
+    name = 'webhook'
+
+    def __init__(self, url, timeout=3.0, retries=1, **kwargs):
+        self.name = f"webhook:{url}"
+        super().__init__(**kwargs)
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+
+    def deliver(self, event):
+        body = json.dumps({'event': event.type, **event.payload()}).encode()
+        for attempt in range(self.retries + 1):
+            try:
+                request = urllib.request.Request(self.url, data=body, method='POST',
+                                                 headers={'Content-Type': 'application/json'})
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                return
+            except OSError:
+                if attempt == self.retries:
+                    raise
+                time.sleep(0.5)
+
+
+class AlarmSink(Sink):
+    """Local alarm output: runs ``ALARM_COMMAND`` (e.g. a siren relay or ``aplay``) per alert.
+
+    Without a command the alarm is written to the log so it still shows up
+    on the console of an unattended server.
+    """
+
+    name = 'alarm'
+
+    def __init__(self, command=None, **kwargs):
+        kwargs.setdefault('min_priority', PRIORITY_HIGH)
+        super().__init__(**kwargs)
+        self.command = shlex.split(command) if command else None
+
+    def deliver(self, event):
+        payload = event.payload()
+        message = payload.get('message') or f"{event.type} on camera {event.camera_id}"
+        if self.command:
+            # Fire and forget; the alarm hardware decides how long to sound
+            subprocess.Popen(self.command + [event.type, str(event.camera_id)],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.logger.warning(f"🚨 ALARM: {message}")
+
+
+class EventBus:
+    """Turns pipeline state changes into alerts without blocking the publisher.
+
+    ``publish`` only takes a lock and appends; a dispatcher thread hands
+    events to every sink in priority order. An event whose key was
+    dispatched less than ``cooldown`` seconds ago is held back and coalesced
+    with later ones (latest data wins, ``occurrences`` counts them), so a
+    flapping door produces one alert per cooldown instead of one per frame.
+    """
+
+    def __init__(self, sinks=(), default_cooldown=0.0):
+        self.sinks = list(sinks)
+        self.default_cooldown = default_cooldown
+        self.published = 0
+        self.coalesced = 0
+        self.dispatched = 0
+        self._pending = {}      # key -> Event waiting for its cooldown to expire
+        self._last_sent = {}    # key -> dispatch time
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self.logger = logging.getLogger('EventBus')
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        if self._thread is not None:
+            sink.start()
+        return sink
+
+    def start(self):
+        if self._thread is None:
+            for sink in self.sinks:
+                sink.start()
+            self._thread = threading.Thread(target=self._run, name='event-bus', daemon=True)
+            self._thread.start()
+        return self
+
+    def publish(self, event):
+        with self._cond:
+            self.published += 1
+            pending = self._pending.get(event.key)
+            if pending is not None:
+                event.occurrences += pending.occurrences
+                event.priority = min(event.priority, pending.priority)
+                event.created_at = pending.created_at
+                self.coalesced += 1
+            self._pending[event.key] = event
+            self._cond.notify()
+
+    def _due(self, event, now):
+        cooldown = event.cooldown or self.default_cooldown
+        return now - self._last_sent.get(event.key, 0.0) >= cooldown
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    if self._closed:
+                        # Flush whatever is still held back, then stop
+                        ready = list(self._pending.values())
+                        break
+                    ready = [e for e in self._pending.values() if self._due(e, now)]
+                    if ready:
+                        break
+                    waits = [self._last_sent.get(e.key, 0.0) + (e.cooldown or self.default_cooldown) - now
+                             for e in self._pending.values()]
+                    self._cond.wait(max(min(waits), 0.01) if waits else None)
+                ready.sort(key=lambda e: (e.priority, e.created_at))
+                for event in ready:
+                    del self._pending[event.key]
+                    self._last_sent[event.key] = now
+                if len(self._last_sent) > 1000:
+                    # Forget keys whose cooldown is long over (alert messages vary)
+                    self._last_sent = {k: t for k, t in self._last_sent.items() if now - t < 3600}
+            for event in ready:
+                self.dispatched += 1
+                for sink in self.sinks:
+                    if sink.accepts(event):
+                        sink.put(event)
+            if self._closed:
+                return
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        for sink in self.sinks:
+            sink.close()
+
+    def status(self):
+        return {
+            'published': self.published,
+            'coalesced': self.coalesced,
+            'dispatched': self.dispatched,
+            'pending': len(self._pending),
+            'sinks': {sink.name: sink.status() for sink in self.sinks}
+        }
+
+
+def build_event_bus(socketio, webhook_urls=(), alarm_command=None, cooldown=0.0, webhook_timeout=3.0):
+    """The standard bus: dashboards, any configured webhooks and the local alarm (call ``start()``)"""
+    bus = EventBus([SocketIOSink(socketio)], default_cooldown=cooldown)
+    for url in webhook_urls:
+        bus.add_sink(WebhookSink(url, timeout=webhook_timeout))
+    bus.add_sink(AlarmSink(alarm_command))
+    return bus
@@ -0,0 +1,227 @@
+# exports.py - Streaming Bulk Export of Violations, Status History and Detections
+
+import io
+import os
+import csv
+import json
+import time
+import sqlite3
+import zipfile
+from datetime import datetime, timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only needed for format=parquet
+    pa = pq = None
+
+# Rows per database page, encoded chunk and Parquet row group
+CHUNK_ROWS = 5000
+CLIP_CHUNK_BYTES = 1 << 20
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', '.ndjson'),
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet')
+}
+
+VIOLATION_COLUMNS = [('id', 'int'), ('timestamp', 'str'), ('person_count', 'int'), ('clip_path', 'str'),
+                     ('duration', 'float'), ('status', 'str'), ('camera_id', 'int')]
+STATUS_COLUMNS = [('id', 'int'), ('timestamp', 'str'), ('camera_id', 'int'), ('status', 'str'),
+                  ('people_count', 'int'), ('is_recording', 'bool')]
+# One row per detected person; boxes are fractions of the frame like /api/detections
+DETECTION_COLUMNS = [('time', 'float'), ('camera_id', 'int'), ('people', 'int'), ('track', 'int'),
+                     ('x1', 'float'), ('y1', 'float'), ('x2', 'float'), ('y2', 'float'), ('conf', 'float')]
+
+
+def parquet_available():
+    return pq is not None
+
+
+def db_timestamp(epoch):
+    """Epoch seconds as the database's (UTC ``CURRENT_TIMESTAMP``) text"""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+# ---- rows ----
+
+def table_rows(db_path, table, columns, where=(), params=()):
+    """Every matching row of ``table``, read a page at a time.
+
+    Each page is its own short query (``id > last ... LIMIT``), so memory
+    stays flat however large the export is, and no read transaction is
+    held open while a slow client downloads: recording a violation never
+    waits for an export.
+    """
+    names = ', '.join(name for name, _ in columns)
+    condition = ''.join(f' AND {clause}' for clause in where)
+    sql = f'SELECT {names} FROM {table} WHERE id > ?{condition} ORDER BY id LIMIT {CHUNK_ROWS}'
+    last = 0
+    while True:
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(sql, (last, *params)).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1][0]
+
+
+def _time_filters(start, end):
+    where, params = [], []
+    if start is not None:
+        where.append('timestamp >= ?')
+        params.append(db_timestamp(start))
+    if end is not None:
+        where.append('timestamp <= ?')
+        params.append(db_timestamp(end))
+    return where, params
+
+
+def violation_rows(db_path, start=None, end=None, camera_id=None, status=None, min_people=None, max_people=None):
+    where, params = _time_filters(start, end)
+    for clause, value in (('camera_id = ?', camera_id), ('status = ?', status), ('person_count >= ?', min_people),
+                          ('person_count <= ?', max_people)):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    return table_rows(db_path, 'violations', VIOLATION_COLUMNS, where, params)
+
+
+def status_rows(db_path, start=None, end=None, camera_id=None, status=None):
+    where, params = _time_filters(start, end)
+    for clause, value in (('camera_id = ?', camera_id), ('status = ?', status)):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    for row in table_rows(db_path, 'status_history', STATUS_COLUMNS, where, params):
+        yield row[:5] + (bool(row[5]),)
+
+
+def detection_rows(detection_log, camera_ids, start=None, end=None, min_people=None):
+    for camera_id in camera_ids:
+        for frame in detection_log.iter_frames(camera_id, start, end):
+            people = len(frame['people'])
+            if min_people is not None and people < min_people:
+                continue
+            for person in frame['people']:
+                yield (frame['time'], camera_id, people, person['track'], *person['box'], person['conf'])
+
+
+# ---- encodings ----
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def to_ndjson(columns, rows):
+    names = [name for name, _ in columns]
+    for chunk in _chunks(rows):
+        yield ''.join(json.dumps(dict(zip(names, row)), separators=(',', ':')) + '\n' for row in chunk).encode()
+
+
+def to_csv(columns, rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow([name for name, _ in columns])
+    for chunk in _chunks(rows):
+        writer.writerows(chunk)
+        yield out.getvalue().encode()
+        out.seek(0)
+        out.truncate()
+    if out.tell():
+        yield out.getvalue().encode()
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose bytes are taken as they are produced (not seekable)"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def to_parquet(columns, rows):
+    """One row group per chunk; only the current chunk is ever in memory"""
+    types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(), 'bool': pa.bool_()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _Drain()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='zstd')
+    try:
+        for chunk in _chunks(rows):
+            writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, row)) for row in chunk], schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+ENCODERS = {'ndjson': to_ndjson, 'csv': to_csv, 'parquet': to_parquet}
+
+
+def encode(fmt, columns, rows):
+    return ENCODERS[fmt](columns, rows)
+
+
+# ---- ZIP with clips ----
+
+def zip_with_clips(export_name, export_chunks, clip_paths, clips_directory):
+    """Stream a ZIP holding the export and every referenced clip found in ``clips_directory``.
+
+    Entries are written with data descriptors, so nothing is buffered
+    beyond one chunk. Clips are stored uncompressed (MP4 does not shrink);
+    any that are missing (e.g. still on an edge) are listed in
+    ``missing_clips.txt``.
+    """
+    sink = _Drain()
+    missing = []
+    with zipfile.ZipFile(sink, 'w', allowZip64=True) as archive:
+        entry = zipfile.ZipInfo(export_name, time.localtime()[:6])
+        entry.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(entry, 'w', force_zip64=True) as out:
+            for chunk in export_chunks:
+                out.write(chunk)
+                yield sink.take()
+        seen = set()
+        for clip in clip_paths:
+            if not clip or clip in seen:
+                continue
+            seen.add(clip)
+            path = os.path.join(clips_directory, clip)
+            if not os.path.isfile(path):
+                missing.append(clip)
+                continue
+            entry = zipfile.ZipInfo(f'clips/{clip}', time.localtime(os.path.getmtime(path))[:6])
+            entry.compress_type = zipfile.ZIP_STORED
+            with open(path, 'rb') as f, archive.open(entry, 'w', force_zip64=True) as out:
+                for block in iter(lambda: f.read(CLIP_CHUNK_BYTES), b''):
+                    out.write(block)
+                    yield sink.take()
+        if missing:
+            archive.writestr('missing_clips.txt', '\n'.join(missing) + '\n')
+    yield sink.take()
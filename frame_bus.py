@@ -0,0 +1,290 @@
+# frame_bus.py - Shared-memory Live Frame Bus
+
+import os
+import sys
+import json
+import time
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAGIC = b'VFB1'
+VERSION = 1
+# magic, version, slots, slot_bytes, meta_bytes, camera_id, writer pid,
+# created, heartbeat, latest frame seq
+_HEADER = struct.Struct('<4sHHIIIIddQ')
+# seqlock counter (odd while the writer is inside the slot), frame seq,
+# captured_at, height, width, channels, metadata length
+_SLOT = struct.Struct('<QQdIIII')
+_ALIGN = 64
+HEADER_BYTES = _ALIGN
+
+
+def _aligned(size):
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def segment_name(camera_id, prefix='vault_frames'):
+    """Shared-memory name of a camera's ring (``/dev/shm/<name>`` on Linux)"""
+    return f'{prefix}_{camera_id}'
+
+
+def _attach(name):
+    """Open an existing segment without letting this process's resource
+    tracker unlink it at exit (Python < 3.13 registers attached segments too)"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # The writer's own process keeps its registration; it unlinks on close
+    if _HEADER.unpack_from(shm.buf, 0)[6] != os.getpid():
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+    return shm
+
+
+class FrameBusWriter:
+    """Publishes one camera's latest frames and detections to shared memory.
+
+    The segment is a small header followed by ``slots`` fixed-size slots,
+    written round-robin. Each slot is guarded by a seqlock: its counter is
+    made odd before the frame is copied in and even again afterwards, so a
+    reader that sees the same even counter before and after its read knows
+    the frame was not torn. The writer never waits for readers, and a
+    reader that keeps a zero-copy view has ``slots - 1`` frames' time before
+    that slot is reused. Metadata (people count, boxes, track IDs, mode) is
+    stored as JSON next to the pixels.
+    """
+
+    def __init__(self, camera_id, max_width=1920, max_height=1080, slots=4, meta_bytes=16384,
+                 prefix='vault_frames'):
+        self.camera_id = camera_id
+        self.name = segment_name(camera_id, prefix)
+        self.slots = slots
+        self.slot_bytes = max_width * max_height * 3
+        self.meta_bytes = meta_bytes
+        self.stride = _aligned(_SLOT.size) + _aligned(self.slot_bytes) + _aligned(meta_bytes)
+        size = HEADER_BYTES + slots * self.stride
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a crashed run; readers still mapping it notice the new one
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        self.seq = 0
+        self.created = time.time()
+        self._write_header()
+
+    def _write_header(self, heartbeat=0.0):
+        _HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, self.slots, self.slot_bytes, self.meta_bytes,
+                          self.camera_id, os.getpid(), self.created, heartbeat, self.seq)
+
+    def fits(self, frame):
+        return frame.nbytes <= self.slot_bytes
+
+    def publish(self, frame, captured_at=None, metadata=None):
+        """Copy ``frame`` (uint8 HxW or HxWxC) into the next slot; False if it is too large"""
+        if frame.dtype != np.uint8 or not self.fits(frame):
+            return False
+        meta = json.dumps(metadata or {}, separators=(',', ':')).encode()
+        if len(meta) > self.meta_bytes:
+            meta = b'{"truncated":true}'
+        seq = self.seq + 1
+        base = HEADER_BYTES + (seq % self.slots) * self.stride
+        buf = self.shm.buf
+        (lock,) = struct.unpack_from('<Q', buf, base)
+        struct.pack_into('<Q', buf, base, lock + 1)
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        pixels = base + _aligned(_SLOT.size)
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=buf, offset=pixels)[...] = frame
+        meta_at = pixels + _aligned(self.slot_bytes)
+        buf[meta_at:meta_at + len(meta)] = meta
+        _SLOT.pack_into(buf, base, lock + 1, seq, captured_at or time.time(), height, width, channels, len(meta))
+        struct.pack_into('<Q', buf, base, lock + 2)
+        self.seq = seq
+        self._write_header(time.time())
+        return True
+
+    def close(self):
+        """Unmap and remove the segment; readers keep their mapping until they close"""
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+    def status(self):
+        return {'name': self.name, 'frames': self.seq, 'slots': self.slots,
+                'bytes': self.shm.size, 'max_frame_bytes': self.slot_bytes}
+
+
+class BusFrame:
+    """One frame read from the bus; ``image`` may be a view into shared memory"""
+
+    __slots__ = ('seq', 'captured_at', 'image', 'metadata', '_reader', '_base', '_lock')
+
+    def __init__(self, seq, captured_at, image, metadata, reader=None, base=None, lock=None):
+        self.seq = seq
+        self.captured_at = captured_at
+        self.image = image
+        self.metadata = metadata
+        self._reader = reader
+        self._base = base
+        self._lock = lock
+
+    def valid(self):
+        """For zero-copy frames: True while the writer hasn't started reusing the slot.
+        Check after processing; a False means ``image`` may have been overwritten."""
+        if self._reader is None:
+            return True
+        return struct.unpack_from('<Q', self._reader.shm.buf, self._base)[0] == self._lock
+
+
+class FrameBusReader:
+    """Reads a camera's frames from the bus, from any local process.
+
+    Needs only numpy and the standard library::
+
+        from frame_bus import FrameBusReader
+        with FrameBusReader(1) as bus:
+            for frame in bus.frames():
+                print(frame.seq, frame.metadata['people_count'], frame.image.shape)
+
+    Reading never touches the camera or the server. ``copy=False`` hands out
+    views into shared memory with no copy at all; call ``frame.valid()``
+    after using one. A reader that falls behind skips to the newest frame.
+    When the camera pipeline restarts, the reader attaches to the new ring.
+    """
+
+    def __init__(self, camera_id, prefix='vault_frames'):
+        self.name = segment_name(camera_id, prefix)
+        self.shm = None
+        self.created = None
+        self._attach()
+
+    def _attach(self):
+        shm = _attach(self.name)
+        header = _HEADER.unpack_from(shm.buf, 0)
+        if header[0] != MAGIC or header[1] != VERSION:
+            shm.close()
+            raise ValueError(f"{self.name} is not a version {VERSION} frame bus")
+        if self.shm is not None:
+            try:
+                self.shm.close()
+            except BufferError:
+                pass  # zero-copy frames still point into it; unmapped once they are gone
+        self.shm = shm
+        (_, _, self.slots, self.slot_bytes, self.meta_bytes, self.camera_id, self.writer_pid,
+         self.created, _, _) = header
+        self.stride = _aligned(_SLOT.size) + _aligned(self.slot_bytes) + _aligned(self.meta_bytes)
+
+    def _reattach(self):
+        """Switch to a new ring if the pipeline was restarted; True when it did"""
+        try:
+            shm = _attach(self.name)
+        except FileNotFoundError:
+            return False
+        created = _HEADER.unpack_from(shm.buf, 0)[7]
+        shm.close()
+        if created == self.created:
+            return False
+        self._attach()
+        return True
+
+    def _header(self):
+        return _HEADER.unpack_from(self.shm.buf, 0)
+
+    @property
+    def latest_seq(self):
+        return self._header()[9]
+
+    def heartbeat_age(self):
+        """Seconds since the writer last published"""
+        heartbeat = self._header()[8]
+        return time.time() - heartbeat if heartbeat else None
+
+    def read(self, seq=None, copy=True, retries=8):
+        """Frame ``seq`` (default: the newest), or None if none was published or it was overwritten"""
+        buf = self.shm.buf
+        for _ in range(retries):
+            wanted = seq or self.latest_seq
+            if not wanted:
+                return None
+            base = HEADER_BYTES + (wanted % self.slots) * self.stride
+            lock, frame_seq, captured_at, height, width, channels, meta_len = _SLOT.unpack_from(buf, base)
+            if lock % 2:
+                continue  # being written right now
+            if frame_seq != wanted:
+                if seq is not None:
+                    return None
+                continue
+            pixels = base + _aligned(_SLOT.size)
+            shape = (height, width, channels) if channels > 1 else (height, width)
+            image = np.ndarray(shape, dtype=np.uint8, buffer=buf, offset=pixels)
+            if copy:
+                image = image.copy()
+            meta_at = pixels + _aligned(self.slot_bytes)
+            meta = bytes(buf[meta_at:meta_at + meta_len])
+            if struct.unpack_from('<Q', buf, base)[0] != lock:
+                continue  # torn: the writer came round in the meantime
+            return BusFrame(frame_seq, captured_at, image, json.loads(meta or b'{}'),
+                            None if copy else self, base, lock)
+        return None
+
+    def frames(self, copy=True, poll=0.002, stale_after=5.0):
+        """Yield each new frame as it is published (skipping ahead when behind)"""
+        last = 0
+        idle_since = time.monotonic()
+        while True:
+            seq = self.latest_seq
+            if seq != last:
+                frame = self.read(seq, copy=copy)
+                last = seq
+                idle_since = time.monotonic()
+                if frame is not None:
+                    yield frame
+                continue
+            time.sleep(poll)
+            if time.monotonic() - idle_since > stale_after:
+                # Pipeline stopped or restarted: follow a new ring if there is one
+                idle_since = time.monotonic()
+                try:
+                    if self._reattach():
+                        last = 0
+                except ValueError:
+                    pass
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    # Live viewer: python frame_bus.py [camera_id]
+    import cv2
+
+    with FrameBusReader(int(sys.argv[1]) if len(sys.argv) > 1 else 1) as bus:
+        print(f"Reading {bus.name}: {bus.slots} slots, writer pid {bus.writer_pid}")
+        for frame in bus.frames():
+            image = frame.image
+            for x1, y1, x2, y2, *_ in frame.metadata.get('boxes') or []:
+                cv2.rectangle(image, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+            cv2.imshow(bus.name, image)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
@@ -0,0 +1,167 @@
+# inference_scheduler.py - Priority-aware Inference Scheduling Across Cameras
+
+import time
+import threading
+
+
+class _Share:
+    """One camera's standing with the scheduler"""
+
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.weight = 1.0
+        self.finish = 0.0          # virtual finish time of its last grant
+        self.cost = 0.05           # moving average of inference seconds per frame
+        self.last_grant = None     # or when it first asked, before any grant
+        self.granted = 0
+        self.deferred = 0
+
+
+class Grant:
+    """A camera's turn at the detector; hand it back with ``release``"""
+
+    __slots__ = ('camera_id', 'start', 'requested', 'waited')
+
+    def __init__(self, camera_id, start, requested):
+        self.camera_id = camera_id
+        self.start = start
+        self.requested = requested
+        self.waited = None
+
+
+class InferenceScheduler:
+    """Decides which camera runs detection next when several share one box.
+
+    Cameras ask for a turn before every detection. Turns are handed out by
+    weighted fair queuing: each camera's virtual finish time advances by
+    its measured inference cost divided by its weight, and the waiting
+    camera that would finish first goes next. So a camera with twice the
+    weight gets about twice the detections under contention, and an
+    uncontended camera is never slowed down.
+
+    Two limits sit on top. ``max_concurrent`` detections run at once, and
+    ``cpu_budget`` caps the inference seconds spent per wall-clock second
+    across all cameras (a token bucket; 0 = unlimited). A camera that has not
+    had a turn for ``1 / min_fps`` seconds jumps the queue, so low-priority
+    cameras slow down but never starve.
+    """
+
+    def __init__(self, max_concurrent=1, cpu_budget=0.0, min_fps=0.5):
+        self.max_concurrent = max_concurrent
+        self.cpu_budget = cpu_budget
+        self.min_fps = min_fps
+        self._shares = {}
+        self._waiting = {}
+        self._running = 0
+        self._virtual_time = 0.0
+        self._tokens = cpu_budget
+        self._refilled = time.monotonic()
+        self._cond = threading.Condition()
+
+    def configure(self, max_concurrent=None, cpu_budget=None, min_fps=None):
+        with self._cond:
+            if max_concurrent is not None:
+                self.max_concurrent = max_concurrent
+            if cpu_budget is not None:
+                self.cpu_budget = cpu_budget
+                self._tokens = min(self._tokens, cpu_budget)
+            if min_fps is not None:
+                self.min_fps = min_fps
+            self._cond.notify_all()
+
+    def acquire(self, camera_id, weight=1.0, timeout=None):
+        """Wait for a turn; returns a ``Grant``, or None when ``timeout`` passed first"""
+        now = time.monotonic()
+        deadline = now + timeout if timeout is not None else None
+        with self._cond:
+            share = self._shares.get(camera_id)
+            if share is None:
+                share = self._shares[camera_id] = _Share(camera_id)
+            share.weight = max(weight, 0.01)
+            if share.last_grant is None:
+                share.last_grant = now
+            grant = Grant(camera_id, max(self._virtual_time, share.finish), now)
+            self._waiting[camera_id] = grant
+            while True:
+                now = time.monotonic()
+                if self._next(now) is grant:
+                    wait = self._capacity_wait(now)
+                    if wait == 0:
+                        break
+                else:
+                    wait = None
+                if deadline is not None:
+                    if now >= deadline:
+                        del self._waiting[camera_id]
+                        share.deferred += 1
+                        self._cond.notify_all()
+                        return None
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._cond.wait(wait)
+
+            del self._waiting[camera_id]
+            self._running += 1
+            self._virtual_time = max(self._virtual_time, grant.start)
+            share.finish = grant.start + share.cost / share.weight
+            share.last_grant = now
+            share.granted += 1
+            grant.waited = now - grant.requested
+            return grant
+
+    def release(self, grant, seconds):
+        """Finish a turn that spent ``seconds`` in inference"""
+        with self._cond:
+            self._running -= 1
+            share = self._shares[grant.camera_id]
+            share.cost = 0.8 * share.cost + 0.2 * seconds
+            if self.cpu_budget:
+                self._refill(time.monotonic())
+                self._tokens -= seconds
+            self._cond.notify_all()
+
+    def _next(self, now):
+        """The waiting grant that goes next (caller holds the lock)"""
+        if not self._waiting:
+            return None
+        if self.min_fps:
+            # Starving cameras first, longest-starved first
+            period = 1.0 / self.min_fps
+            starving = [g for g in self._waiting.values() if now - self._shares[g.camera_id].last_grant >= period]
+            if starving:
+                return min(starving, key=lambda g: self._shares[g.camera_id].last_grant)
+        return min(self._waiting.values(),
+                   key=lambda g: g.start + self._shares[g.camera_id].cost / self._shares[g.camera_id].weight)
+
+    def _refill(self, now):
+        self._tokens = min(self.cpu_budget, self._tokens + (now - self._refilled) * self.cpu_budget)
+        self._refilled = now
+
+    def _capacity_wait(self, now):
+        """Seconds until another detection may start (0 = now; None = when one finishes)"""
+        if self._running >= max(self.max_concurrent, 1):
+            return None
+        if not self.cpu_budget:
+            return 0
+        self._refill(now)
+        if self._tokens > 0:
+            return 0
+        return -self._tokens / self.cpu_budget + 0.001
+
+    def status(self):
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'cpu_budget': self.cpu_budget,
+                'min_fps': self.min_fps,
+                'running': self._running,
+                'waiting': sorted(self._waiting),
+                'tokens': round(self._tokens, 3) if self.cpu_budget else None,
+                'cameras': {
+                    camera_id: {
+                        'weight': round(share.weight, 2),
+                        'cost_ms': round(share.cost * 1000, 1),
+                        'granted': share.granted,
+                        'deferred': share.deferred
+                    } for camera_id, share in self._shares.items()
+                }
+            }
@@ -0,0 +1,336 @@
+# inference_workers.py - Multi-process YOLO Inference Pool
+
+import os
+import time
+import queue
+import logging
+import itertools
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def _worker_main(worker_id, slot_names, task_queue, result_queue, loader_kwargs, escalation_kwargs=None):
+    """Worker process entry point: load the model(s), then serve frames from shared memory"""
+    # Imported here so the parent never pays for torch in the worker's stead
+    from detector import DetectorLoader, extract_person_boxes
+
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    loader = DetectorLoader(**loader_kwargs).start()
+    # The cascade's large model loads alongside and stays resident too
+    escalation_loader = DetectorLoader(**escalation_kwargs).start() if escalation_kwargs else None
+    model = loader.wait()
+    if model is None:
+        result_queue.put(('failed', worker_id, loader.error))
+        return
+    escalation_model = escalation_loader.wait() if escalation_loader else None
+    if escalation_loader is not None and escalation_model is None:
+        result_queue.put(('escalation_failed', worker_id, escalation_loader.error))
+    result_queue.put(('ready', worker_id, (loader.source, escalation_model is not None)))
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            request_id, slot_index, shape, conf, escalate, imgsz = task
+            try:
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot_index].buf)
+                if escalate:
+                    if escalation_model is None:
+                        raise RuntimeError("escalation model not loaded")
+                    results = escalation_model(frame, conf=conf, classes=[0], imgsz=imgsz, verbose=False)
+                else:
+                    results = model(frame, conf=conf, classes=[0], verbose=False)
+                result_queue.put(('result', worker_id, (request_id, slot_index, extract_person_boxes(results))))
+            except Exception as e:
+                result_queue.put(('error', worker_id, (request_id, slot_index, str(e))))
+    finally:
+        for shm in slots:
+            shm.close()
+
+
+# A worker whose oldest request is this many request timeouts old is hung, not slow
+STUCK_TIMEOUTS = 3
+
+
+class _PendingRequest:
+    __slots__ = ('event', 'boxes', 'worker_id', 'slot_index', 'sent_at')
+
+    def __init__(self, slot_index):
+        self.event = threading.Event()
+        self.boxes = None
+        self.worker_id = None
+        self.slot_index = slot_index
+        self.sent_at = time.monotonic()
+
+
+class InferencePool:
+    """Run YOLO in separate processes so inference never holds the web server's GIL.
+
+    Frames are copied once into pre-allocated ``multiprocessing.shared_memory``
+    slots; only a small ``(request_id, slot, shape, conf)`` tuple crosses the
+    process boundary, and results come back as plain box tuples. A supervisor
+    thread restarts crashed or hung workers and fails their in-flight
+    requests so callers never hang and slots are never lost. With ``escalation_kwargs`` every worker also keeps
+    the detector cascade's large model loaded (``detect(..., escalate=True)``).
+    """
+
+    def __init__(self, num_workers=None, max_frame_size=(1920, 1080), slots_per_worker=2,
+                 request_timeout=5.0, loader_kwargs=None, escalation_kwargs=None):
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.max_frame_size = max_frame_size
+        self.request_timeout = request_timeout
+        self.loader_kwargs = dict(loader_kwargs or {})
+        self.escalation_kwargs = dict(escalation_kwargs) if escalation_kwargs else None
+        self.slot_bytes = max_frame_size[0] * max_frame_size[1] * 3
+
+        self.logger = logging.getLogger('InferencePool')
+        self._ctx = mp.get_context('spawn')
+        self._slots = []
+        self._free_slots = queue.Queue()
+        self._workers = {}
+        self._task_queues = {}
+        self._in_flight = {}
+        self._ready_workers = set()
+        self._escalation_workers = set()
+        self._failed_workers = set()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._result_queue = None
+        self._ready = threading.Event()
+        self._running = False
+        self.restarts = 0
+
+        for _ in range(self.num_workers * slots_per_worker):
+            shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes)
+            self._free_slots.put(len(self._slots))
+            self._slots.append(shm)
+
+    def start(self):
+        """Spawn workers and the result/supervisor threads"""
+        if self._running:
+            return self
+        self._running = True
+        self._result_queue = self._ctx.Queue()
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+        threading.Thread(target=self._collect_results, name='inference-results', daemon=True).start()
+        threading.Thread(target=self._supervise, name='inference-supervisor', daemon=True).start()
+        self.logger.info(f"🚀 Started {self.num_workers} inference workers")
+        return self
+
+    def _spawn(self, worker_id):
+        kwargs = dict(self.loader_kwargs)
+        # Only one worker writes the fused-model cache to avoid racing exports
+        kwargs['export_cache'] = kwargs.get('export_cache', True) and worker_id == 0
+        escalation_kwargs = None
+        if self.escalation_kwargs:
+            escalation_kwargs = dict(self.escalation_kwargs)
+            escalation_kwargs['export_cache'] = escalation_kwargs.get('export_cache', True) and worker_id == 0
+        task_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, [shm.name for shm in self._slots], task_queue, self._result_queue, kwargs,
+                  escalation_kwargs),
+            name=f'inference-worker-{worker_id}',
+            daemon=True
+        )
+        process.start()
+        with self._lock:
+            self._workers[worker_id] = process
+            self._task_queues[worker_id] = task_queue
+            self._in_flight[worker_id] = set()
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    @property
+    def failed(self):
+        """Every worker gave up loading a model; the pool will never become ready"""
+        return len(self._failed_workers) >= self.num_workers
+
+    def wait_ready(self, timeout=None):
+        """Block until at least one worker has loaded the model; False on timeout or when all failed"""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._ready.wait(0.5):
+            if self.failed or (deadline is not None and time.monotonic() >= deadline):
+                return False
+        return True
+
+    @property
+    def escalation(self):
+        """Whether a ready worker carries the cascade's escalation model"""
+        return bool(self._escalation_workers)
+
+    def detect(self, frame, conf, escalate=False, imgsz=None):
+        """Detect people in ``frame``; returns ``(x1, y1, x2, y2, conf)`` tuples or None on failure
+
+        ``escalate`` runs the cascade's large model (at ``imgsz``) instead of the small one.
+        """
+        if not self._ready.is_set():
+            return None
+
+        scale = 1.0
+        height, width = frame.shape[:2]
+        if width * height * 3 > self.slot_bytes:
+            import cv2
+            scale = min(self.max_frame_size[0] / width, self.max_frame_size[1] / height)
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)))
+
+        try:
+            slot_index = self._free_slots.get(timeout=self.request_timeout)
+        except queue.Empty:
+            self.logger.warning("⚠️ No free shared-memory slot, dropping frame")
+            return None
+
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._slots[slot_index].buf)
+        np.copyto(view, frame)
+
+        request_id = next(self._ids)
+        pending = _PendingRequest(slot_index)
+        with self._lock:
+            worker_id = self._pick_worker(escalate)
+            if worker_id is None:
+                self._free_slots.put(slot_index)
+                return None
+            pending.worker_id = worker_id
+            pending.sent_at = time.monotonic()
+            self._pending[request_id] = pending
+            self._in_flight[worker_id].add(request_id)
+            task_queue = self._task_queues[worker_id]
+        task_queue.put((request_id, slot_index, frame.shape, conf, escalate, imgsz))
+
+        if not pending.event.wait(self.request_timeout):
+            # The slot stays owned by the worker until its late result arrives
+            self.logger.warning(f"⚠️ Inference request {request_id} timed out")
+            return None
+
+        boxes = pending.boxes
+        if boxes is not None and scale != 1.0:
+            boxes = [(x1 / scale, y1 / scale, x2 / scale, y2 / scale, c) for x1, y1, x2, y2, c in boxes]
+        return boxes
+
+    def _pick_worker(self, escalate=False):
+        """Least-loaded ready worker, one with the escalation model if asked (caller holds the lock)"""
+        ready = self._escalation_workers if escalate else self._ready_workers
+        candidates = [w for w in ready if w in self._workers]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: len(self._in_flight[w]))
+
+    def _finish(self, request_id, worker_id, slot_index, boxes):
+        with self._lock:
+            self._in_flight.get(worker_id, set()).discard(request_id)
+            pending = self._pending.pop(request_id, None)
+        # A late result for a request already finished by _supervise: its slot was freed then
+        if pending is None:
+            return
+        self._free_slots.put(slot_index)
+        pending.boxes = boxes
+        pending.event.set()
+
+    def _collect_results(self):
+        while self._running:
+            try:
+                kind, worker_id, payload = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind == 'result':
+                request_id, slot_index, boxes = payload
+                self._finish(request_id, worker_id, slot_index, boxes)
+            elif kind == 'error':
+                request_id, slot_index, message = payload
+                self.logger.error(f"❌ Worker {worker_id} inference error: {message}")
+                self._finish(request_id, worker_id, slot_index, None)
+            elif kind == 'ready':
+                source, escalation = payload
+                with self._lock:
+                    self._ready_workers.add(worker_id)
+                    if escalation:
+                        self._escalation_workers.add(worker_id)
+                self._ready.set()
+                self.logger.info(f"✅ Inference worker {worker_id} ready ({source}"
+                                 f"{', with escalation model' if escalation else ''})")
+            elif kind == 'escalation_failed':
+                self.logger.warning(f"⚠️ Inference worker {worker_id} has no escalation model: {payload}")
+            elif kind == 'failed':
+                # A worker that can't load a model won't do better on restart
+                self._failed_workers.add(worker_id)
+                self.logger.error(f"❌ Inference worker {worker_id} could not load a model: {payload}")
+
+    def _oldest_request_age(self, worker_id):
+        """Seconds the worker's oldest unanswered request has been waiting (0 when idle)"""
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - self._pending[request_id].sent_at
+                    for request_id in self._in_flight.get(worker_id, ()) if request_id in self._pending]
+        return max(ages, default=0.0)
+
+    def _supervise(self):
+        while self._running:
+            time.sleep(1.0)
+            for worker_id, process in list(self._workers.items()):
+                if not self._running or worker_id in self._failed_workers:
+                    continue
+                if process.is_alive():
+                    age = self._oldest_request_age(worker_id)
+                    if age <= STUCK_TIMEOUTS * self.request_timeout:
+                        continue
+                    self.logger.error(f"❌ Inference worker {worker_id} stuck for {age:.0f}s, terminating")
+                    process.terminate()
+                    process.join(timeout=2)
+                    if process.is_alive():
+                        process.kill()
+                        process.join(timeout=2)
+                self.logger.error(f"❌ Inference worker {worker_id} exited ({process.exitcode}), restarting")
+                with self._lock:
+                    self._ready_workers.discard(worker_id)
+                    self._escalation_workers.discard(worker_id)
+                    orphaned = list(self._in_flight.get(worker_id, ()))
+                    if not self._ready_workers:
+                        self._ready.clear()
+                for request_id in orphaned:
+                    pending = self._pending.get(request_id)
+                    if pending is not None:
+                        self._finish(request_id, worker_id, pending.slot_index, None)
+                self.restarts += 1
+                self._spawn(worker_id)
+
+    def status(self):
+        with self._lock:
+            return {
+                'workers': self.num_workers,
+                'ready_workers': len(self._ready_workers),
+                'in_flight': sum(len(v) for v in self._in_flight.values()),
+                'free_slots': self._free_slots.qsize(),
+                'escalation_workers': len(self._escalation_workers),
+                'restarts': self.restarts
+            }
+
+    def close(self):
+        """Stop workers and release shared memory"""
+        self._running = False
+        for worker_id, task_queue in list(self._task_queues.items()):
+            try:
+                task_queue.put(None)
+            except Exception:
+                pass
+        for process in self._workers.values():
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        for shm in self._slots:
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.logger.info("✅ Inference pool shut down")
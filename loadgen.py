@@ -0,0 +1,372 @@
+# loadgen.py - Synthetic Multi-camera Load Generator
+
+import os
+import sys
+import json
+import time
+import math
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from dataclasses import replace
+
+import cv2
+import numpy as np
+
+from config import Config
+
+RESULTS_DIRECTORY = os.path.join('benchmarks', 'results')
+
+
+class SyntheticCapture:
+    """Procedural camera: people-shaped sprites walking across a static scene.
+
+    Behaves like an ``rtsp`` ``cv2.VideoCapture`` (``read()`` paced to ``fps``),
+    so it can be handed to ``CameraConnection`` through an opener. The number
+    of people on screen cycles over time so both the access-granted and the
+    violation paths get exercised.
+    """
+
+    def __init__(self, width=1280, height=720, fps=15, max_people=3, seed=0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.max_people = max_people
+        self.rng = np.random.default_rng(seed)
+        self.frames_read = 0
+        self._next_due = None
+        self._opened = True
+
+        # Static background with some texture so JPEG encoding cost is realistic
+        background = self.rng.integers(60, 120, (height // 8, width // 8, 3), dtype=np.uint8)
+        self.background = cv2.resize(background, (width, height), interpolation=cv2.INTER_LINEAR)
+        self.walkers = [
+            {
+                'x': self.rng.uniform(0, width),
+                'speed': self.rng.uniform(0.05, 0.15) * width / fps * self.rng.choice((-1, 1)),
+                'y': self.rng.uniform(0.35, 0.6) * height,
+                'scale': self.rng.uniform(0.8, 1.2) * height / 720,
+                'color': tuple(int(c) for c in self.rng.integers(30, 230, 3))
+            }
+            for _ in range(max_people)
+        ]
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def people_on_screen(self):
+        # 0..max_people..0 over roughly 20 seconds
+        phase = (self.frames_read / self.fps) / 20.0
+        return int(round((1 - math.cos(2 * math.pi * phase)) / 2 * self.max_people))
+
+    def _draw_person(self, frame, walker):
+        s = walker['scale']
+        x, y = int(walker['x']), int(walker['y'])
+        color = walker['color']
+        cv2.circle(frame, (x, y - int(95 * s)), int(18 * s), (180, 150, 130), -1)
+        cv2.rectangle(frame, (x - int(25 * s), y - int(75 * s)), (x + int(25 * s), y + int(30 * s)), color, -1)
+        stride = int(15 * s * math.sin(self.frames_read / 3 + walker['x'] / 50))
+        cv2.line(frame, (x - int(10 * s), y + int(30 * s)), (x - int(10 * s) + stride, y + int(120 * s)),
+                 (40, 40, 60), max(int(12 * s), 1))
+        cv2.line(frame, (x + int(10 * s), y + int(30 * s)), (x + int(10 * s) - stride, y + int(120 * s)),
+                 (40, 40, 60), max(int(12 * s), 1))
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        now = time.perf_counter()
+        if self._next_due is None:
+            self._next_due = now
+        elif self._next_due > now:
+            time.sleep(self._next_due - now)
+        self._next_due += 1.0 / self.fps
+
+        frame = self.background.copy()
+        for walker in self.walkers[:self.people_on_screen()]:
+            walker['x'] += walker['speed']
+            if not 0 <= walker['x'] <= self.width:
+                walker['speed'] = -walker['speed']
+                walker['x'] = min(max(walker['x'], 0), self.width)
+            self._draw_person(frame, walker)
+        cv2.putText(frame, datetime.now().strftime('%H:%M:%S.%f')[:-3], (20, self.height - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        self.frames_read += 1
+        return True, frame
+
+    def release(self):
+        self._opened = False
+
+
+def make_opener(source, camera_id, width, height, fps):
+    """Opener for ``CameraConnection``: a looped clip or a synthetic scene"""
+    if source == 'synthetic':
+        return lambda url: SyntheticCapture(width, height, fps, seed=camera_id)
+    from replay import VideoFileCapture
+
+    def open_clip(url):
+        capture = VideoFileCapture(source, realtime=True, loop=True)
+        return capture if capture.isOpened() else None
+    return open_clip
+
+
+def serve(args):
+    """Run the real server with ``--cameras`` simulated cameras (child process of ``sweep``)"""
+    import async_runtime
+    async_runtime.monkey_patch()
+
+    # Importing app opens the database and start_background_services sweeps
+    # retention: give this throwaway server its own database and log, and
+    # keep the sweeper and background jobs away from real clips and rows
+    scratch = tempfile.mkdtemp(prefix='vault-loadgen-')
+    Config.DATABASE = replace(Config.DATABASE, url='sqlite:///' + os.path.join(scratch, 'loadgen.db'))
+    Config.DETECTION_LOG = replace(Config.DETECTION_LOG, directory=os.path.join(scratch, 'detection_log'))
+    Config.RETENTION = replace(Config.RETENTION, clips_days=0, violations_days=0, detections_days=0)
+    Config.MEDIA_JOBS = replace(Config.MEDIA_JOBS, workers=0)
+
+    from app import app, socketio, security_system, start_background_services
+    from camera_processor import CameraProcessor
+    from replay import ReplaySecuritySystem
+
+    start_background_services()
+    # Simulated doors must not write status rows, violations or clips into the real database
+    system = ReplaySecuritySystem()
+    # ...but they do take turns at the detector like real cameras
+    system.scheduler = security_system.scheduler
+    for camera_id in range(1, args.cameras + 1):
+        processor = CameraProcessor(system, socketio, security_system.detector, security_system.inference_pool,
+                                    camera_id=camera_id,
+                                    capture_opener=make_opener(args.source, camera_id, args.width,
+                                                               args.height, args.fps),
+                                    settings=replace(Config.CAMERA, id=camera_id, record=False,
+                                                     rtsp_url=f"synthetic://camera/{camera_id}"),
+                                    escalation_detector=security_system.escalation_detector)
+        threading.Thread(target=processor.run, name=f'loadgen-camera-{camera_id}', daemon=True).start()
+
+    options = async_runtime.server_options()
+    options.update(host='127.0.0.1', port=args.port)
+    socketio.run(app, **options)
+
+
+class Viewer:
+    """A headless dashboard: counts ``video_frame`` events and their latency"""
+
+    def __init__(self, url, ack=True):
+        import socketio as socketio_client
+
+        self.url = url
+        self.ack = ack
+        self.latencies = []
+        self.frames = {}
+        self.recording = False
+        self._last_ack = {}
+        self.client = socketio_client.Client(reconnection=False)
+        self.client.on('video_frame', self.on_frame)
+
+    def connect(self):
+        self.client.connect(self.url, transports=['websocket'])
+
+    def on_frame(self, data):
+        received = time.time() * 1000
+        if not self.recording:
+            return
+        camera_id = data.get('camera_id', 1)
+        self.frames[camera_id] = self.frames.get(camera_id, 0) + 1
+        if data.get('captured_at'):
+            self.latencies.append(received - data['captured_at'])
+            # Acknowledge like the dashboard does (1/s per camera) so the
+            # server's glass-to-dashboard histogram sees the load too
+            if self.ack and received - self._last_ack.get(camera_id, 0) >= 1000:
+                self._last_ack[camera_id] = received
+                self.client.emit('frame_ack', {'camera_id': camera_id, 'captured_at': data['captured_at']})
+
+    def disconnect(self):
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_usage(pid):
+    """``(cpu seconds, rss MB)`` of a process from ``/proc`` (Linux only)"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        ticks = os.sysconf('SC_CLK_TCK')
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        rss = int(fields[21]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+        return cpu, rss
+    except (OSError, ValueError, IndexError):
+        return None, None
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 1)
+
+
+def wait_for_server(port, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return False
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            if s.connect_ex(('127.0.0.1', port)) == 0:
+                return True
+        time.sleep(0.25)
+    return False
+
+
+def run_point(args, cameras, viewers):
+    """Measure one (cameras, viewers) point of the capacity curve"""
+    port = free_port()
+    command = [sys.executable, os.path.abspath(__file__), 'serve', '--cameras', str(cameras),
+               '--port', str(port), '--source', args.source, '--fps', str(args.fps),
+               '--width', str(args.width), '--height', str(args.height)]
+    env = dict(os.environ, MESSAGE_QUEUE_URL='', NODE_ROLE='all', EMBEDDED_BROKER='')
+    if args.workers is not None:
+        env['INFERENCE_WORKERS'] = str(args.workers)
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL,
+                              stderr=None if args.verbose else subprocess.DEVNULL)
+    clients = []
+    try:
+        if not wait_for_server(port, server, args.startup_timeout):
+            return {'cameras': cameras, 'viewers': viewers, 'error': 'server did not start'}
+
+        for _ in range(viewers):
+            viewer = Viewer(f'http://127.0.0.1:{port}')
+            viewer.connect()
+            clients.append(viewer)
+
+        # Let the model load and the cameras connect before measuring
+        time.sleep(args.warmup)
+        cpu_before, _ = process_usage(server.pid)
+        for viewer in clients:
+            viewer.recording = True
+        time.sleep(args.duration)
+        for viewer in clients:
+            viewer.recording = False
+        cpu_after, rss = process_usage(server.pid)
+    finally:
+        for viewer in clients:
+            viewer.disconnect()
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    latencies = [latency for viewer in clients for latency in viewer.latencies]
+    received = sum(sum(viewer.frames.values()) for viewer in clients)
+    per_camera_fps = [viewer.frames.get(camera_id, 0) / args.duration
+                      for viewer in clients for camera_id in range(1, cameras + 1)]
+    return {
+        'cameras': cameras,
+        'viewers': viewers,
+        'fps_per_camera': round(sum(per_camera_fps) / len(per_camera_fps), 2) if per_camera_fps else 0,
+        'min_fps_per_camera': round(min(per_camera_fps), 2) if per_camera_fps else 0,
+        'frames_received': received,
+        'cpu_percent': (round((cpu_after - cpu_before) / args.duration * 100, 1)
+                        if cpu_before is not None and cpu_after is not None else None),
+        'rss_mb': round(rss, 1) if rss is not None else None,
+        'latency_p50_ms': percentile(latencies, 0.50),
+        'latency_p99_ms': percentile(latencies, 0.99)
+    }
+
+
+def parse_counts(text):
+    return [int(v) for v in text.split(',') if v.strip()]
+
+
+def sweep(args):
+    points = []
+    print(f"{'cams':>5} {'views':>5} {'fps/cam':>8} {'min':>6} {'cpu%':>7} {'rss MB':>8} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+    for cameras in parse_counts(args.cameras):
+        for viewers in parse_counts(args.viewers):
+            point = run_point(args, cameras, viewers)
+            points.append(point)
+            if 'error' in point:
+                print(f"{cameras:>5} {viewers:>5}  ❌ {point['error']}")
+                continue
+            print(f"{cameras:>5} {viewers:>5} {point['fps_per_camera']:>8} {point['min_fps_per_camera']:>6} "
+                  f"{point['cpu_percent']!s:>7} {point['rss_mb']!s:>8} "
+                  f"{point['latency_p50_ms']!s:>8} {point['latency_p99_ms']!s:>8}")
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'source': args.source,
+        'source_fps': args.fps,
+        'frame_size': [args.width, args.height],
+        'inference_workers': args.workers,
+        'duration_s': args.duration,
+        'cpus': os.cpu_count(),
+        'points': points
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        output = os.path.join(RESULTS_DIRECTORY, f"capacity_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Capacity curve written to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Capacity test with simulated cameras and dashboards')
+    sub = parser.add_subparsers(dest='command')
+
+    def common(p):
+        p.add_argument('--source', default='synthetic',
+                       help="'synthetic' for generated people sprites, or a video file to loop")
+        p.add_argument('--fps', type=int, default=15, help='Frame rate of each simulated camera')
+        p.add_argument('--width', type=int, default=1280)
+        p.add_argument('--height', type=int, default=720)
+
+    sweep_parser = sub.add_parser('sweep', help='Measure a capacity curve (default)')
+    common(sweep_parser)
+    sweep_parser.add_argument('--cameras', default='1,2,4', help='Comma-separated camera counts')
+    sweep_parser.add_argument('--viewers', default='1,5', help='Comma-separated dashboard client counts')
+    sweep_parser.add_argument('--duration', type=float, default=20, help='Seconds measured per point')
+    sweep_parser.add_argument('--warmup', type=float, default=10,
+                              help='Seconds to let the model load and cameras connect')
+    sweep_parser.add_argument('--startup-timeout', type=float, default=60)
+    sweep_parser.add_argument('--workers', type=int, help='INFERENCE_WORKERS for the server under test')
+    sweep_parser.add_argument('--output', help='Result file (default: benchmarks/results/capacity_<time>.json)')
+    sweep_parser.add_argument('--verbose', action='store_true', help='Show server logs')
+
+    serve_parser = sub.add_parser('serve', help='Run the server with simulated cameras only')
+    common(serve_parser)
+    serve_parser.add_argument('--cameras', type=int, default=1)
+    serve_parser.add_argument('--port', type=int, default=5000)
+
+    args = parser.parse_args(sys.argv[1:] if len(sys.argv) > 1 and sys.argv[1] in ('sweep', 'serve')
+                             else ['sweep'] + sys.argv[1:])
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.command == 'serve':
+        serve(args)
+    else:
+        sweep(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+# local_broker.py - Embedded Redis-compatible Pub/Sub Broker
+
+import socket
+import logging
+import argparse
+import threading
+import socketserver
+
+
+def _encode(value, push=False):
+    """Encode a Python value as a RESP reply (``push`` uses the RESP3 push type)"""
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, dict):
+        return b'%%%d\r\n' % len(value) + b''.join(_encode(k) + _encode(v) for k, v in value.items())
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    if isinstance(value, (list, tuple)):
+        return (b'>' if push else b'*') + b'%d\r\n' % len(value) + b''.join(_encode(v) for v in value)
+    raise TypeError(f"Cannot encode {type(value)}")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.channels = set()
+        self.resp3 = False
+        self.write_lock = threading.Lock()
+
+    def send_push(self, items):
+        """Pub/sub replies are push messages under RESP3, arrays under RESP2"""
+        self.send(_encode(items, push=self.resp3))
+
+    def send(self, data):
+        with self.write_lock:
+            self.wfile.write(data)
+            self.wfile.flush()
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            # Inline command (e.g. typed into telnet/redis-cli --no-raw)
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        broker = self.server.broker
+        try:
+            while True:
+                args = self.read_command()
+                if args is None:
+                    break
+                if not args:
+                    continue
+                command = args[0].upper()
+                if command == b'PUBLISH' and len(args) == 3:
+                    self.send(_encode(broker.publish(args[1], args[2])))
+                elif command == b'SUBSCRIBE':
+                    for channel in args[1:]:
+                        self.channels.add(channel)
+                        broker.subscribe(channel, self)
+                        self.send_push([b'subscribe', channel, len(self.channels)])
+                elif command == b'UNSUBSCRIBE':
+                    for channel in (args[1:] or list(self.channels)):
+                        self.channels.discard(channel)
+                        broker.unsubscribe(channel, self)
+                        self.send_push([b'unsubscribe', channel, len(self.channels)])
+                elif command == b'PING':
+                    payload = args[1] if len(args) > 1 else b''
+                    if self.channels and not self.resp3:
+                        self.send(_encode([b'pong', payload]))
+                    else:
+                        self.send(b'+PONG\r\n' if len(args) == 1 else _encode(payload))
+                elif command == b'HELLO':
+                    self.resp3 = len(args) > 1 and args[1] == b'3'
+                    self.send(_encode({b'server': b'redis', b'version': b'7.0.0',
+                                       b'proto': 3 if self.resp3 else 2, b'mode': b'standalone',
+                                       b'role': b'master', b'modules': []}))
+                elif command in (b'SELECT', b'AUTH', b'CLIENT', b'READONLY'):
+                    self.send(b'+OK\r\n')
+                elif command == b'ECHO' and len(args) == 2:
+                    self.send(_encode(args[1]))
+                elif command == b'INFO':
+                    self.send(_encode(b'# Server\r\nredis_version:7.0.0-local\r\n'))
+                elif command == b'QUIT':
+                    self.send(b'+OK\r\n')
+                    break
+                else:
+                    self.send(b'-ERR unknown command \'' + args[0] + b'\'\r\n')
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            for channel in list(self.channels):
+                broker.unsubscribe(channel, self)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalBroker:
+    """A tiny in-process stand-in for Redis pub/sub.
+
+    Implements just the commands Flask-SocketIO's message queue and the
+    camera control channel use (PUBLISH, SUBSCRIBE, UNSUBSCRIBE, PING), so
+    multi-worker and camera/web split deployments can be run and tested on
+    one machine without an external Redis. Not a general-purpose store.
+    """
+
+    def __init__(self, host='127.0.0.1', port=6379):
+        self.host = host
+        self.port = port
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self.logger = logging.getLogger('LocalBroker')
+
+    @property
+    def url(self):
+        return f"redis://{self.host}:{self.port}/0"
+
+    def start(self):
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.broker = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='local-broker', daemon=True).start()
+        self.logger.info(f"📮 Local message broker listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def subscribe(self, channel, handler):
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(handler)
+
+    def unsubscribe(self, channel, handler):
+        with self._lock:
+            self._subscribers.get(channel, set()).discard(handler)
+
+    def publish(self, channel, message):
+        with self._lock:
+            handlers = list(self._subscribers.get(channel, ()))
+        delivered = 0
+        for handler in handlers:
+            try:
+                handler.send_push([b'message', channel, message])
+                delivered += 1
+            except (ConnectionError, OSError):
+                self.unsubscribe(channel, handler)
+        return delivered
+
+
+def is_port_in_use(host, port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        return s.connect_ex((host, port)) == 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Embedded Redis-compatible pub/sub broker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    broker = LocalBroker(args.host, args.port).start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        broker.stop()
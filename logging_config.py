@@ -0,0 +1,243 @@
+# logging_config.py - Central Asynchronous Logging Setup
+
+import os
+import re
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+try:
+    from pythonjsonlogger.json import JsonFormatter
+except ImportError:  # python-json-logger < 3
+    from pythonjsonlogger.jsonlogger import JsonFormatter
+
+from config import Config
+
+LOG_FILE_NAME = 'vault_security.log'
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+JSON_FORMAT = '%(asctime)s %(name)s %(levelname)s %(threadName)s %(message)s'
+
+# scheme://user:password@ in camera (RTSP) and broker URLs
+URL_CREDENTIALS = re.compile(r'\b([a-zA-Z][a-zA-Z0-9+.-]*://)[^\s/@:]*:[^\s/@]+@')
+
+_listener = None
+_lock = threading.Lock()
+
+
+def redact_credentials(text):
+    """``text`` with the user and password of any URL in it masked"""
+    return URL_CREDENTIALS.sub(r'\1***:***@', text)
+
+
+class RedactCredentialsFilter(logging.Filter):
+    """Mask URL credentials (e.g. RTSP logins) before a record reaches the log files"""
+
+    def filter(self, record):
+        message = record.getMessage()
+        redacted = redact_credentials(message)
+        if redacted != message:
+            record.msg = redacted
+            record.args = None
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Per call-site rate limiting with duplicate suppression.
+
+    Each logging call site (file + line) of each logger - camera loggers are
+    named ``Name[camera_id]`` - gets a window of ``period`` seconds. Within
+    it a message identical to one already logged is dropped, and records
+    below WARNING are capped at ``burst``; warnings and errors are only
+    deduplicated, so a new failure is never hidden behind chatter. When a
+    window that dropped records closes, the count is logged (see ``flush``),
+    so a flapping camera logs a handful of lines a minute instead of one per
+    frame.
+    """
+
+    def __init__(self, burst=5, period=60.0):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if getattr(record, 'rate_limit_summary', False):
+            return True
+        key = (record.pathname, record.lineno, record.name)
+        now = time.monotonic()
+        message = record.getMessage()
+        closed = None
+        with self._lock:
+            site = self._sites.get(key)
+            if site is not None and now - site['window_start'] >= self.period:
+                closed, site = site, None
+            if site is None:
+                self._sites[key] = {'window_start': now, 'count': 1, 'suppressed': 0,
+                                    'level': logging.NOTSET, 'messages': {message}}
+            elif message in site['messages'] or (record.levelno < logging.WARNING and site['count'] >= self.burst):
+                site['suppressed'] += 1
+                site['level'] = max(site['level'], record.levelno)
+                return False
+            else:
+                site['count'] += 1
+                site['messages'].add(message)
+        if closed is not None and closed['suppressed']:
+            self._report(key, closed)
+        return True
+
+    def flush(self):
+        """Log the suppressed counts of windows that have closed, and forget them"""
+        now = time.monotonic()
+        with self._lock:
+            closed = [(key, self._sites.pop(key)) for key, site in list(self._sites.items())
+                      if now - site['window_start'] >= self.period]
+        for key, site in closed:
+            if site['suppressed']:
+                self._report(key, site)
+
+    def _report(self, key, site):
+        pathname, lineno, name = key
+        logging.getLogger(name).log(
+            max(site['level'], logging.INFO),
+            "🔇 Suppressed %d similar messages from %s:%d in the last %.0fs",
+            site['suppressed'], os.path.basename(pathname), lineno, self.period,
+            extra={'rate_limit_summary': True, 'suppressed': site['suppressed']}
+        )
+
+
+def _flush_rate_limit(rate_limit):
+    while True:
+        time.sleep(min(rate_limit.period, 10.0))
+        rate_limit.flush()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller: records are dropped when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level=None, console=True, log_directory=None):
+    """Route all logging through one queue drained by a background listener.
+
+    Callers (camera threads, request handlers) only enqueue the record;
+    console output and JSON lines in rotated files under ``LOG_DIRECTORY``
+    are written on the listener thread. Safe to call more than once; later
+    calls are no-ops.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return _listener
+        settings = Config.LOGGING
+        log_directory = log_directory or Config.LOG_DIRECTORY
+        os.makedirs(log_directory, exist_ok=True)
+
+        file_handler = RotatingFileHandler(
+            os.path.join(log_directory, LOG_FILE_NAME),
+            maxBytes=settings.max_bytes,
+            backupCount=settings.backup_count,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonFormatter(JSON_FORMAT, rename_fields={'asctime': 'time', 'levelname': 'level',
+                                                                           'name': 'logger', 'threadName': 'thread'}))
+        handlers = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            handlers.append(console_handler)
+
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.queue_size))
+        queue_handler.addFilter(RedactCredentialsFilter())
+        rate_limit = RateLimitFilter(settings.rate_limit_burst, settings.rate_limit_period)
+        queue_handler.addFilter(rate_limit)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level or settings.level)
+
+        # Per-request and per-packet logs are opt-in (see ServerConfig)
+        logging.getLogger('werkzeug').setLevel(logging.INFO if Config.SERVER.access_log else logging.WARNING)
+        for name in ('socketio', 'engineio', 'socketio.server', 'engineio.server'):
+            logging.getLogger(name).setLevel(logging.INFO if Config.SERVER.protocol_logging else logging.WARNING)
+
+        _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Reports suppressed counts even when the noisy call site has gone quiet
+        threading.Thread(target=_flush_rate_limit, args=(rate_limit,), name='log-rate-limit', daemon=True).start()
+        atexit.register(_listener.stop)
+        return _listener
+
+
+def _level_number(name):
+    value = logging.getLevelName(str(name).upper())
+    return value if isinstance(value, int) else 0
+
+
+def log_files(log_directory=None):
+    """Current and rotated log files, oldest first"""
+    log_directory = log_directory or Config.LOG_DIRECTORY
+    base = os.path.join(log_directory, LOG_FILE_NAME)
+    rotated = [f"{base}.{i}" for i in range(Config.LOGGING.backup_count, 0, -1)]
+    return [path for path in rotated + [base] if os.path.exists(path)]
+
+
+def _parse_since(since):
+    """ISO timestamp as naive local time, the clock the log lines are written in"""
+    if since.endswith(('Z', 'z')):
+        since = since[:-1] + '+00:00'
+    since_time = datetime.fromisoformat(since)
+    if since_time.tzinfo is not None:
+        since_time = since_time.astimezone().replace(tzinfo=None)
+    return since_time
+
+
+def iter_log_lines(level=None, since=None, logger=None, log_directory=None):
+    """Yield JSON log lines (oldest first), optionally filtered.
+
+    ``level`` is a minimum level name, ``since`` an ISO timestamp (local
+    time unless it carries an offset or ``Z``) and ``logger`` a logger-name
+    prefix. Files are read line by line so exports of any size stream with
+    constant memory.
+    """
+    min_level = _level_number(level) if level else None
+    since_time = _parse_since(since) if since else None
+    filtered = min_level is not None or since_time is not None or logger
+
+    for path in log_files(log_directory):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not filtered:
+                    yield line
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if min_level is not None and _level_number(entry.get('level')) < min_level:
+                    continue
+                if logger and not str(entry.get('logger', '')).startswith(logger):
+                    continue
+                if since_time is not None:
+                    try:
+                        if datetime.strptime(entry['time'][:19], '%Y-%m-%d %H:%M:%S') < since_time:
+                            continue
+                    except (KeyError, ValueError):
+                        continue
+                yield line
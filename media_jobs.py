@@ -0,0 +1,437 @@
+# media_jobs.py - Background Daily Summaries and Violation Contact Sheets
+
+import os
+import time
+import logging
+import itertools
+import threading
+import multiprocessing as mp
+from datetime import datetime, date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+
+# ---- worker side (runs in the pool's processes) ----
+
+_progress = None
+
+
+def _init_worker(progress, nice):
+    """Pool process start-up: report progress through ``progress`` and yield the CPU to detection"""
+    global _progress
+    _progress = progress
+    try:
+        os.nice(nice)
+    except (AttributeError, OSError):
+        pass
+    # One OpenCV thread per job, so ``workers`` really bounds the cores used
+    cv2.setNumThreads(1)
+
+
+def _report(job_id, fraction, message=None):
+    if _progress is not None:
+        _progress.put((job_id, min(max(fraction, 0.0), 1.0), message))
+
+
+def _stamp(frame, text, scale=0.6):
+    """White text on a dark band at the bottom left"""
+    (width, height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 1)
+    y = frame.shape[0] - 8
+    cv2.rectangle(frame, (0, y - height - 8), (width + 16, frame.shape[0]), (0, 0, 0), -1)
+    cv2.putText(frame, text, (8, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), 1, cv2.LINE_AA)
+
+
+def _write_atomically(path, write):
+    """Write through ``write(tmp_path)`` and move into place, so readers never see a partial file"""
+    stem, ext = os.path.splitext(path)
+    tmp = f'{stem}.part{ext}'
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def summary_plan(detection_log, camera_id, day, gap, padding):
+    """``[(clip_path, clip_start, start, end)]``: recorded stretches of ``day`` with people in view"""
+    day_start = datetime.combine(day, datetime.min.time()).timestamp()
+    day_end = day_start + 86400
+    stretches = detection_log.search(camera_id, day_start, day_end, min_people=1, gap=gap, limit=100000)['matches']
+    plan = []
+    for clip in sorted(detection_log.clips(camera_id, day_start, day_end), key=lambda c: c['start']):
+        for stretch in stretches:
+            start = max(stretch['start'] - padding, clip['start'], day_start)
+            end = min(stretch['end'] + padding, clip['end'], day_end)
+            if end > start:
+                plan.append((clip['clip_path'], clip['start'], start, end))
+    return plan
+
+
+def build_summary(job_id, camera_id, day, log_directory, clips_directory, output_path, options):
+    """Condense one camera's day into a single video of the recorded stretches with people, sped up"""
+    from detection_log import DetectionLog
+    detection_log = DetectionLog(log_directory)
+    day = date.fromisoformat(day)
+    plan = summary_plan(detection_log, camera_id, day, options['gap'], options['padding'])
+    if not plan:
+        return {'path': None, 'message': f"No recorded video with people on {day}"}
+    speed = options['speed']
+    total = sum(end - start for _, _, start, end in plan)
+    done = 0.0
+    stats = {'segments': len(plan), 'source_seconds': round(total, 1), 'frames': 0, 'missing_clips': 0}
+    _report(job_id, 0.0, f"{len(plan)} stretches, {total:.0f}s of video")
+
+    def write(tmp):
+        writer = None
+        size = None
+        nonlocal done
+        for clip_path, clip_start, start, end in plan:
+            capture = cv2.VideoCapture(os.path.join(clips_directory, clip_path))
+            if not capture.isOpened():
+                stats['missing_clips'] += 1
+                done += end - start
+                continue
+            fps = capture.get(cv2.CAP_PROP_FPS) or options['fps']
+            capture.set(cv2.CAP_PROP_POS_MSEC, max(start - clip_start, 0) * 1000)
+            for index in range(int((end - start) * fps)):
+                if not capture.grab():
+                    break
+                if index % speed:
+                    continue
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                if size is None:
+                    width = min(options['width'], frame.shape[1])
+                    size = (width, int(frame.shape[0] * width / frame.shape[1]) // 2 * 2)
+                    writer = cv2.VideoWriter(tmp, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+                    stats['fps'] = fps
+                if (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                moment = datetime.fromtimestamp(start + index / fps).strftime('%Y-%m-%d %H:%M:%S')
+                _stamp(frame, f"{moment}  x{speed}")
+                writer.write(frame)
+                stats['frames'] += 1
+                if stats['frames'] % 50 == 0:
+                    _report(job_id, (done + index / fps) / total)
+            capture.release()
+            done += end - start
+            _report(job_id, done / total)
+        if writer is None:
+            raise RuntimeError(f"None of the {len(plan)} clips for {day} could be read")
+        writer.release()
+
+    _write_atomically(output_path, write)
+    stats['path'] = os.path.basename(output_path)
+    stats['seconds'] = round(stats['frames'] / stats['fps'], 1)
+    return stats
+
+
+def find_clip(detection_log, clip_path, camera_ids):
+    """``(camera_id, start, end)`` of a clip from the detection log's clip index, or None"""
+    for camera_id in camera_ids:
+        for clip in detection_log.clips(camera_id):
+            if clip['clip_path'] == clip_path:
+                return camera_id, clip['start'], clip['end']
+    return None
+
+
+def build_contact_sheet(job_id, clip_path, title, log_directory, clips_directory, camera_ids, output_path, options):
+    """A grid of evenly spaced frames from a violation clip, each labelled with its time and people count"""
+    capture = cv2.VideoCapture(os.path.join(clips_directory, clip_path))
+    if not capture.isOpened():
+        raise RuntimeError(f"Clip {clip_path} is not available")
+    fps = capture.get(cv2.CAP_PROP_FPS) or options['fps']
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total <= 0:
+        raise RuntimeError(f"Clip {clip_path} has no frames")
+
+    # Wall-clock times and logged people counts, when the clip is in the detection log
+    found = None
+    counts = None
+    if log_directory and os.path.isdir(log_directory):
+        from detection_log import DetectionLog
+        detection_log = DetectionLog(log_directory)
+        found = find_clip(detection_log, clip_path, camera_ids)
+        if found is not None:
+            camera_id, start, end = found
+            logged = detection_log.frames(camera_id, start, end, limit=100000)
+            counts = (np.array([f['time'] for f in logged]), np.array([len(f['people']) for f in logged]))
+
+    columns, rows, tile_width = options['columns'], options['rows'], options['tile_width']
+    tiles = []
+    for i in range(columns * rows):
+        position = int((i + 0.5) * total / (columns * rows))
+        capture.set(cv2.CAP_PROP_POS_FRAMES, position)
+        ok, frame = capture.read()
+        if not ok:
+            break
+        height = int(frame.shape[0] * tile_width / frame.shape[1])
+        tile = cv2.resize(frame, (tile_width, height), interpolation=cv2.INTER_AREA)
+        label = f"+{position / fps:.1f}s"
+        if found is not None:
+            moment = found[1] + position / fps
+            label = datetime.fromtimestamp(moment).strftime('%H:%M:%S')
+            if counts is not None and len(counts[0]):
+                nearest = int(np.abs(counts[0] - moment).argmin())
+                if abs(counts[0][nearest] - moment) <= 2:
+                    label += f"  {counts[1][nearest]} people"
+        _stamp(tile, label, scale=0.45)
+        tiles.append(tile)
+        _report(job_id, (i + 1) / (columns * rows))
+    capture.release()
+    if not tiles:
+        raise RuntimeError(f"Could not read frames from {clip_path}")
+
+    height = tiles[0].shape[0]
+    tiles += [np.zeros_like(tiles[0])] * (columns * rows - len(tiles))
+    grid = np.vstack([np.hstack([cv2.resize(t, (tile_width, height)) for t in tiles[r * columns:(r + 1) * columns]])
+                      for r in range(rows)])
+    header = np.zeros((36, grid.shape[1], 3), dtype=np.uint8)
+    cv2.putText(header, title, (10, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+    sheet = np.vstack([header, grid])
+
+    def write(tmp):
+        if not cv2.imwrite(tmp, sheet, [cv2.IMWRITE_JPEG_QUALITY, 85]):
+            raise RuntimeError("Could not write the contact sheet")
+
+    _write_atomically(output_path, write)
+    return {'path': os.path.basename(output_path), 'tiles': len(tiles), 'clip_seconds': round(total / fps, 1),
+            'camera_id': found[0] if found else None}
+
+
+# ---- server side ----
+
+class Job:
+    """One queued or finished piece of background work"""
+
+    def __init__(self, job_id, kind, key, params):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.params = params
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'state': self.state,
+            'progress': round(self.progress, 3),
+            'message': self.message,
+            'result': self.result,
+            'result_url': f'/api/jobs/{self.id}/result' if self.result and self.result.get('path') else None,
+            'error': self.error,
+            'created': datetime.fromtimestamp(self.created).isoformat(timespec='seconds'),
+            'seconds': round((self.finished or time.time()) - self.started, 1) if self.started else None
+        }
+
+
+class MediaJobs:
+    """Builds daily camera summaries and violation contact sheets in a process pool.
+
+    A summary condenses one camera's day into a single video. It keeps only
+    the recorded stretches where the detection log saw people, merged
+    across short gaps and played ``summary_speed`` times faster, with the
+    wall-clock time stamped on each frame. A contact sheet tiles evenly
+    spaced frames of one violation clip, labelled with time and people count.
+
+    Jobs run in ``workers`` spawned processes at nice ``nice`` with one
+    OpenCV thread each, so they only use CPU that detection leaves idle.
+    Workers report progress over a queue; jobs, their progress and results
+    are listed through ``/api/jobs``. Yesterday's summaries are queued
+    every day at ``summary_time``. With ``contact_sheets`` on, a sheet is
+    queued for every new violation clip. Asking again for a job that is
+    already queued or running returns that job.
+    """
+
+    def __init__(self, settings, detection_log=None, clips_directory='violation_clips', camera_ids=(), fps=20.0,
+                 history=200):
+        self.settings = settings
+        self.fps = fps  # for clips that don't report their frame rate
+        self.detection_log = detection_log
+        self.clips_directory = clips_directory
+        self.camera_ids = list(camera_ids)
+        self.history = history
+        self.output_directory = settings.output_directory
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._ctx = mp.get_context('spawn')
+        self._progress = None
+        self._pool = None
+        self.logger = logging.getLogger('MediaJobs')
+
+    def start(self, schedule=True):
+        os.makedirs(self.output_directory, exist_ok=True)
+        self._progress = self._ctx.Queue()
+        threading.Thread(target=self._collect_progress, name='media-job-progress', daemon=True).start()
+        if schedule and self.settings.summary_time:
+            threading.Thread(target=self._schedule, name='media-job-schedule', daemon=True).start()
+        return self
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.settings.workers, mp_context=self._ctx,
+                                             initializer=_init_worker, initargs=(self._progress, self.settings.nice))
+        return self._pool
+
+    # ---- submitting ----
+
+    def summary(self, camera_id, day):
+        """Queue the condensed video of ``day`` (a date) for one camera"""
+        if self.detection_log is None:
+            raise ValueError("Summaries need the detection log (detection_log.enabled)")
+        output = os.path.join(self.output_directory, f'summary_camera{camera_id}_{day.isoformat()}.mp4')
+        options = {'speed': self.settings.summary_speed, 'gap': self.settings.summary_gap,
+                   'padding': self.settings.summary_padding, 'width': self.settings.summary_width,
+                   'fps': self.fps}
+        return self._submit('summary', f'summary:{camera_id}:{day}', {'camera_id': camera_id, 'date': str(day)},
+                            build_summary, camera_id, day.isoformat(), self.detection_log.directory,
+                            self.clips_directory, output, options)
+
+    def contact_sheet(self, violation):
+        """Queue the contact sheet of a violation row (``id``, ``clip_path``, ``status``, ...)"""
+        if not violation.get('clip_path'):
+            raise ValueError(f"Violation {violation['id']} has no clip")
+        output = os.path.join(self.output_directory, f"contact_sheet_{violation['id']}.jpg")
+        title = (f"Violation #{violation['id']}  {violation.get('status') or ''}  "
+                 f"{violation.get('timestamp') or ''}  {violation.get('person_count')} people")
+        options = {'columns': self.settings.sheet_columns, 'rows': self.settings.sheet_rows,
+                   'tile_width': self.settings.sheet_tile_width, 'fps': self.fps}
+        return self._submit('contact_sheet', f"contact_sheet:{violation['id']}", {'violation_id': violation['id']},
+                            build_contact_sheet, violation['clip_path'], title,
+                            self.detection_log.directory if self.detection_log else None,
+                            self.clips_directory, self.camera_ids, output, options)
+
+    def violation_recorded(self, violation):
+        """A violation was saved; queue its contact sheet when the clip is on this machine"""
+        clip = violation.get('clip_path')
+        if self.settings.contact_sheets and clip and os.path.exists(os.path.join(self.clips_directory, clip)):
+            self.contact_sheet(violation)
+
+    def _submit(self, kind, key, params, fn, *args):
+        with self._lock:
+            for job in self._jobs.values():
+                if job.key == key and job.state in (QUEUED, RUNNING):
+                    return job
+            job = Job(next(self._ids), kind, key, params)
+            self._jobs[job.id] = job
+            self._trim()
+        try:
+            job.future = self._executor().submit(fn, job.id, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool
+            self._pool = None
+            job.future = self._executor().submit(fn, job.id, *args)
+        job.future.add_done_callback(lambda future: self._finished(job, future))
+        self.logger.info(f"🎞️ Queued {kind} job {job.id} {params}")
+        return job
+
+    def _trim(self):
+        finished = [j for j in self._jobs.values() if j.state not in (QUEUED, RUNNING)]
+        for job in sorted(finished, key=lambda j: j.created)[:max(len(self._jobs) - self.history, 0)]:
+            del self._jobs[job.id]
+
+    def _finished(self, job, future):
+        with self._lock:
+            job.finished = time.time()
+            if future.cancelled():
+                job.state = CANCELLED
+                return
+            error = future.exception()
+            if error is not None:
+                job.state = FAILED
+                job.error = str(error) or type(error).__name__
+                self.logger.warning(f"⚠️ {job.kind} job {job.id} failed: {job.error}")
+                return
+            job.state = DONE
+            job.progress = 1.0
+            job.result = future.result()
+            job.message = job.result.pop('message', job.message)
+        self.logger.info(f"✅ {job.kind} job {job.id} done in {job.finished - (job.started or job.created):.1f}s")
+
+    def _collect_progress(self):
+        while True:
+            try:
+                job_id, fraction, message = self._progress.get()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.state not in (QUEUED, RUNNING):
+                    continue
+                if job.state == QUEUED:
+                    job.state = RUNNING
+                    job.started = time.time()
+                job.progress = fraction
+                if message:
+                    job.message = message
+
+    def _schedule(self):
+        """Queue yesterday's summaries for every camera once a day at ``summary_time``"""
+        last = None
+        while True:
+            now = datetime.now()
+            if now.strftime('%H:%M') >= self.settings.summary_time and last != now.date():
+                last = now.date()
+                yesterday = now.date() - timedelta(days=1)
+                for camera_id in self.camera_ids:
+                    if not os.path.exists(os.path.join(self.output_directory,
+                                                       f'summary_camera{camera_id}_{yesterday}.mp4')):
+                        try:
+                            self.summary(camera_id, yesterday)
+                        except Exception as e:
+                            self.logger.warning(f"⚠️ Could not queue summary for camera {camera_id}: {e}")
+            time.sleep(60)
+
+    # ---- reading ----
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.as_dict() if job else None
+
+    def list(self, state=None, kind=None):
+        with self._lock:
+            return [job.as_dict() for job in sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)
+                    if (state is None or job.state == state) and (kind is None or job.kind == kind)]
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started; True when it was cancelled"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job is not None and job.state == QUEUED and job.future is not None and job.future.cancel()
+
+    def result_path(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state != DONE or not job.result or not job.result.get('path'):
+                return None
+            return job.result['path']
+
+    def status(self):
+        with self._lock:
+            states = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+        return {'workers': self.settings.workers, 'by_state': states}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
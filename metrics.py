@@ -0,0 +1,412 @@
+# metrics.py - Pipeline Latency Instrumentation & Prometheus Export
+
+import time
+import threading
+from bisect import bisect_left
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PIPELINE_STAGES = ('read', 'detect', 'draw', 'record', 'db_update', 'encode', 'emit')
+
+
+class RollingHistogram:
+    """Fixed-bucket histogram with cumulative totals and a rolling window.
+
+    ``observe`` takes no lock: each histogram has a single writer (the
+    camera thread that owns it), or, for the ones fed by dashboards
+    (``glass_to_dashboard``, ``client_decode``), writers that hold the
+    registry lock. Readers copy the bucket lists and tolerate being one
+    sample behind. Cumulative counts feed Prometheus, the rolling
+    window (``windows`` x ``window_seconds``) feeds percentiles for health.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window_seconds=10, windows=6):
+        self.buckets = tuple(buckets)
+        self.window_seconds = window_seconds
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._windows = [[0] * (len(self.buckets) + 1) for _ in range(windows)]
+        self._window_ids = [-1] * windows
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+        window_id = int(time.monotonic() // self.window_seconds)
+        slot = window_id % len(self._windows)
+        if self._window_ids[slot] != window_id:
+            # Swap in a fresh list rather than clearing in place so readers
+            # never see a half-reset window
+            self._windows[slot] = [0] * len(self.counts)
+            self._window_ids[slot] = window_id
+        self._windows[slot][index] += 1
+
+    def recent_counts(self):
+        current = int(time.monotonic() // self.window_seconds)
+        oldest = current - len(self._windows) + 1
+        totals = [0] * len(self.counts)
+        for window_id, counts in zip(list(self._window_ids), list(self._windows)):
+            if window_id >= oldest:
+                for i, c in enumerate(counts):
+                    totals[i] += c
+        return totals
+
+    def quantile(self, q, cumulative=False):
+        """Estimate the q-quantile over the rolling window, or all time (None when empty)"""
+        counts = list(self.counts) if cumulative else self.recent_counts()
+        total = sum(counts)
+        if total == 0:
+            return None
+        target = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= target and c > 0:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1] * 2
+                return lower + (upper - lower) * ((target - seen) / c)
+            seen += c
+        return self.buckets[-1]
+
+    def summary(self, cumulative=False):
+        p50, p95, p99 = (self.quantile(q, cumulative) for q in (0.5, 0.95, 0.99))
+        return {
+            'p50_ms': round(p50 * 1000, 2) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 2) if p95 is not None else None,
+            'p99_ms': round(p99 * 1000, 2) if p99 is not None else None,
+            'count': self.count
+        }
+
+
+class StageTimer:
+    """Times consecutive pipeline stages with one ``perf_counter`` call per stage"""
+
+    __slots__ = ('camera_metrics', '_last')
+
+    def __init__(self, camera_metrics):
+        self.camera_metrics = camera_metrics
+        self._last = time.perf_counter()
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.camera_metrics.stages[stage].observe(now - self._last)
+        self._last = now
+
+
+class CameraMetrics:
+    """Everything measured for one camera pipeline"""
+
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.stages = {stage: RollingHistogram() for stage in PIPELINE_STAGES}
+        self.frame_latency = RollingHistogram()        # capture -> emitted
+        self.glass_to_dashboard = RollingHistogram()   # capture -> client ack received
+        self.client_decode = RollingHistogram()        # dashboard JPEG decode + draw
+        self.client_frames_rendered = 0
+        self.client_frames_dropped = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+        self.connected = False
+        self.last_frame_captured_at = None
+        self.last_frame_emitted_at = None
+        # Operating mode (operating_modes.py) and seconds spent in each
+        self.mode = None
+        self.mode_since = None
+        self.mode_seconds = {}
+        # Frames not encoded for the dashboard because nobody was watching
+        self.frames_unwatched = 0
+        # Frames skipped because inference failed (timeout, no slot, no worker)
+        self.inference_failures = 0
+        # Frames encoded for dashboards, by encoding profile (stream_quality.py)
+        self.stream_encodes = {}
+        # Detector cascade: frames re-checked by the large model, why, and
+        # whether its access decision matched the small model's
+        self.escalations = {}
+        self.escalation_agreed = 0
+        self.escalation_disagreed = 0
+        self.escalation_latency = RollingHistogram()
+        # Inference scheduler: wait for a turn, frames skipped when none came
+        # in time, and the weight the camera last asked with
+        self.inference_wait = RollingHistogram()
+        self.inference_deferred = 0
+        self.inference_weight = None
+
+    def timer(self):
+        return StageTimer(self)
+
+    def frame_done(self, captured_at):
+        now = time.time()
+        self.frames_processed += 1
+        self.last_frame_captured_at = captured_at
+        self.last_frame_emitted_at = now
+        if captured_at:
+            self.frame_latency.observe(max(now - captured_at, 0.0))
+
+    def set_mode(self, mode, now=None):
+        """Switch operating mode (None = stopped), crediting time to the previous one"""
+        now = now or time.time()
+        if self.mode is not None:
+            self.mode_seconds[self.mode] = self.mode_seconds.get(self.mode, 0.0) + now - self.mode_since
+        self.mode = mode
+        self.mode_since = now
+
+    def escalated(self, reason, agreed, seconds):
+        """Record one frame re-checked by the cascade's large model"""
+        self.escalations[reason] = self.escalations.get(reason, 0) + 1
+        if agreed:
+            self.escalation_agreed += 1
+        else:
+            self.escalation_disagreed += 1
+        self.escalation_latency.observe(seconds)
+
+    def scheduled(self, weight, waited):
+        """Record one turn at the detector (``waited`` None = deferred, frame skipped)"""
+        self.inference_weight = weight
+        if waited is None:
+            self.inference_deferred += 1
+        else:
+            self.inference_wait.observe(waited)
+
+    def detect_fps(self):
+        """Detections per second the scheduler granted recently"""
+        counts = self.inference_wait.recent_counts()
+        span = len(self.inference_wait._windows) * self.inference_wait.window_seconds
+        return round(sum(counts) / span, 2)
+
+    def cascade_summary(self):
+        escalations = sum(self.escalations.values())
+        return {
+            'escalations': escalations,
+            'reasons': dict(self.escalations),
+            'rate': round(escalations / self.frames_processed, 4) if self.frames_processed else None,
+            'agreement': round(self.escalation_agreed / escalations, 4) if escalations else None,
+            'latency': self.escalation_latency.summary()
+        }
+
+    def mode_durations(self):
+        """Seconds spent in each mode, including the current stretch"""
+        durations = dict(self.mode_seconds)
+        if self.mode is not None:
+            durations[self.mode] = durations.get(self.mode, 0.0) + time.time() - self.mode_since
+        return durations
+
+    def frame_age(self):
+        """Seconds since the newest processed frame was captured"""
+        if self.last_frame_captured_at is None:
+            return None
+        return time.time() - self.last_frame_captured_at
+
+    def fps(self):
+        counts = self.frame_latency.recent_counts()
+        span = len(self.frame_latency._windows) * self.frame_latency.window_seconds
+        return round(sum(counts) / span, 2)
+
+    def snapshot(self):
+        age = self.frame_age()
+        return {
+            'connected': self.connected,
+            'fps': self.fps(),
+            'frame_age_s': round(age, 3) if age is not None else None,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+            'reconnects': self.reconnects,
+            'mode': self.mode,
+            'mode_seconds': {mode: round(s, 1) for mode, s in self.mode_durations().items()},
+            'frames_unwatched': self.frames_unwatched,
+            'inference_failures': self.inference_failures,
+            'stream_encodes': dict(self.stream_encodes),
+            'cascade': self.cascade_summary(),
+            'scheduler': {
+                'weight': self.inference_weight,
+                'detect_fps': self.detect_fps(),
+                'deferred': self.inference_deferred,
+                'queue_delay': self.inference_wait.summary()
+            },
+            'frame_latency': self.frame_latency.summary(),
+            'glass_to_dashboard': self.glass_to_dashboard.summary(),
+            'client': {
+                'frames_rendered': self.client_frames_rendered,
+                'frames_dropped': self.client_frames_dropped,
+                'decode': self.client_decode.summary()
+            },
+            'stages': {stage: hist.summary() for stage, hist in self.stages.items()}
+        }
+
+
+class MetricsRegistry:
+    """Process-wide registry of per-camera metrics plus a few global gauges"""
+
+    def __init__(self):
+        self._cameras = {}
+        self._lock = threading.Lock()
+        # name -> (help, callable returning value); sampled at scrape time
+        self._gauges = {}
+        # dashboard client id -> latest 'client_metrics' report
+        self._clients = {}
+
+    def camera(self, camera_id):
+        cam = self._cameras.get(camera_id)
+        if cam is None:
+            with self._lock:
+                cam = self._cameras.setdefault(camera_id, CameraMetrics(camera_id))
+        return cam
+
+    def cameras(self):
+        return dict(self._cameras)
+
+    def register_gauge(self, name, help_text, fn):
+        self._gauges[name] = (help_text, fn)
+
+    def observe_client_ack(self, camera_id, captured_at):
+        """Record glass-to-dashboard latency from a client's frame acknowledgement (unknown cameras are ignored)"""
+        cam = self._cameras.get(camera_id)
+        if captured_at and cam is not None:
+            # Acknowledgements arrive on many connection threads
+            with self._lock:
+                cam.glass_to_dashboard.observe(max(time.time() - captured_at, 0.0))
+
+    def observe_client_report(self, client_id, report, max_samples=200):
+        """Fold a dashboard's periodic rendering report into the camera metrics.
+
+        ``report['cameras']`` maps camera id -> frames rendered/dropped since
+        the previous report, rendering FPS and decode times in milliseconds.
+        Cameras not already registered are ignored, so a client can't invent
+        them. Reports arrive on many connection threads, so unlike the camera
+        histograms these are updated under the registry lock.
+        """
+        fps = {}
+        with self._lock:
+            for camera_id, stats in (report.get('cameras') or {}).items():
+                camera_id = int(camera_id)
+                cam = self._cameras.get(camera_id)
+                if cam is None:
+                    continue
+                cam.client_frames_rendered += max(int(stats.get('rendered', 0)), 0)
+                cam.client_frames_dropped += max(int(stats.get('dropped', 0)), 0)
+                for decode_ms in (stats.get('decode_ms') or [])[:max_samples]:
+                    cam.client_decode.observe(max(float(decode_ms), 0.0) / 1000)
+                fps[camera_id] = float(stats.get('fps', 0))
+            self._clients[client_id] = {
+                'fps': fps,
+                'worker': bool(report.get('worker')),
+                'hidden': bool(report.get('hidden')),
+                'reported_at': time.time()
+            }
+
+    def forget_client(self, client_id):
+        with self._lock:
+            self._clients.pop(client_id, None)
+
+    def clients(self, max_age=30):
+        """Dashboards that reported recently, with their per-camera rendering FPS"""
+        cutoff = time.time() - max_age
+        with self._lock:
+            return {cid: dict(c) for cid, c in self._clients.items() if c['reported_at'] >= cutoff}
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        cameras = self.cameras()
+
+        def histogram(name, help_text, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in series:
+                cumulative = 0
+                counts = list(hist.counts)
+                for bound, c in zip(hist.buckets, counts):
+                    cumulative += c
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative + counts[-1]}')
+                lines.append(f'{name}_sum{{{labels}}} {hist.sum:.6f}')
+                lines.append(f'{name}_count{{{labels}}} {hist.count}')
+
+        def simple(name, kind, help_text, values):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values:
+                lines.append(f'{name}{{{labels}}} {value}' if labels else f'{name} {value}')
+
+        histogram('vault_stage_seconds', 'Time spent in each camera pipeline stage',
+                  [(f'camera="{cid}",stage="{stage}"', hist)
+                   for cid, cam in cameras.items() for stage, hist in cam.stages.items()])
+        histogram('vault_frame_latency_seconds', 'Capture to emit latency per frame',
+                  [(f'camera="{cid}"', cam.frame_latency) for cid, cam in cameras.items()])
+        histogram('vault_inference_queue_seconds', 'Time a camera waited for its turn at the detector',
+                  [(f'camera="{cid}"', cam.inference_wait) for cid, cam in cameras.items()
+                   if cam.inference_weight is not None])
+        histogram('vault_escalation_seconds', 'Time spent re-checking a frame with the large detector',
+                  [(f'camera="{cid}"', cam.escalation_latency) for cid, cam in cameras.items() if cam.escalations])
+        histogram('vault_glass_to_dashboard_seconds', 'Capture to dashboard acknowledgement latency',
+                  [(f'camera="{cid}"', cam.glass_to_dashboard) for cid, cam in cameras.items()])
+        histogram('vault_client_decode_seconds', 'Dashboard JPEG decode and draw time',
+                  [(f'camera="{cid}"', cam.client_decode) for cid, cam in cameras.items()])
+        simple('vault_client_frames_rendered_total', 'counter', 'Frames drawn by dashboards',
+               [(f'camera="{cid}"', cam.client_frames_rendered) for cid, cam in cameras.items()])
+        simple('vault_client_frames_dropped_total', 'counter', 'Frames dashboards skipped to stay current',
+               [(f'camera="{cid}"', cam.client_frames_dropped) for cid, cam in cameras.items()])
+        clients = self.clients()
+        simple('vault_client_fps', 'gauge', 'Rendering FPS reported by each dashboard',
+               [(f'camera="{cam_id}",client="{sid}"', fps)
+                for sid, client in clients.items() for cam_id, fps in client['fps'].items()])
+        simple('vault_dashboard_clients', 'gauge', 'Dashboards that reported rendering metrics recently',
+               [('', len(clients))])
+        simple('vault_frames_processed_total', 'counter', 'Frames run through the pipeline',
+               [(f'camera="{cid}"', cam.frames_processed) for cid, cam in cameras.items()])
+        simple('vault_frames_dropped_total', 'counter', 'Captured frames skipped because processing fell behind',
+               [(f'camera="{cid}"', cam.frames_dropped) for cid, cam in cameras.items()])
+        simple('vault_frames_unwatched_total', 'counter', 'Frames not encoded because no dashboard was connected',
+               [(f'camera="{cid}"', cam.frames_unwatched) for cid, cam in cameras.items()])
+        simple('vault_inference_failures_total', 'counter', 'Frames skipped because inference failed',
+               [(f'camera="{cid}"', cam.inference_failures) for cid, cam in cameras.items()])
+        simple('vault_stream_encodes_total', 'counter', 'Frames encoded for dashboards, by encoding profile',
+               [(f'camera="{cid}",profile="{name}"', n)
+                for cid, cam in cameras.items() for name, n in list(cam.stream_encodes.items())])
+        simple('vault_camera_mode', 'gauge', '1 for the operating mode the camera is in',
+               [(f'camera="{cid}",mode="{cam.mode}"', 1) for cid, cam in cameras.items() if cam.mode])
+        simple('vault_camera_mode_seconds_total', 'counter', 'Time spent in each operating mode',
+               [(f'camera="{cid}",mode="{mode}"', round(seconds, 3))
+                for cid, cam in cameras.items() for mode, seconds in cam.mode_durations().items()])
+        scheduled = {cid: cam for cid, cam in cameras.items() if cam.inference_weight is not None}
+        simple('vault_detect_fps', 'gauge', 'Detections per second granted to each camera',
+               [(f'camera="{cid}"', cam.detect_fps()) for cid, cam in scheduled.items()])
+        simple('vault_inference_weight', 'gauge', 'Scheduling weight each camera last asked with',
+               [(f'camera="{cid}"', cam.inference_weight) for cid, cam in scheduled.items()])
+        simple('vault_inference_deferred_total', 'counter', 'Frames skipped because no inference turn came in time',
+               [(f'camera="{cid}"', cam.inference_deferred) for cid, cam in scheduled.items()])
+        simple('vault_escalations_total', 'counter', 'Frames re-checked by the large detector, by trigger',
+               [(f'camera="{cid}",reason="{reason}"', n)
+                for cid, cam in cameras.items() for reason, n in cam.escalations.items()])
+        simple('vault_escalation_decisions_total', 'counter',
+               'Escalated frames where the large detector agreed or disagreed with the small one',
+               [(f'camera="{cid}",result="{result}"', n) for cid, cam in cameras.items()
+                for result, n in (('agreed', cam.escalation_agreed), ('disagreed', cam.escalation_disagreed))
+                if cam.escalations])
+        simple('vault_camera_reconnects_total', 'counter', 'Successful camera reconnections',
+               [(f'camera="{cid}"', cam.reconnects) for cid, cam in cameras.items()])
+        simple('vault_camera_connected', 'gauge', '1 when the camera stream is connected',
+               [(f'camera="{cid}"', int(cam.connected)) for cid, cam in cameras.items()])
+        simple('vault_frame_age_seconds', 'gauge', 'Age of the newest processed frame',
+               [(f'camera="{cid}"', round(cam.frame_age(), 3))
+                for cid, cam in cameras.items() if cam.frame_age() is not None])
+
+        for name, (help_text, fn) in self._gauges.items():
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is not None:
+                simple(name, 'gauge', help_text, [('', value)])
+
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by the camera pipeline and the web endpoints
+registry = MetricsRegistry()
@@ -0,0 +1,168 @@
+# operating_modes.py - Schedule and Activity Aware Camera Operating Modes
+
+import time
+import logging
+import threading
+
+import cv2
+
+# Full detection at max_fps (inside active hours, or no schedule set)
+ACTIVE = 'active'
+# Outside active hours but something moved recently: full detection
+MOTION = 'motion'
+# Outside active hours and nothing moving: only the motion gate runs, at idle_fps
+IDLE = 'idle'
+MODES = (ACTIVE, MOTION, IDLE)
+
+
+def parse_hours(ranges):
+    """``["08:00-18:30", "22:00-02:00"]`` -> [(start_minute, end_minute), ...]"""
+    parsed = []
+    for text in ranges or []:
+        start, end = (part.strip() for part in str(text).split('-'))
+        minutes = []
+        for value in (start, end):
+            hours, mins = (int(v) for v in value.split(':'))
+            if not (0 <= hours <= 24 and 0 <= mins < 60) or hours * 60 + mins > 24 * 60:
+                raise ValueError(f"bad time {value!r}")
+            minutes.append(hours * 60 + mins)
+        parsed.append(tuple(minutes))
+    return parsed
+
+
+def in_hours(hours, when=None):
+    """Whether local time ``when`` falls inside any parsed range (ranges may wrap midnight)"""
+    now = time.localtime(when)
+    minute = now.tm_hour * 60 + now.tm_min
+    for start, end in hours:
+        if start <= end:
+            if start <= minute < end:
+                return True
+        elif minute >= start or minute < end:
+            return True
+    return False
+
+
+class MotionGate:
+    """Frame differencing on a small blurred grayscale copy.
+
+    Costs a resize and two cheap 160x90 operations per frame, so an idle
+    camera can keep watching for movement without running the detector.
+    """
+
+    def __init__(self, threshold=0.01, size=(160, 90), pixel_delta=25):
+        self.threshold = threshold
+        self.size = size
+        self.pixel_delta = pixel_delta
+        self.last_fraction = 0.0
+        self._previous = None
+
+    def reset(self):
+        self._previous = None
+
+    def check(self, frame):
+        """True when at least ``threshold`` of the picture changed since the last call"""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous, self._previous = self._previous, gray
+        if previous is None:
+            return False
+        _, changed = cv2.threshold(cv2.absdiff(gray, previous), self.pixel_delta, 255, cv2.THRESH_BINARY)
+        self.last_fraction = cv2.countNonZero(changed) / float(changed.size)
+        return self.last_fraction >= self.threshold
+
+
+class ModeController:
+    """Picks a camera's operating mode for each frame.
+
+    Inside ``active_hours`` (or with no schedule) the camera is always
+    ``active``. Outside them it sits in ``idle`` until the motion gate fires
+    and then runs full detection (``motion``) until ``motion_hold`` seconds
+    pass without movement or people in view. Time spent in each mode is
+    recorded on the camera's metrics.
+    """
+
+    def __init__(self, settings, metrics=None, on_change=None):
+        self.metrics = metrics
+        self.on_change = on_change
+        self.mode = None
+        self.gate = MotionGate()
+        self.last_activity = None
+        self.logger = logging.getLogger('ModeController')
+        self.apply(settings)
+
+    def apply(self, settings):
+        self.settings = settings
+        self.hours = parse_hours(settings.active_hours) if settings.active_hours else None
+        self.gate.threshold = settings.motion_threshold
+
+    def scheduled(self, now):
+        return self.hours is None or in_hours(self.hours, now)
+
+    def activity(self, now=None):
+        """Something worth watching (people in view) keeps the camera out of idle"""
+        self.last_activity = now or time.time()
+
+    def update(self, frame, now=None):
+        now = now or time.time()
+        if self.scheduled(now):
+            # The gate's reference frame would be stale by the time hours end
+            self.gate.reset()
+            mode = ACTIVE
+        else:
+            if self.gate.check(frame):
+                self.activity(now)
+            recent = self.last_activity is not None and now - self.last_activity < self.settings.motion_hold
+            mode = MOTION if recent else IDLE
+        if mode != self.mode:
+            self._switch(mode, now)
+        return mode
+
+    def _switch(self, mode, now):
+        previous, self.mode = self.mode, mode
+        if self.metrics is not None:
+            self.metrics.set_mode(mode, now)
+        if previous is not None:
+            self.logger.info(f"🔀 Camera {self.settings.id}: {previous} -> {mode}")
+        if self.on_change:
+            self.on_change(previous, mode)
+
+    def frame_interval(self):
+        """Seconds between processed frames in the current mode (0 = no pacing)"""
+        if self.mode == IDLE:
+            return 1.0 / self.settings.idle_fps
+        return 1.0 / self.settings.max_fps if self.settings.max_fps else 0
+
+    def retrieve_interval(self):
+        """``CameraConnection.retrieve_interval`` for the current mode"""
+        return 1.0 / self.settings.idle_fps if self.mode == IDLE else 0
+
+
+class ViewerCount:
+    """Connected dashboards, summed over every process that reports a count.
+
+    The web process counts its own Socket.IO clients (source ``local``);
+    camera nodes receive each web worker's count over the control channel.
+    With no report at all the count is unknown and cameras keep encoding.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, delta, source='local'):
+        with self._lock:
+            self._counts[source] = max(self._counts.get(source, 0) + delta, 0)
+            return self._counts[source]
+
+    def set(self, source, count):
+        with self._lock:
+            self._counts[source] = max(int(count), 0)
+
+    def total(self):
+        with self._lock:
+            return sum(self._counts.values()) if self._counts else None
+
+    def watching(self):
+        total = self.total()
+        return total is None or total > 0
@@ -0,0 +1,128 @@
+# profiler.py - On-demand Sampling Profiler
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+from async_runtime import start_native_thread, native_sleep
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler over ``sys._current_frames()``.
+
+    Nothing is installed while idle (no trace or profile hooks), so leaving it
+    compiled in costs nothing. A capture runs on its own OS thread for a fixed
+    number of seconds and aggregates stacks into flamegraph-compatible
+    collapsed lines (``thread;outer;...;inner count``). Only one capture runs
+    at a time; the last result is kept until the next one starts.
+
+    Under eventlet/gevent only OS threads are visible: the hub thread shows
+    whichever green thread is running, and offloaded work shows up on the
+    native thread pool.
+    """
+
+    MAX_SECONDS = 300
+    MIN_INTERVAL = 0.001
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = 'idle'
+        self.params = {}
+        self.started_at = None
+        self.finished_at = None
+        self.samples = 0
+        self._stacks = Counter()
+        self._cancel = False
+
+    def start(self, seconds=10, interval=0.005, threads=None):
+        """Begin a capture; ``threads`` is a list of thread-name prefixes (None = all)"""
+        seconds = min(max(float(seconds), 0.1), self.MAX_SECONDS)
+        interval = max(float(interval), self.MIN_INTERVAL)
+        with self._lock:
+            if self.state == 'running':
+                raise RuntimeError("A profile capture is already running")
+            self.state = 'running'
+            self.params = {'seconds': seconds, 'interval': interval, 'threads': threads}
+            self.started_at = time.time()
+            self.finished_at = None
+            self.samples = 0
+            self._stacks = Counter()
+            self._cancel = False
+        start_native_thread(self._run, seconds, interval, threads, name='profiler-sampler')
+
+    def stop(self):
+        self._cancel = True
+
+    def _run(self, seconds, interval, threads):
+        own_id = threading.get_ident()
+        names = {}
+        deadline = time.perf_counter() + seconds
+        try:
+            while time.perf_counter() < deadline and not self._cancel:
+                names.update((t.ident, t.name) for t in threading.enumerate())
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    name = names.get(thread_id, f'thread-{thread_id}')
+                    if threads and not name.startswith(tuple(threads)):
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    stack.append(name)
+                    self._stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+                native_sleep(interval)
+        finally:
+            self.finished_at = time.time()
+            self.state = 'done'
+
+    def collapsed(self):
+        """Collapsed stacks, one ``a;b;c count`` line each (flamegraph.pl, speedscope)"""
+        stacks = self._stacks.copy()
+        return '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common()) + '\n'
+
+    def top(self, limit=20, sort='self'):
+        """Functions by self samples (leaf of the stack) or total samples (anywhere on it)"""
+        stacks = self._stacks.copy()
+        total = sum(stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+        return [
+            {
+                'function': label,
+                'self_samples': own[label],
+                'self_percent': round(own[label] * 100 / total, 1) if total else 0.0,
+                'total_samples': inclusive[label],
+                'total_percent': round(inclusive[label] * 100 / total, 1) if total else 0.0
+            }
+            for label, _ in (inclusive if sort == 'total' else own).most_common(limit)
+        ]
+
+    def status(self):
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else None
+        return {
+            'state': self.state,
+            'params': self.params,
+            'started_at': self.started_at,
+            'elapsed_s': round(elapsed, 2) if elapsed is not None else None,
+            'samples': self.samples,
+            'stacks': len(self._stacks)
+        }
+
+
+# Shared by the admin API
+profiler = SamplingProfiler()
@@ -12,12 +12,26 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 # Import and run the application
-from app import app, socketio
+from app import app, socketio, start_background_services
+from config import Config
+import async_runtime
+from logging_config import configure_logging
 
 if __name__ == '__main__':
+    # JSON logs in LOG_DIRECTORY, written off the camera/request threads
+    configure_logging()
+    
+    # Stand-in for Redis so multi-worker setups can be tried on one machine
+    if Config.EMBEDDED_BROKER and Config.MESSAGE_QUEUE_URL:
+        from urllib.parse import urlparse
+        from local_broker import LocalBroker, is_port_in_use
+        broker_url = urlparse(Config.MESSAGE_QUEUE_URL)
+        if not is_port_in_use(broker_url.hostname, broker_url.port or 6379):
+            LocalBroker(broker_url.hostname, broker_url.port or 6379).start()
+    
     # Ensure required directories exist
-    os.makedirs('violation_clips', exist_ok=True)
-    os.makedirs('vault_logs', exist_ok=True)
+    os.makedirs(Config.RECORDING.output_directory, exist_ok=True)
+    os.makedirs(Config.LOG_DIRECTORY, exist_ok=True)
     os.makedirs('static/css', exist_ok=True)
     os.makedirs('static/js', exist_ok=True)
     os.makedirs('static/images', exist_ok=True)
@@ -26,14 +40,13 @@ if __name__ == '__main__':
     print("=" * 50)
     print("🏛️  VAULT SECURITY SYSTEM")
     print("=" * 50)
-    print(f"📡 Server starting on http://localhost:5000")
+    print(f"📡 Server starting on http://localhost:{Config.SERVER.port} ({async_runtime.ASYNC_MODE} mode)")
     print(f"📹 Camera monitoring ready")
     print(f"🔒 Security protocols active")
     print("=" * 50)
     
+    # Load and warm the detector while the server comes up
+    start_background_services()
+    
     # Run the application WITHOUT debug mode to prevent restarts
-    socketio.run(app, 
-                debug=False,  # ✅ CHANGED: Disabled debug mode
-                host='0.0.0.0', 
-                port=5000,
-                allow_unsafe_werkzeug=True)
+    socketio.run(app, **async_runtime.server_options())
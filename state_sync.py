@@ -0,0 +1,201 @@
+# state_sync.py - Versioned Dashboard State (snapshot + deltas)
+
+import copy
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+
+
+class StateStore:
+    """Dashboard state pushed as numbered deltas instead of polled or re-sent per frame.
+
+    Every change (monitoring on/off, a camera's count/status/recording flag
+    changing, a violation row added, history cleared) bumps ``seq`` and is
+    emitted once as ``state_delta``; updates that change nothing are
+    dropped. A dashboard gets one ``state_snapshot`` on connect and applies
+    deltas in order. After a reconnect or a gap it asks for everything after
+    the last ``seq`` it saw and receives the missed deltas from the history,
+    or a fresh snapshot if they have aged out. ``epoch`` changes on every
+    server start so a client never mixes sequence numbers across restarts.
+    """
+
+    def __init__(self, socketio=None, history=512, violations_limit=10):
+        self.socketio = socketio
+        # Optional callable(message) copying changes to mirrors in web workers
+        self.publisher = None
+        self.violations_limit = violations_limit
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.state = {'monitoring': False, 'cameras': {}, 'violations': [], 'violation_count': 0}
+        self.following = False
+        self.deltas_sent = 0
+        self.snapshots_sent = 0
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('StateStore')
+
+    def load(self, cameras=None, violations=None, violation_count=0):
+        """Seed the state (from the database) before any client connects"""
+        with self._lock:
+            self.state['cameras'] = {str(k): dict(v) for k, v in (cameras or {}).items()}
+            self.state['violations'] = list(violations or [])[:self.violations_limit]
+            self.state['violation_count'] = violation_count
+
+    # ---- changes (authoritative store) ----
+
+    def _change(self, delta):
+        if self.following:
+            # Mirrors only change through apply()
+            return None
+        with self._lock:
+            self.seq += 1
+            delta = dict(delta, seq=self.seq, epoch=self.epoch)
+            self._apply(delta)
+            self._history.append(delta)
+        if self.socketio is not None:
+            self.socketio.emit('state_delta', delta)
+        if self.publisher is not None:
+            try:
+                self.publisher({'kind': 'delta', 'delta': delta})
+            except Exception as e:
+                self.logger.warning(f"⚠️ Could not publish state delta: {e}")
+        self.deltas_sent += 1
+        return delta
+
+    def set_monitoring(self, monitoring):
+        if self.state['monitoring'] != monitoring:
+            return self._change({'type': 'monitoring', 'value': monitoring})
+        return None
+
+    def update_camera(self, camera_id, **fields):
+        """Record a camera's fields; returns the delta, or None when nothing changed"""
+        current = self.state['cameras'].get(str(camera_id), {})
+        changes = {k: v for k, v in fields.items() if current.get(k) != v}
+        if not changes:
+            return None
+        return self._change({'type': 'camera', 'camera_id': str(camera_id), 'changes': changes})
+
+    def add_violation(self, row, camera_id=None):
+        delta = {'type': 'violation', 'row': row}
+        if camera_id is not None:
+            delta['camera_id'] = str(camera_id)
+        return self._change(delta)
+
+    def clear_violations(self):
+        return self._change({'type': 'violations_cleared'})
+
+    def _apply(self, delta):
+        state = self.state
+        kind = delta['type']
+        if kind == 'monitoring':
+            state['monitoring'] = delta['value']
+        elif kind == 'camera':
+            state['cameras'].setdefault(delta['camera_id'], {}).update(delta['changes'])
+        elif kind == 'violation':
+            state['violations'] = ([delta['row']] + state['violations'])[:self.violations_limit]
+            state['violation_count'] += 1
+        elif kind == 'violations_cleared':
+            state['violations'] = []
+            state['violation_count'] = 0
+
+    # ---- reads ----
+
+    def snapshot(self):
+        with self._lock:
+            return {'epoch': self.epoch, 'seq': self.seq, 'state': copy.deepcopy(self.state)}
+
+    def since(self, epoch, seq):
+        """Deltas after ``seq`` (empty if up to date), or None if a snapshot is needed"""
+        with self._lock:
+            if epoch != self.epoch or seq is None or seq > self.seq:
+                return None
+            if seq == self.seq:
+                return []
+            if not self._history or self._history[0]['seq'] > seq + 1:
+                return None
+            return [delta for delta in self._history if delta['seq'] > seq]
+
+    def sync_message(self, epoch=None, seq=None):
+        """``(event, payload)`` that brings a client at ``(epoch, seq)`` up to date"""
+        try:
+            seq = int(seq) if seq is not None else None
+        except (TypeError, ValueError):
+            seq = None
+        deltas = self.since(epoch, seq)
+        if deltas is None:
+            self.snapshots_sent += 1
+            return 'state_snapshot', self.snapshot()
+        return 'state_deltas', deltas
+
+    def status(self):
+        return {
+            'epoch': self.epoch,
+            'seq': self.seq,
+            'history': len(self._history),
+            'deltas_sent': self.deltas_sent,
+            'snapshots_sent': self.snapshots_sent,
+            'following': self.following
+        }
+
+    # ---- mirrors (NODE_ROLE=web) ----
+
+    def apply(self, message):
+        """Apply a message from the authoritative store; returns False on a gap"""
+        if message.get('kind') == 'snapshot':
+            snapshot = message['snapshot']
+            with self._lock:
+                self.epoch = snapshot['epoch']
+                self.seq = snapshot['seq']
+                self.state = snapshot['state']
+                self._history.clear()
+            return True
+        delta = message.get('delta') or {}
+        with self._lock:
+            if delta.get('epoch') != self.epoch or delta.get('seq') != self.seq + 1:
+                return delta.get('epoch') == self.epoch and delta.get('seq', 0) <= self.seq
+            self.seq = delta['seq']
+            self._apply(delta)
+            self._history.append(delta)
+        return True
+
+    def follow(self, message_queue_url, state_channel, control_channel):
+        """Mirror the camera node's store so this web worker can answer snapshots.
+
+        Deltas reach dashboards straight from the camera node through the
+        Socket.IO message queue; this only keeps the local copy current. On
+        a gap a ``sync_state`` command asks the node for a full snapshot.
+        """
+        import redis
+
+        self.following = True
+        client = redis.Redis.from_url(message_queue_url)
+
+        def request_snapshot():
+            client.publish(control_channel, json.dumps({'command': 'sync_state', 'sent_at': time.time()}))
+
+        def run():
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(state_channel)
+            request_snapshot()
+            last_request = time.time()
+            for message in pubsub.listen():
+                try:
+                    in_order = self.apply(json.loads(message['data']))
+                except (ValueError, TypeError, KeyError):
+                    continue
+                if not in_order and time.time() - last_request > 1.0:
+                    last_request = time.time()
+                    request_snapshot()
+
+        threading.Thread(target=run, name='state-follower', daemon=True).start()
+
+
+def redis_publisher(message_queue_url, state_channel):
+    """``StateStore.publisher`` that copies changes to web-worker mirrors"""
+    import redis
+
+    client = redis.Redis.from_url(message_queue_url)
+    return lambda message: client.publish(state_channel, json.dumps(message))
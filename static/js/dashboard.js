@@ -12,24 +12,46 @@ let systemStats = {
     recording: false
 };
 
+// Versioned dashboard state (see state_sync.py): a snapshot on connect,
+// then only numbered deltas when something changes
+let dashboardState = null;
+let stateEpoch = null;
+let stateSeq = 0;
+let resyncPending = false;
+
+// Live frames are decoded off the main thread (see frame-renderer.js)
+let frameRenderer = null;
+let clientMetricsInterval = null;
+
+// Live video quality (see stream_quality.py): the server moves this
+// dashboard between rungs unless the user pins one
+let streamRung = 0;
+let streamPinned = null;
+
 // ============ INITIALIZATION ============
 document.addEventListener('DOMContentLoaded', function() {
+    initializeFrameRenderer();
     initializeSocket();
     updateCurrentTime();
     setInterval(updateCurrentTime, 1000);
     initializeVolumeControl();
     initializeVideoControls();
-    loadInitialData();
     initializeSettings();
 });
 
 // ============ SOCKET INITIALIZATION ============
 function initializeSocket() {
-    socket = io();
+    // On every (re)connect the server is told which state version we hold,
+    // so it can send just the missed deltas instead of a full snapshot
+    socket = io({
+        auth: cb => cb({ epoch: stateEpoch, seq: stateSeq })
+    });
     
     socket.on('connect', function() {
         console.log('Connected to server');
         showNotification('Connected to security system', 'success');
+        // Frames only go to subscribed dashboards; resume at the last rung
+        socket.emit('stream_subscribe', { rung: streamRung, pinned: streamPinned });
     });
     
     socket.on('disconnect', function() {
@@ -46,32 +68,180 @@ function initializeSocket() {
         monitoring = false;
     });
     
+    socket.on('state_snapshot', applySnapshot);
+    
+    socket.on('state_deltas', function(deltas) {
+        resyncPending = false;
+        deltas.forEach(applyDelta);
+        renderState();
+    });
+    
+    socket.on('state_delta', applyDelta);
+    
     socket.on('video_frame', function(data) {
-        updateVideoFeed(data);
-        updateSystemMetrics(data);
-        updateAccessStatus(data);
+        frameRenderer.push(data);
     });
     
+    socket.on('stream_profile', updateStreamProfile);
+    
     socket.on('violation_detected', function(data) {
+        // The violation row itself arrives as a state delta once the clip is saved
         showNotification(`Violation detected: ${data.status}`, 'warning');
-        loadViolations();
     });
     
     socket.on('system_error', function(data) {
         showNotification(`System Error: ${data.message}`, 'error');
     });
+    
+    socket.on('monitoring_progress', function(data) {
+        handleMonitoringProgress(data);
+    });
+}
+
+// ============ STATE SYNC ============
+function applySnapshot(snapshot) {
+    resyncPending = false;
+    stateEpoch = snapshot.epoch;
+    stateSeq = snapshot.seq;
+    dashboardState = snapshot.state;
+    renderState();
+}
+
+function applyDelta(delta) {
+    if (!dashboardState || delta.epoch !== stateEpoch || delta.seq > stateSeq + 1) {
+        // Missed a delta (or the server restarted): ask for what we lack
+        if (!resyncPending) {
+            resyncPending = true;
+            socket.emit('state_resync', { epoch: stateEpoch, seq: stateSeq });
+        }
+        return;
+    }
+    if (delta.seq <= stateSeq) return;
+    stateSeq = delta.seq;
+    
+    switch(delta.type) {
+        case 'monitoring':
+            dashboardState.monitoring = delta.value;
+            renderMonitoring();
+            break;
+        case 'camera': {
+            const camera = dashboardState.cameras[delta.camera_id] || {};
+            dashboardState.cameras[delta.camera_id] = Object.assign(camera, delta.changes);
+            if (delta.camera_id === primaryCameraId()) {
+                renderCamera(camera);
+            }
+            break;
+        }
+        case 'violation':
+            dashboardState.violations.unshift(delta.row);
+            dashboardState.violations = dashboardState.violations.slice(0, 10);
+            dashboardState.violation_count += 1;
+            renderViolations();
+            break;
+        case 'violations_cleared':
+            dashboardState.violations = [];
+            dashboardState.violation_count = 0;
+            renderViolations();
+            break;
+    }
+}
+
+function primaryCameraId() {
+    return Object.keys(dashboardState.cameras).sort((a, b) => a - b)[0];
+}
+
+function renderState() {
+    if (!dashboardState) return;
+    renderMonitoring();
+    const camera = dashboardState.cameras[primaryCameraId()];
+    if (camera) {
+        renderCamera(camera);
+    }
+    renderViolations();
+}
+
+function renderMonitoring() {
+    const active = dashboardState.monitoring;
+    if (active === monitoring) return;
+    monitoring = active;
+    document.getElementById('startBtn').disabled = active;
+    document.getElementById('stopBtn').disabled = !active;
+    
+    if (active) {
+        updateSystemStatus('online');
+        if (!startTime) {
+            startTime = Date.now();
+            uptimeInterval = setInterval(updateUptime, 1000);
+        }
+    } else {
+        updateSystemStatus('offline');
+        startTime = null;
+        if (uptimeInterval) {
+            clearInterval(uptimeInterval);
+            uptimeInterval = null;
+        }
+        resetMetrics();
+    }
+}
+
+function renderCamera(camera) {
+    updateCameraStatus(camera);
+    updateSystemMetrics(camera);
+    updateAccessStatus(camera);
+}
+
+function renderViolations() {
+    updateViolationsList(dashboardState.violations);
+    updateViolationCount(dashboardState.violation_count);
+}
+
+// ============ START-UP PROGRESS ============
+function handleMonitoringProgress(data) {
+    switch(data.stage) {
+        case 'loading_model':
+        case 'connecting_camera':
+            showNotification(data.message, 'info', 2000);
+            break;
+        case 'connected':
+            updateSystemStatus('online');
+            showNotification(data.message, 'success');
+            break;
+        case 'failed':
+            monitoring = false;
+            startTime = null;
+            if (uptimeInterval) {
+                clearInterval(uptimeInterval);
+                uptimeInterval = null;
+            }
+            document.getElementById('startBtn').disabled = false;
+            document.getElementById('stopBtn').disabled = true;
+            updateSystemStatus('error');
+            showNotification(data.message, 'error');
+            break;
+    }
 }
 
 // ============ VIDEO FEED MANAGEMENT ============
-function updateVideoFeed(data) {
-    const videoFeed = document.getElementById('videoFeed');
+function initializeFrameRenderer() {
+    frameRenderer = new FrameRenderer(document.getElementById('cameraGrid'), {
+        onRendered: acknowledgeFrame
+    });
+    // Rendered/dropped frames, FPS and decode times feed the server's metrics
+    clientMetricsInterval = setInterval(reportClientMetrics, 5000);
+}
+
+function reportClientMetrics() {
+    if (!socket || !socket.connected) return;
+    const report = frameRenderer.report();
+    if (Object.keys(report.cameras).length > 0) {
+        socket.emit('client_metrics', report);
+    }
+}
+
+function updateCameraStatus(data) {
     const recordingBadge = document.getElementById('recordingBadge');
     const accessStatusOverlay = document.getElementById('accessStatusOverlay');
     
-    if (data.frame) {
-        videoFeed.src = data.frame;
-    }
-    
     // Update recording indicator
     if (data.is_recording) {
         recordingBadge.classList.add('active');
@@ -90,6 +260,31 @@ function updateVideoFeed(data) {
         statusText.style.color = '#ff0041';
         accessStatusOverlay.style.borderLeftColor = '#ff0041';
     }
+    
+    // Operating mode: outside active hours a camera idles until something moves
+    const cameraLabel = document.querySelector('#cameraStatus span:last-child');
+    if (cameraLabel && data.mode) {
+        const name = `Camera ${primaryCameraId()}`;
+        cameraLabel.textContent = data.mode === 'active' ? name : `${name} · ${data.mode.toUpperCase()}`;
+    }
+}
+
+// Report end-to-end latency at most once per second per camera
+const lastFrameAck = {};
+function acknowledgeFrame(cameraId, capturedAt, sentAt) {
+    if (!capturedAt) return;
+    const now = Date.now();
+    if (lastFrameAck[cameraId] && now - lastFrameAck[cameraId] < 1000) return;
+    lastFrameAck[cameraId] = now;
+    // Sent once the frame is drawn on its canvas; the server measures
+    // capture -> ack receipt on its own clock, so client clock skew doesn't
+    // matter. sent_at (also server time) gives the delivery delay the
+    // stream quality controller works from
+    socket.emit('frame_ack', {
+        camera_id: Number(cameraId),
+        captured_at: capturedAt,
+        sent_at: sentAt
+    });
 }
 
 // ============ SYSTEM METRICS ============
@@ -100,7 +295,7 @@ function updateSystemMetrics(data) {
     systemStats.lastUpdate = new Date();
     
     // Update metric cards
-    document.getElementById('peopleMetric').textContent = `${systemStats.peopleDetected}/2`;
+    document.getElementById('peopleMetric').textContent = `${systemStats.peopleDetected}/${data.required_people || 2}`;
     document.getElementById('accessMetric').textContent = systemStats.accessGranted ? 'GRANTED' : 'DENIED';
     document.getElementById('recordingMetric').textContent = systemStats.recording ? 'YES' : 'NO';
     
@@ -147,9 +342,8 @@ function updateSystemStatus(status) {
             cameraStatus.querySelector('.status-dot').className = 'status-dot offline';
             
             // Reset video feed when offline
-            const videoFeed = document.getElementById('videoFeed');
-            if (videoFeed) {
-                videoFeed.src = '/static/images/no-signal.svg';
+            if (frameRenderer) {
+                frameRenderer.clear();
             }
             break;
         case 'warning':
@@ -171,7 +365,7 @@ function updateSystemStatus(status) {
 
 // ============ ACCESS STATUS ============
 function updateAccessStatus(data) {
-    // This is handled in updateVideoFeed and updateSystemMetrics
+    // This is handled in updateCameraStatus and updateSystemMetrics
     // Additional animations or effects can be added here
     if (data.status === 'Access Granted') {
         document.body.style.setProperty('--accent-color', '#00ff41');
@@ -224,14 +418,15 @@ function startMonitoring() {
                 stopBtn.disabled = false;
                 startBtn.innerHTML = '<i class="fas fa-play"></i><span>START MONITORING</span>';
                 
-                updateSystemStatus('online');
-                showNotification('Monitoring started successfully', 'success');
+                // The camera connects in the background; 'monitoring_progress'
+                // events report when it is actually online
+                updateSystemStatus('warning');
+                showNotification('Monitoring starting...', 'info');
                 
                 // Start uptime counter
-                uptimeInterval = setInterval(updateUptime, 1000);
-                
-                // Load violations after starting
-                setTimeout(loadViolations, 1000);
+                if (!uptimeInterval) {
+                    uptimeInterval = setInterval(updateUptime, 1000);
+                }
             } else {
                 throw new Error(data.message || 'Failed to start monitoring');
             }
@@ -274,7 +469,7 @@ function stopMonitoring() {
                 document.getElementById('uptimeMetric').textContent = '00:00:00';
                 
                 // Clear video feed
-                document.getElementById('videoFeed').src = '/static/images/no-signal.svg';
+                frameRenderer.clear();
                 document.getElementById('recordingBadge').classList.remove('active');
                 
                 // Reset metrics
@@ -292,19 +487,6 @@ function stopMonitoring() {
 }
 
 // ============ VIOLATIONS MANAGEMENT ============
-function loadViolations() {
-    fetch('/api/violations?limit=10')
-        .then(response => response.json())
-        .then(violations => {
-            updateViolationsList(violations);
-            updateViolationCount(violations.length);
-        })
-        .catch(error => {
-            console.error('Error loading violations:', error);
-            showNotification('Error loading violations', 'error');
-        });
-}
-
 function updateViolationsList(violations) {
     const violationsList = document.getElementById('violationsList');
     
@@ -392,6 +574,11 @@ function initializeVideoControls() {
 }
 
 function initializeSettings() {
+    document.getElementById('streamQuality').addEventListener('change', function() {
+        streamPinned = this.value === 'auto' ? null : Number(this.value);
+        socket.emit('stream_pin', { rung: streamPinned });
+    });
+    
     const qualitySelect = document.getElementById('recordingQuality');
     
     qualitySelect.addEventListener('change', function() {
@@ -417,19 +604,35 @@ function initializeSettings() {
     });
 }
 
+function updateStreamProfile(data) {
+    streamRung = data.rung;
+    streamPinned = data.pinned;
+    
+    // Options follow the server's ladder, which a config reload may change
+    const select = document.getElementById('streamQuality');
+    const options = ['auto'].concat(data.ladder.map((name, rung) => String(rung)));
+    if (Array.from(select.options).map(option => option.value).join() !== options.join()) {
+        select.innerHTML = '<option value="auto">Auto</option>' +
+            data.ladder.map((name, rung) => `<option value="${rung}">${name}</option>`).join('');
+    }
+    select.value = streamPinned === null ? 'auto' : String(streamPinned);
+    select.disabled = !data.adaptive && streamPinned === null && data.ladder.length < 2;
+    
+    const name = data.ladder[streamRung] || '';
+    document.getElementById('streamQualityValue').textContent = streamPinned === null ? name : '';
+    if (data.reason && !['subscribed', 'pinned', 'automatic'].includes(data.reason)) {
+        showNotification(`Stream quality: ${name} (${data.reason})`, 'info', 2000);
+    }
+}
+
 // ============ QUICK ACTIONS ============
 function takeScreenshot() {
-    const videoFeed = document.getElementById('videoFeed');
-    const canvas = document.createElement('canvas');
-    const ctx = canvas.getContext('2d');
-    
-    canvas.width = videoFeed.naturalWidth || videoFeed.width;
-    canvas.height = videoFeed.naturalHeight || videoFeed.height;
-    
-    ctx.drawImage(videoFeed, 0, 0);
-    
-    // Create download link
-    canvas.toBlob(function(blob) {
+    // Frames live on (possibly offscreen) canvases; ask the renderer for a PNG
+    frameRenderer.snapshot().then(function(blob) {
+        if (!blob) {
+            showNotification('No video to capture', 'warning');
+            return;
+        }
         const url = URL.createObjectURL(blob);
         const a = document.createElement('a');
         a.href = url;
@@ -454,23 +657,14 @@ function toggleFullscreen() {
 }
 
 function exportLogs() {
-    showNotification('Exporting logs...', 'info');
-    
-    fetch('/api/export/logs', { method: 'POST' })
-        .then(response => response.blob())
-        .then(blob => {
-            const url = URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `vault-logs-${Date.now()}.zip`;
-            a.click();
-            URL.revokeObjectURL(url);
-            showNotification('Logs exported successfully', 'success');
-        })
-        .catch(error => {
-            console.error('Error exporting logs:', error);
-            showNotification('Error exporting logs', 'error');
-        });
+    // Let the browser stream the download to disk instead of buffering it here
+    const a = document.createElement('a');
+    a.href = '/api/export/logs';
+    a.download = `vault-logs-${Date.now()}.ndjson`;
+    document.body.appendChild(a);
+    a.click();
+    a.remove();
+    showNotification('Log export started', 'success');
 }
 
 function testAlarm() {
@@ -497,7 +691,7 @@ function clearViolations() {
             .then(response => response.json())
             .then(data => {
                 if (data.status === 'success') {
-                    loadViolations();
+                    // The list empties when the 'violations_cleared' delta arrives
                     showNotification('Violation history cleared', 'success');
                 } else {
                     throw new Error(data.message || 'Failed to clear violations');
@@ -554,36 +748,6 @@ function exportViolation(violationId) {
 }
 
 // ============ UTILITY FUNCTIONS ============
-function loadInitialData() {
-    // Load current system status
-    fetch('/api/status')
-        .then(response => response.json())
-        .then(data => {
-            if (data) {
-                if (data.monitoring) {
-                    document.getElementById('startBtn').disabled = true;
-                    document.getElementById('stopBtn').disabled = false;
-                    updateSystemStatus('online');
-                    monitoring = true;
-                    
-                    if (monitoring && !startTime) {
-                        startTime = Date.now();
-                        uptimeInterval = setInterval(updateUptime, 1000);
-                    }
-                } else {
-                    updateSystemStatus('offline');
-                }
-            }
-        })
-        .catch(error => {
-            console.error('Error loading initial data:', error);
-            updateSystemStatus('error');
-        });
-    
-    // Load initial violations
-    loadViolations();
-}
-
 function resetMetrics() {
     document.getElementById('peopleMetric').textContent = '0/2';
     document.getElementById('accessMetric').textContent = 'DENIED';
@@ -649,10 +813,7 @@ document.addEventListener('visibilitychange', function() {
         // Page is hidden, might want to reduce update frequency
         console.log('Page hidden - reducing updates');
     } else {
-        // Page is visible, resume normal updates
+        // Page is visible; state deltas kept arriving while hidden
         console.log('Page visible - resuming updates');
-        if (monitoring) {
-            loadViolations(); // Refresh violations when page becomes visible
-        }
     }
 });
\ No newline at end of file
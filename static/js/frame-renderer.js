@@ -0,0 +1,227 @@
+// ============ FRAME RENDERER MODULE ============
+// Draws live camera frames into a grid of canvases. JPEG bytes from
+// 'video_frame' events are handed (zero-copy) to a Web Worker that decodes
+// and draws them on OffscreenCanvases; browsers without OffscreenCanvas
+// decode on the main thread instead. Either way a camera that falls behind
+// skips to its newest frame, and nothing is decoded while the tab is hidden.
+
+class FrameRenderer {
+    constructor(grid, options = {}) {
+        this.grid = grid;
+        this.onRendered = options.onRendered || null;
+        this.tiles = new Map();
+        this.snapshotRequests = new Map();
+        this.worker = null;
+
+        if (FrameRenderer.supportsWorker()) {
+            try {
+                this.worker = new Worker('/static/js/frame-worker.js');
+                this.worker.onmessage = (event) => this.handleWorkerMessage(event.data);
+            } catch (error) {
+                console.warn('Frame worker unavailable, decoding on main thread:', error);
+                this.worker = null;
+            }
+        }
+    }
+
+    static supportsWorker() {
+        return typeof Worker !== 'undefined' &&
+            typeof OffscreenCanvas !== 'undefined' &&
+            typeof createImageBitmap !== 'undefined' &&
+            'transferControlToOffscreen' in HTMLCanvasElement.prototype;
+    }
+
+    // ---- tiles ----
+
+    tile(cameraId, name) {
+        cameraId = String(cameraId);
+        let tile = this.tiles.get(cameraId);
+        if (tile) {
+            if (name) tile.label.textContent = name;
+            return tile;
+        }
+
+        const element = document.createElement('div');
+        element.className = 'camera-tile offline';
+        element.dataset.cameraId = cameraId;
+        const canvas = document.createElement('canvas');
+        const label = document.createElement('span');
+        label.className = 'camera-label';
+        label.textContent = name || `Camera ${cameraId}`;
+        element.appendChild(canvas);
+        element.appendChild(label);
+        this.grid.appendChild(element);
+
+        tile = { element, canvas, label, ctx: null, busy: false, pending: null, stats: this.emptyStats() };
+        if (this.worker) {
+            const offscreen = canvas.transferControlToOffscreen();
+            this.worker.postMessage({ type: 'canvas', cameraId, canvas: offscreen }, [offscreen]);
+        } else {
+            tile.ctx = canvas.getContext('2d');
+        }
+        this.tiles.set(cameraId, tile);
+        this.layout();
+        return tile;
+    }
+
+    layout() {
+        // Near-square grid: 1 -> 1x1, 2 -> 2x1, 3-4 -> 2x2, 5-9 -> 3x3 ...
+        const columns = Math.ceil(Math.sqrt(this.tiles.size));
+        this.grid.style.gridTemplateColumns = `repeat(${columns}, 1fr)`;
+        this.grid.classList.toggle('multi', this.tiles.size > 1);
+    }
+
+    primaryCameraId() {
+        return this.tiles.keys().next().value;
+    }
+
+    emptyStats() {
+        return { received: 0, rendered: 0, dropped: 0, decodeMs: [], since: performance.now() };
+    }
+
+    // ---- frames ----
+
+    push(data) {
+        const tile = this.tile(data.camera_id || 1);
+        tile.stats.received++;
+
+        // Hidden tabs don't paint; decoding there would only build a backlog
+        if (document.hidden || !data.frame) {
+            tile.stats.dropped++;
+            return;
+        }
+        tile.element.classList.remove('offline');
+
+        const frame = {
+            cameraId: tile.element.dataset.cameraId,
+            data: data.frame,
+            capturedAt: data.captured_at,
+            sentAt: data.sent_at
+        };
+        if (this.worker) {
+            const transfer = data.frame instanceof ArrayBuffer ? [data.frame] : [];
+            this.worker.postMessage(Object.assign({ type: 'frame' }, frame), transfer);
+        } else if (tile.busy) {
+            if (tile.pending) tile.stats.dropped++;
+            tile.pending = frame;
+        } else {
+            this.renderOnMainThread(tile, frame);
+        }
+    }
+
+    async renderOnMainThread(tile, frame) {
+        tile.busy = true;
+        const started = performance.now();
+        try {
+            const blob = new Blob([frame.data], { type: 'image/jpeg' });
+            const image = typeof createImageBitmap !== 'undefined'
+                ? await createImageBitmap(blob)
+                : await FrameRenderer.loadImage(blob);
+            if (tile.canvas.width !== image.width || tile.canvas.height !== image.height) {
+                tile.canvas.width = image.width;
+                tile.canvas.height = image.height;
+            }
+            tile.ctx.drawImage(image, 0, 0);
+            if (image.close) image.close();
+            this.rendered(frame.cameraId, frame.capturedAt, frame.sentAt, performance.now() - started);
+        } catch (error) {
+            console.error('Error rendering frame:', error);
+        }
+        tile.busy = false;
+
+        if (tile.pending) {
+            const next = tile.pending;
+            tile.pending = null;
+            this.renderOnMainThread(tile, next);
+        }
+    }
+
+    static loadImage(blob) {
+        return new Promise((resolve, reject) => {
+            const url = URL.createObjectURL(blob);
+            const image = new Image();
+            image.onload = () => { URL.revokeObjectURL(url); resolve(image); };
+            image.onerror = (error) => { URL.revokeObjectURL(url); reject(error); };
+            image.src = url;
+        });
+    }
+
+    rendered(cameraId, capturedAt, sentAt, decodeMs) {
+        const tile = this.tiles.get(cameraId);
+        if (!tile) return;
+        tile.stats.rendered++;
+        if (tile.stats.decodeMs.length < 200) {
+            tile.stats.decodeMs.push(Math.round(decodeMs * 10) / 10);
+        }
+        if (this.onRendered) {
+            this.onRendered(cameraId, capturedAt, sentAt);
+        }
+    }
+
+    handleWorkerMessage(message) {
+        const tile = this.tiles.get(message.cameraId);
+        switch(message.type) {
+            case 'rendered':
+                this.rendered(message.cameraId, message.capturedAt, message.sentAt, message.decodeMs);
+                break;
+            case 'dropped':
+                if (tile) tile.stats.dropped++;
+                break;
+            case 'snapshot': {
+                const resolve = this.snapshotRequests.get(message.cameraId);
+                this.snapshotRequests.delete(message.cameraId);
+                if (resolve) resolve(message.blob);
+                break;
+            }
+            case 'error':
+                console.error(`Error decoding frame for camera ${message.cameraId}:`, message.message);
+                break;
+        }
+    }
+
+    // ---- controls ----
+
+    clear() {
+        this.tiles.forEach((tile, cameraId) => {
+            tile.element.classList.add('offline');
+            tile.pending = null;
+            if (this.worker) {
+                this.worker.postMessage({ type: 'clear', cameraId });
+            } else {
+                tile.ctx.clearRect(0, 0, tile.canvas.width, tile.canvas.height);
+            }
+        });
+    }
+
+    snapshot(cameraId = this.primaryCameraId()) {
+        const tile = this.tiles.get(cameraId);
+        if (!tile) return Promise.resolve(null);
+        if (!this.worker) {
+            return new Promise(resolve => tile.canvas.toBlob(resolve));
+        }
+        return new Promise(resolve => {
+            this.snapshotRequests.set(cameraId, resolve);
+            this.worker.postMessage({ type: 'snapshot', cameraId });
+        });
+    }
+
+    // Per-camera client metrics since the previous call (see 'client_metrics')
+    report() {
+        const now = performance.now();
+        const cameras = {};
+        this.tiles.forEach((tile, cameraId) => {
+            const stats = tile.stats;
+            if (!stats.received) return;
+            const seconds = (now - stats.since) / 1000;
+            cameras[cameraId] = {
+                received: stats.received,
+                rendered: stats.rendered,
+                dropped: stats.dropped,
+                fps: seconds > 0 ? Math.round(stats.rendered / seconds * 10) / 10 : 0,
+                decode_ms: stats.decodeMs
+            };
+            tile.stats = this.emptyStats();
+        });
+        return { cameras, worker: Boolean(this.worker), hidden: document.hidden };
+    }
+}
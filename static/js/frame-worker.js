@@ -0,0 +1,92 @@
+// ============ FRAME DECODE WORKER ============
+// Decodes JPEG frames with createImageBitmap and draws them onto each
+// camera's OffscreenCanvas, so the page's main thread never parses or
+// decodes image data. While a camera's frame is decoding only the newest
+// frame waits; anything older is dropped and reported back.
+
+const cameras = new Map();
+
+self.onmessage = function(event) {
+    const message = event.data;
+    switch(message.type) {
+        case 'canvas':
+            cameras.set(message.cameraId, {
+                canvas: message.canvas,
+                ctx: message.canvas.getContext('2d'),
+                busy: false,
+                pending: null
+            });
+            break;
+        case 'frame':
+            queueFrame(message);
+            break;
+        case 'clear':
+            clearCamera(message.cameraId);
+            break;
+        case 'snapshot':
+            snapshotCamera(message.cameraId);
+            break;
+    }
+};
+
+function queueFrame(frame) {
+    const camera = cameras.get(frame.cameraId);
+    if (!camera) return;
+
+    if (camera.busy) {
+        if (camera.pending) {
+            self.postMessage({ type: 'dropped', cameraId: frame.cameraId });
+        }
+        camera.pending = frame;
+        return;
+    }
+    renderFrame(camera, frame);
+}
+
+async function renderFrame(camera, frame) {
+    camera.busy = true;
+    const started = performance.now();
+    try {
+        const bitmap = await createImageBitmap(new Blob([frame.data], { type: 'image/jpeg' }));
+        if (camera.canvas.width !== bitmap.width || camera.canvas.height !== bitmap.height) {
+            camera.canvas.width = bitmap.width;
+            camera.canvas.height = bitmap.height;
+        }
+        camera.ctx.drawImage(bitmap, 0, 0);
+        bitmap.close();
+        self.postMessage({
+            type: 'rendered',
+            cameraId: frame.cameraId,
+            capturedAt: frame.capturedAt,
+            sentAt: frame.sentAt,
+            decodeMs: performance.now() - started
+        });
+    } catch (error) {
+        self.postMessage({ type: 'error', cameraId: frame.cameraId, message: String(error) });
+    }
+    camera.busy = false;
+
+    if (camera.pending) {
+        const next = camera.pending;
+        camera.pending = null;
+        renderFrame(camera, next);
+    }
+}
+
+function clearCamera(cameraId) {
+    const camera = cameras.get(cameraId);
+    if (!camera) return;
+    camera.pending = null;
+    camera.ctx.clearRect(0, 0, camera.canvas.width, camera.canvas.height);
+}
+
+function snapshotCamera(cameraId) {
+    const camera = cameras.get(cameraId);
+    if (!camera) {
+        self.postMessage({ type: 'snapshot', cameraId, blob: null });
+        return;
+    }
+    camera.canvas.convertToBlob({ type: 'image/png' })
+        .then(blob => self.postMessage({ type: 'snapshot', cameraId, blob }))
+        .catch(() => self.postMessage({ type: 'snapshot', cameraId, blob: null }));
+}
@@ -127,7 +127,8 @@ class SocketHandler {
     }
 
     setupApplicationEvents() {
-        // Video stream events
+        // Video stream events. This socket never sends 'stream_subscribe', so
+        // frames only arrive here while cameras broadcast (see stream_quality.py)
         this.socket.on('video_frame', (data) => {
             this.emit('video_frame', data);
             this.updateConnectionHealth('video_received');
@@ -394,20 +395,8 @@ document.addEventListener('DOMContentLoaded', function() {
 function setupSocketEventHandlers() {
     if (!socketHandler) return;
     
-    // Video frame handler
-    socketHandler.on('video_frame', function(data) {
-        if (typeof updateVideoFeed === 'function') {
-            updateVideoFeed(data);
-        }
-        
-        if (typeof updateSystemMetrics === 'function') {
-            updateSystemMetrics(data);
-        }
-        
-        if (typeof updateAccessStatus === 'function') {
-            updateAccessStatus(data);
-        }
-    });
+    // Frames are drawn by dashboard.js's FrameRenderer and metrics follow the
+    // state deltas, so 'video_frame' needs no handler here
     
     // System status handler
     socketHandler.on('system_status', function(data) {
@@ -427,6 +416,10 @@ function setupSocketEventHandlers() {
     // Camera connection handlers
     socketHandler.on('camera_connected', function(data) {
         console.log('Camera connected:', data);
+        
+        if (typeof updateSystemStatus === 'function') {
+            updateSystemStatus('online');
+        }
     });
     
     socketHandler.on('camera_disconnected', function(data) {
@@ -470,9 +463,8 @@ function setupSocketEventHandlers() {
             }
         } else {
             // Clear video feed on disconnection
-            const videoFeed = document.getElementById('videoFeed');
-            if (videoFeed) {
-                videoFeed.src = '/static/images/no-signal.jpg';
+            if (typeof frameRenderer !== 'undefined' && frameRenderer) {
+                frameRenderer.clear();
             }
         }
     });
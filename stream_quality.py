@@ -0,0 +1,252 @@
+# stream_quality.py - Per-dashboard Adaptive Stream Quality
+
+import time
+import logging
+import threading
+
+# Dashboards on rung N are in this Socket.IO room; cameras emit one encode per room
+ROOM_PREFIX = 'stream:'
+
+# Seconds covered by one dashboard rendering report (dashboard.js)
+REPORT_SPAN = 5.0
+
+
+def stream_room(rung):
+    return f'{ROOM_PREFIX}{rung}'
+
+
+class QualityController:
+    """Picks one dashboard's rung on the quality ladder (0 = best) from its feedback.
+
+    About once a second per camera the dashboard acknowledges a drawn frame
+    and echoes the server time it was sent, so the delay covers the network,
+    the client's queue and its decode, on the server's clock. Every few
+    seconds it also reports how many frames it dropped to stay current.
+    A smoothed delay over ``degrade_delay_ms``, too many drops, or no
+    acknowledgement for ``stall_seconds`` while frames are being sent steps
+    down one rung straight away. Stepping back up needs ``upgrade_after``
+    seconds of good delivery, and that wait doubles (up to 8x) each time
+    an upgrade had to be undone, so a link at its limit settles instead of
+    oscillating. A pinned dashboard keeps its rung.
+    """
+
+    def __init__(self, rungs, rung=0, pinned=None):
+        self.rungs = rungs
+        self.rung = min(max(int(rung), 0), rungs - 1)
+        self.pinned = None if pinned is None else self.rung
+        self.delay = None              # smoothed delivery delay, seconds
+        self.last_ack = None
+        self.good_since = time.monotonic()
+        self.backoff = 1
+        self.upgraded_at = None
+        self.changes = 0
+        self.changed_at = 0.0          # wall clock, comparable with frames' sent_at
+        self.reason = None
+        self.hidden = False
+
+    def observe_ack(self, delay, settings):
+        """A drawn frame acknowledged ``delay`` seconds after it was sent"""
+        now = time.monotonic()
+        self.last_ack = now
+        self.delay = delay if self.delay is None else 0.7 * self.delay + 0.3 * delay
+        if self.delay * 1000 > settings.degrade_delay_ms:
+            return self._step(1, f"delivery delay {self.delay * 1000:.0f}ms")
+        if self.delay * 1000 > settings.upgrade_delay_ms:
+            self.good_since = now
+        return self._maybe_upgrade(now, settings)
+
+    def observe_report(self, received, dropped, hidden, settings):
+        """A rendering report: frames received and dropped since the previous one"""
+        self.hidden = hidden
+        if hidden or not received:
+            # Hidden tabs drop everything by design
+            return None
+        if dropped / received > settings.degrade_drop_ratio:
+            return self._step(1, f"dropped {dropped}/{received} frames")
+        if dropped:
+            self.good_since = time.monotonic()
+        return None
+
+    def check_stall(self, sending_since, settings):
+        """Called periodically; ``sending_since`` is when frames started going to this rung"""
+        if self.hidden or sending_since is None:
+            return None
+        now = time.monotonic()
+        since = max(self.last_ack or sending_since, sending_since)
+        if now - since > settings.stall_seconds:
+            # Start the next stall window from here
+            self.last_ack = now
+            return self._step(1, f"no frame acknowledged for {now - since:.0f}s")
+        return None
+
+    def _maybe_upgrade(self, now, settings):
+        if now - self.good_since >= settings.upgrade_after * self.backoff:
+            if self._step(-1, f"delivery delay {self.delay * 1000:.0f}ms") is not None:
+                self.upgraded_at = now
+                return self.rung
+        return None
+
+    def _step(self, direction, reason):
+        """Move ``direction`` rungs (+1 worse, -1 better); returns the new rung or None"""
+        if self.pinned is not None:
+            return None
+        rung = min(max(self.rung + direction, 0), self.rungs - 1)
+        now = time.monotonic()
+        if direction > 0:
+            if self.upgraded_at is not None and now - self.upgraded_at < 30:
+                self.backoff = min(self.backoff * 2, 8)
+            self.upgraded_at = None
+            # Delay measured at the old rung says nothing about the new one
+            self.delay = None
+        self.good_since = now
+        if rung == self.rung:
+            return None
+        self.rung = rung
+        self.changes += 1
+        self.changed_at = time.time()
+        self.reason = reason
+        return rung
+
+
+class StreamClients:
+    """Dashboards subscribed to live video, by rung.
+
+    Each subscribed dashboard has a ``QualityController`` and sits in the
+    Socket.IO room of its rung; ``on_change(sid, rung, reason)`` moves it
+    between rooms and tells it. Camera processors ask ``watched_rungs`` which
+    rooms to encode for, so every rung costs one encode per frame however
+    many dashboards share it. Web workers report their counts to camera
+    nodes (``set_remote``), like ``ViewerCount``.
+    """
+
+    def __init__(self, settings_getter, on_change=None):
+        self.settings = settings_getter
+        self.on_change = on_change
+        self._clients = {}
+        self._remote = {}
+        self._sending_since = {}   # rung -> when frames started going to its room
+        self._last_sent = {}       # rung -> when the latest frame went out
+        self._lock = threading.Lock()
+        self._thread = None
+        self.logger = logging.getLogger('StreamClients')
+
+    def subscribe(self, sid, rungs, rung=0, pinned=None):
+        controller = QualityController(rungs, rung, pinned)
+        with self._lock:
+            self._clients[sid] = controller
+        return controller
+
+    def unsubscribe(self, sid):
+        with self._lock:
+            return self._clients.pop(sid, None)
+
+    def get(self, sid):
+        return self._clients.get(sid)
+
+    def pin(self, sid, rung):
+        """Hold a dashboard at ``rung`` (None = adaptive again)"""
+        controller = self._clients.get(sid)
+        if controller is None:
+            return None
+        if rung is None:
+            controller.pinned = None
+            controller.good_since = time.monotonic()
+        else:
+            controller.rung = controller.pinned = min(max(int(rung), 0), controller.rungs - 1)
+            controller.delay = None
+            controller.changed_at = time.time()
+        self._changed(sid, controller, 'pinned' if rung is not None else 'automatic')
+        return controller
+
+    def observe_ack(self, sid, sent_at):
+        controller = self._clients.get(sid)
+        # Frames sent before the last move say nothing about the new rung
+        if controller is not None and sent_at and self.settings().adaptive and sent_at >= controller.changed_at:
+            if controller.observe_ack(max(time.time() - sent_at, 0.0), self.settings()) is not None:
+                self._changed(sid, controller, controller.reason)
+
+    def observe_report(self, sid, report):
+        controller = self._clients.get(sid)
+        # A report spanning the last move mixes both rungs' frames
+        if controller is None or not self.settings().adaptive or time.time() - controller.changed_at < REPORT_SPAN:
+            return
+        cameras = (report.get('cameras') or {}).values()
+        received = sum(max(int(c.get('received', 0)), 0) for c in cameras)
+        dropped = sum(max(int(c.get('dropped', 0)), 0) for c in cameras)
+        if controller.observe_report(received, dropped, bool(report.get('hidden')), self.settings()) is not None:
+            self._changed(sid, controller, controller.reason)
+
+    def _changed(self, sid, controller, reason):
+        self.logger.debug(f"Dashboard {sid} -> rung {controller.rung} ({reason})")
+        if self.on_change is not None:
+            self.on_change(sid, controller.rung, reason)
+
+    # ---- what cameras encode ----
+
+    def counts(self):
+        with self._lock:
+            counts = {}
+            for controller in self._clients.values():
+                counts[controller.rung] = counts.get(controller.rung, 0) + 1
+            return counts
+
+    def set_remote(self, source, counts):
+        with self._lock:
+            self._remote[source] = {int(rung): int(n) for rung, n in (counts or {}).items() if int(n) > 0}
+
+    def watched_rungs(self):
+        """Rungs with at least one dashboard, here or on any web worker"""
+        rungs = set(self.counts())
+        with self._lock:
+            for counts in self._remote.values():
+                rungs.update(counts)
+        return rungs
+
+    def sent(self, rung):
+        """A camera just sent a frame to ``rung``'s room"""
+        now = time.monotonic()
+        self._sending_since.setdefault(rung, now)
+        self._last_sent[rung] = now
+
+    # ---- stall detection ----
+
+    def start(self, interval=1.0):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='stream-quality', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            if not self.settings().adaptive:
+                continue
+            now = time.monotonic()
+            with self._lock:
+                clients = list(self._clients.items())
+                # A rung that saw no frame for a while (monitoring stopped) isn't stalling anyone
+                for rung, last in list(self._last_sent.items()):
+                    if now - last > 2:
+                        self._sending_since.pop(rung, None)
+                        del self._last_sent[rung]
+            for sid, controller in clients:
+                if controller.check_stall(self._sending_since.get(controller.rung), self.settings()) is not None:
+                    self._changed(sid, controller, controller.reason)
+
+    def status(self):
+        counts = self.counts()
+        with self._lock:
+            return {
+                'dashboards': sum(counts.values()),
+                'by_rung': counts,
+                'remote': dict(self._remote),
+                'clients': {
+                    sid: {
+                        'rung': c.rung,
+                        'pinned': c.pinned,
+                        'delay_ms': round(c.delay * 1000, 1) if c.delay is not None else None,
+                        'changes': c.changes,
+                        'hidden': c.hidden
+                    } for sid, c in self._clients.items()
+                }
+            }
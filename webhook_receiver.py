@@ -0,0 +1,87 @@
+# webhook_receiver.py - Local Stand-in for Alert Webhook Endpoints
+
+import json
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = {'raw': body.decode(errors='replace')}
+        self.server.receiver.record(self.path, payload)
+        status = self.server.receiver.response_status
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{"ok": true}' if status < 400 else b'{"ok": false}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WebhookReceiver:
+    """Collects webhook POSTs so alert delivery can be tested without a real service.
+
+    ``response_status`` can be set to an error code to exercise retries and
+    failure accounting in ``events.WebhookSink``.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, response_status=200):
+        self.host = host
+        self.port = port
+        self.response_status = response_status
+        self.received = []
+        self._cond = threading.Condition()
+        self._server = None
+        self.logger = logging.getLogger('WebhookReceiver')
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/alerts"
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.receiver = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='webhook-receiver', daemon=True).start()
+        self.logger.info(f"📥 Webhook receiver listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def record(self, path, payload):
+        with self._cond:
+            self.received.append(payload)
+            self._cond.notify_all()
+        self.logger.info(f"📥 {path}: {payload.get('event')} {json.dumps(payload)}")
+
+    def wait_for(self, count, timeout=5.0):
+        """Block until ``count`` payloads have arrived; returns them"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.received) >= count, timeout)
+            return list(self.received)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print alert webhooks (use as ALERT_WEBHOOK_URLS)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    receiver = WebhookReceiver(args.host, args.port).start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        receiver.stop()